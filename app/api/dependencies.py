@@ -4,16 +4,22 @@ from __future__ import annotations
 
 import boto3
 from functools import lru_cache
+from typing import Optional
 
 from app.core.config import Settings, settings
 from app.models.database import MetricsAggregator, QueryHistoryStore
 from app.services.bedrock_client import BedrockClient
 from app.services.generation import GenerationService
 from app.services.ingestion import DocumentIngestionService
+from app.services.mapped_store import MappedVectorStore
 from app.services.retrieval import RetrievalService
-from app.services.vector_store import LocalVectorStore
+from app.services.sharded_store import ShardedVectorStore
+from app.services.sqlite_store import SQLiteVectorStore
+from app.services.vector_store import LocalVectorStore, VectorStore
 from app.utils.chunking import Chunker
+from app.utils.document_extraction import ExtractionPool
 from app.utils.embedding import EmbeddingService
+from app.utils.embedding_cache import EmbeddingCache
 
 
 def get_settings() -> Settings:
@@ -50,17 +56,44 @@ def get_chunker() -> Chunker:
     )
 
 
+@lru_cache()
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    if not settings.embedding_cache_path:
+        return None
+    return EmbeddingCache(settings.embedding_cache_path, settings.embedding_cache_max_mb * 1024 * 1024)
+
+
 @lru_cache()
 def get_embedding_service() -> EmbeddingService:
     return EmbeddingService(
         bedrock_client=get_bedrock_client(),
         model_id=settings.bedrock_embedding_model_id,
+        cache=get_embedding_cache(),
     )
 
 
 @lru_cache()
-def get_vector_store() -> LocalVectorStore:
-    return LocalVectorStore(settings.vector_store_path)
+def get_vector_store() -> VectorStore:
+    if settings.vector_store_backend == "mapped":
+        return MappedVectorStore(settings.mapped_store_path)
+    if settings.vector_store_backend == "sharded":
+        return ShardedVectorStore(settings.sharded_store_path)
+    if settings.vector_store_backend == "sqlite":
+        return SQLiteVectorStore(settings.sqlite_store_path)
+    if settings.vector_store_backend == "json":
+        return LocalVectorStore(settings.vector_store_path)
+    raise ValueError(f"Unknown vector store backend: {settings.vector_store_backend}")
+
+
+@lru_cache()
+def get_extraction_pool() -> Optional[ExtractionPool]:
+    if settings.extraction_processes <= 0:
+        return None
+    return ExtractionPool(
+        processes=settings.extraction_processes,
+        timeout=settings.extraction_timeout_seconds,
+        pages_per_task=settings.pdf_pages_per_task,
+    )
 
 
 @lru_cache()
@@ -70,6 +103,7 @@ def get_ingestion_service() -> DocumentIngestionService:
         chunker=get_chunker(),
         s3_client=get_s3_client(),
         vector_store=get_vector_store(),
+        extraction_pool=get_extraction_pool(),
     )
 
 
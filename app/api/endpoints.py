@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import io
 import time
 from datetime import datetime
@@ -12,6 +13,7 @@ from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 from pydantic import ValidationError
 
 from app.api.dependencies import (
+    get_embedding_service,
     get_generation_service,
     get_ingestion_service,
     get_metrics_aggregator,
@@ -23,6 +25,8 @@ from app.core.config import Settings
 from app.models.database import MetricsAggregator, QueryHistoryStore
 from app.models.schemas import (
     BatchIngestionResponse,
+    BatchResearchQuery,
+    BatchResearchResponse,
     DocumentBatchItem,
     DocumentMetadata,
     DocumentUploadResponse,
@@ -36,6 +40,8 @@ from app.models.schemas import (
 from app.services.generation import GenerationService
 from app.services.ingestion import DocumentIngestionService
 from app.services.retrieval import RetrievalService
+from app.utils.embedding import EmbeddingService
+from app.utils.upload_spool import BLOCK_SIZE, SpooledUpload
 
 router = APIRouter()
 
@@ -68,8 +74,15 @@ async def health_check(
 @router.get("/metrics", response_model=MetricsResponse, tags=["system"])
 async def metrics(
     metrics_aggregator: MetricsAggregator = Depends(get_metrics_aggregator),
+    embedding_service: EmbeddingService = Depends(get_embedding_service),
+    ingestion_service: DocumentIngestionService = Depends(get_ingestion_service),
 ) -> MetricsResponse:
-    return await metrics_aggregator.snapshot()
+    snapshot = await metrics_aggregator.snapshot()
+    snapshot.embedding_cache = embedding_service.cache_stats()
+    snapshot.query_embedding_cache = embedding_service.query_cache_stats()
+    snapshot.query_embedding_batches = embedding_service.query_batch_stats()
+    snapshot.ingestion_pipeline = ingestion_service.pipeline_stats()
+    return snapshot
 
 
 @router.post("/admin/reindex", tags=["system"])
@@ -88,8 +101,16 @@ async def upload_document(
     ingestion_service: DocumentIngestionService = Depends(get_ingestion_service),
     metrics_aggregator: MetricsAggregator = Depends(get_metrics_aggregator),
 ) -> DocumentUploadResponse:
-    content = await file.read()
-    if not content:
+    # Copy the upload in blocks, hashing as it goes, so large files never sit
+    # in memory whole.
+    upload = SpooledUpload()
+    while True:
+        block = await file.read(BLOCK_SIZE)
+        if not block:
+            break
+        upload.write(block)
+    if not upload.size:
+        upload.close()
         raise HTTPException(status_code=400, detail="Uploaded file is empty")
 
     metadata_payload = {}
@@ -98,11 +119,12 @@ async def upload_document(
             metadata_model = DocumentMetadata.parse_raw(metadata_json)
             metadata_payload = metadata_model.dict(exclude_none=True)
         except ValidationError as exc:
+            upload.close()
             raise HTTPException(status_code=400, detail=f"Invalid metadata payload: {exc}")
 
     start = time.perf_counter()
     result = ingestion_service.ingest_document(
-        document_stream=io.BytesIO(content),
+        document_stream=upload,
         filename=file.filename,
         metadata=metadata_payload,
     )
@@ -112,6 +134,7 @@ async def upload_document(
         document_id=result.document_id,
         chunks_indexed=result.chunks_indexed,
         duplicate=result.duplicate,
+        near_duplicate_of=result.near_duplicate_of,
     )
 
 
@@ -136,6 +159,7 @@ async def batch_upload(
             document_id=result.document_id,
             chunks_indexed=result.chunks_indexed,
             duplicate=result.duplicate,
+            near_duplicate_of=result.near_duplicate_of,
         )
         for result in results
     ]
@@ -169,13 +193,15 @@ async def research_query(
     history_store: QueryHistoryStore = Depends(get_query_history_store),
     metrics_aggregator: MetricsAggregator = Depends(get_metrics_aggregator),
 ) -> ResearchResponse:
+    # Retrieval and generation block on Bedrock and the vector store; running
+    # them in threads lets concurrent queries share query embedding batches.
     retrieval_start = time.perf_counter()
-    documents = retrieval_service.retrieve(payload)
+    documents = await asyncio.to_thread(retrieval_service.retrieve, payload)
     retrieval_latency_ms = (time.perf_counter() - retrieval_start) * 1000
     await metrics_aggregator.record_retrieval(retrieval_latency_ms)
 
     generation_start = time.perf_counter()
-    response = generation_service.generate(payload, documents)
+    response = await asyncio.to_thread(generation_service.generate, payload, documents)
     generation_latency_ms = (time.perf_counter() - generation_start) * 1000
     await metrics_aggregator.record_generation(generation_latency_ms)
 
@@ -191,14 +217,57 @@ async def research_query(
     return response
 
 
+@router.post("/query/batch", response_model=BatchResearchResponse, tags=["research"])
+async def batch_research_query(
+    payload: BatchResearchQuery,
+    settings: Settings = Depends(get_settings),
+    retrieval_service: RetrievalService = Depends(get_retrieval_service),
+    generation_service: GenerationService = Depends(get_generation_service),
+    history_store: QueryHistoryStore = Depends(get_query_history_store),
+    metrics_aggregator: MetricsAggregator = Depends(get_metrics_aggregator),
+) -> BatchResearchResponse:
+    if len(payload.queries) > settings.max_batch_queries:
+        raise HTTPException(status_code=400, detail=f"At most {settings.max_batch_queries} queries per batch")
+
+    # One embedding call and one vector store pass for the whole batch.
+    retrieval_start = time.perf_counter()
+    batch_documents = await asyncio.to_thread(retrieval_service.retrieve_batch, payload.queries)
+    retrieval_latency_ms = (time.perf_counter() - retrieval_start) * 1000
+    for _ in payload.queries:
+        await metrics_aggregator.record_retrieval(retrieval_latency_ms / len(payload.queries))
+
+    semaphore = asyncio.Semaphore(max(settings.batch_generation_concurrency, 1))
+
+    async def answer(query, documents) -> ResearchResponse:
+        async with semaphore:
+            generation_start = time.perf_counter()
+            response = await asyncio.to_thread(generation_service.generate, query, documents)
+            await metrics_aggregator.record_generation((time.perf_counter() - generation_start) * 1000)
+        await history_store.add(
+            QueryHistoryRecord(
+                id=str(uuid4()),
+                question=query.question,
+                answer=response.answer,
+                created_at=datetime.utcnow(),
+                metadata=response.metadata,
+            )
+        )
+        return response
+
+    responses = await asyncio.gather(
+        *(answer(query, documents) for query, documents in zip(payload.queries, batch_documents))
+    )
+    return BatchResearchResponse(results=list(responses))
+
+
 @router.post("/query/chat", response_model=ResearchResponse, tags=["research"])
 async def chat_query(
     payload: ResearchQuery,
     retrieval_service: RetrievalService = Depends(get_retrieval_service),
     generation_service: GenerationService = Depends(get_generation_service),
 ) -> ResearchResponse:
-    documents = retrieval_service.retrieve(payload)
-    return generation_service.generate(payload, documents)
+    documents = await asyncio.to_thread(retrieval_service.retrieve, payload)
+    return await asyncio.to_thread(generation_service.generate, payload, documents)
 
 
 @router.get("/query/history", tags=["research"])
@@ -43,11 +43,37 @@ class Settings(BaseSettings):
     )
     bedrock_max_tokens: int = Field(4096, env="BEDROCK_MAX_TOKENS")
     bedrock_temperature: float = Field(0.2, env="BEDROCK_TEMPERATURE")
+    embedding_backend: str = Field("bedrock", env="EMBEDDING_BACKEND")
+    embedding_dimension: int = Field(1536, env="EMBEDDING_DIMENSION")
+    local_embedding_idf_path: Optional[str] = Field(None, env="LOCAL_EMBEDDING_IDF_PATH")
+    embedding_cache_path: str = Field("data/embedding_cache.sqlite3", env="EMBEDDING_CACHE_PATH")
+    embedding_cache_max_mb: int = Field(512, env="EMBEDDING_CACHE_MAX_MB")
+    embedding_workers: int = Field(4, env="EMBEDDING_WORKERS")
+    embedding_requests_per_second: float = Field(20.0, env="EMBEDDING_REQUESTS_PER_SECOND")
+    query_embedding_cache_size: int = Field(1024, env="QUERY_EMBEDDING_CACHE_SIZE")
+    embedding_batch_size: int = Field(10, env="EMBEDDING_BATCH_SIZE")
+    query_batch_max_wait_ms: float = Field(5.0, env="QUERY_BATCH_MAX_WAIT_MS")
 
     # ------------------------------------------------------------------
     # Local vector store configuration
     # ------------------------------------------------------------------
+    vector_store_backend: str = Field("json", env="VECTOR_STORE_BACKEND")
     vector_store_path: str = Field("data/vector_store.json", env="VECTOR_STORE_PATH")
+    lexical_snapshot_writes: int = Field(64, env="LEXICAL_SNAPSHOT_WRITES")
+    mapped_store_path: str = Field("data/vector_index", env="MAPPED_STORE_PATH")
+    mapped_store_flush_rows: int = Field(2048, env="MAPPED_STORE_FLUSH_ROWS")
+    mapped_store_max_segments: int = Field(8, env="MAPPED_STORE_MAX_SEGMENTS")
+    ann_enabled: bool = Field(False, env="ANN_ENABLED")
+    ann_nlist: int = Field(0, env="ANN_NLIST")
+    ann_nprobe: int = Field(8, env="ANN_NPROBE")
+    ann_train_threshold: int = Field(20000, env="ANN_TRAIN_THRESHOLD")
+    vector_quantization: str = Field("none", env="VECTOR_QUANTIZATION")
+    pq_subspaces: int = Field(16, env="PQ_SUBSPACES")
+    quantization_rerank_factor: int = Field(4, env="QUANTIZATION_RERANK_FACTOR")
+    sharded_store_path: str = Field("data/vector_shards", env="SHARDED_STORE_PATH")
+    vector_store_shards: int = Field(4, env="VECTOR_STORE_SHARDS")
+    shard_search_workers: int = Field(4, env="SHARD_SEARCH_WORKERS")
+    sqlite_store_path: str = Field("data/vector_store.sqlite3", env="SQLITE_STORE_PATH")
 
     # ------------------------------------------------------------------
     # S3 document storage
@@ -55,6 +81,7 @@ class Settings(BaseSettings):
     s3_bucket: str = Field("your-research-corpus-bucket", env="S3_BUCKET")
     s3_prefix: str = Field("documents/", env="S3_PREFIX")
     s3_multipart_chunksize_mb: int = Field(32, env="S3_MULTIPART_CHUNKSIZE_MB")
+    s3_upload_concurrency: int = Field(4, env="S3_UPLOAD_CONCURRENCY")
 
     # ------------------------------------------------------------------
     # Document ingestion controls
@@ -69,6 +96,18 @@ class Settings(BaseSettings):
     duplicate_detection_threshold: float = Field(
         0.92, env="DUPLICATE_DETECTION_THRESHOLD"
     )
+    near_duplicate_policy: str = Field("merge", env="NEAR_DUPLICATE_POLICY")
+    minhash_permutations: int = Field(128, env="MINHASH_PERMUTATIONS")
+    minhash_bands: int = Field(16, env="MINHASH_BANDS")
+    minhash_shingle_size: int = Field(5, env="MINHASH_SHINGLE_SIZE")
+    ingestion_extract_workers: int = Field(2, env="INGESTION_EXTRACT_WORKERS")
+    ingestion_embed_workers: int = Field(2, env="INGESTION_EMBED_WORKERS")
+    ingestion_store_workers: int = Field(2, env="INGESTION_STORE_WORKERS")
+    ingestion_queue_size: int = Field(4, env="INGESTION_QUEUE_SIZE")
+    extraction_processes: int = Field(2, env="EXTRACTION_PROCESSES")
+    extraction_timeout_seconds: float = Field(120.0, env="EXTRACTION_TIMEOUT_SECONDS")
+    pdf_pages_per_task: int = Field(50, env="PDF_PAGES_PER_TASK")
+    upload_spool_memory_mb: int = Field(8, env="UPLOAD_SPOOL_MEMORY_MB")
 
     # ------------------------------------------------------------------
     # Retrieval parameters
@@ -76,6 +115,9 @@ class Settings(BaseSettings):
     hybrid_search_weight: float = Field(0.6, env="HYBRID_SEARCH_WEIGHT")
     max_retrieval_results: int = Field(25, env="MAX_RETRIEVAL_RESULTS")
     rerank_top_k: int = Field(10, env="RERANK_TOP_K")
+    two_stage_top_documents: int = Field(0, env="TWO_STAGE_TOP_DOCUMENTS")
+    max_batch_queries: int = Field(100, env="MAX_BATCH_QUERIES")
+    batch_generation_concurrency: int = Field(4, env="BATCH_GENERATION_CONCURRENCY")
     metadata_filter_fields: List[str] = Field(
         default_factory=lambda: ["year", "journal", "authors"],
         env="METADATA_FILTER_FIELDS",
@@ -8,14 +8,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.endpoints import router as api_router
-from app.api.dependencies import get_settings
-from app.services.vector_store import LocalVectorStore
+from app.api.dependencies import get_settings, get_vector_store
 from app.utils.chunking import Chunk
 from app.utils.embedding import EmbeddingService
 
 
 def _seed_sample_documents(settings) -> None:
-    vector_store = LocalVectorStore(settings.vector_store_path)
+    vector_store = get_vector_store()
     if vector_store.list_documents():
         return
 
@@ -80,7 +79,6 @@ def _seed_sample_documents(settings) -> None:
 
     for sample in samples:
         chunks = []
-        embeddings = []
         for idx, content in enumerate(sample["chunks"]):
             chunk_metadata = {
                 **sample["metadata"],
@@ -89,7 +87,7 @@ def _seed_sample_documents(settings) -> None:
             }
             chunk = Chunk(content=content, position=idx, metadata=chunk_metadata)
             chunks.append(chunk)
-            embeddings.append(EmbeddingService.generate_local_embedding(content))
+        embeddings = EmbeddingService.generate_local_embeddings(sample["chunks"])
 
         vector_store.add_document(
             document_id=sample["document_id"],
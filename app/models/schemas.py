@@ -25,6 +25,10 @@ class ResearchQuery(BaseModel):
     max_results: int = Field(10, ge=1, le=50)
 
 
+class BatchResearchQuery(BaseModel):
+    queries: List[ResearchQuery] = Field(..., min_items=1)
+
+
 class ResearchResponse(BaseModel):
     answer: str
     sources: List[Citation]
@@ -37,6 +41,10 @@ class ResearchResponse(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
+class BatchResearchResponse(BaseModel):
+    results: List[ResearchResponse]
+
+
 class DocumentMetadata(BaseModel):
     title: Optional[str]
     authors: List[str] = Field(default_factory=list)
@@ -50,6 +58,7 @@ class DocumentUploadResponse(BaseModel):
     document_id: str
     chunks_indexed: int
     duplicate: bool
+    near_duplicate_of: Optional[str] = None
 
 
 class BatchIngestionResponse(BaseModel):
@@ -73,6 +82,10 @@ class MetricsResponse(BaseModel):
     retrieval_latency_ms: float
     generation_latency_ms: float
     documents_indexed: int
+    embedding_cache: Optional[Dict[str, float]] = None
+    query_embedding_cache: Optional[Dict[str, float]] = None
+    query_embedding_batches: Optional[Dict[str, float]] = None
+    ingestion_pipeline: Optional[Dict[str, Dict[str, float]]] = None
 
 
 class HealthResponse(BaseModel):
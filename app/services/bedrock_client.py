@@ -12,9 +12,12 @@ from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
 
 from app.core.config import settings
+from app.utils.rate_limiter import AdaptiveRateLimiter
 
 logger = logging.getLogger(__name__)
 
+_THROTTLING_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException"}
+
 
 class BedrockClient:
     """Wrapper around boto3 Bedrock runtime APIs."""
@@ -24,9 +27,20 @@ class BedrockClient:
         region_name: Optional[str] = None,
         max_retries: int = 3,
         backoff_factor: float = 0.5,
+        max_pool_connections: Optional[int] = None,
     ) -> None:
         region = region_name or settings.aws_region
-        config = Config(region_name=region, retries={"max_attempts": max_retries})
+        # Embedding workers and concurrent generation calls each hold a
+        # connection; botocore's default pool of 10 would make them queue.
+        if max_pool_connections is None:
+            max_pool_connections = max(10, settings.embedding_workers + settings.batch_generation_concurrency)
+        # Retries are done in ``_invoke`` rather than by botocore, so every
+        # throttle reaches the caller's rate limiter and it can back off.
+        config = Config(
+            region_name=region,
+            retries={"total_max_attempts": 1, "mode": "standard"},
+            max_pool_connections=max_pool_connections,
+        )
 
         session = boto3.Session(
             aws_access_key_id=settings.aws_access_key_id,
@@ -61,12 +75,24 @@ class BedrockClient:
 
         return self._invoke(model_id, payload)
 
-    def invoke_embedding_model(self, model_id: str, inputs: Iterable[str]) -> Dict[str, Any]:
+    def invoke_embedding_model(
+        self,
+        model_id: str,
+        inputs: Iterable[str],
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+    ) -> Dict[str, Any]:
         payload = {"inputText": list(inputs)}
-        return self._invoke(model_id, payload)
+        return self._invoke(model_id, payload, rate_limiter)
 
-    def _invoke(self, model_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    def _invoke(
+        self,
+        model_id: str,
+        payload: Dict[str, Any],
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+    ) -> Dict[str, Any]:
         for attempt in range(1, self._max_retries + 1):
+            if rate_limiter is not None:
+                rate_limiter.acquire()
             try:
                 response = self._client.invoke_model(
                     modelId=model_id,
@@ -79,8 +105,16 @@ class BedrockClient:
                     parsed = json.loads(body.read())
                 else:
                     parsed = json.loads(body)
+                if rate_limiter is not None:
+                    rate_limiter.succeeded()
                 return parsed
             except (BotoCoreError, ClientError) as exc:
+                if (
+                    rate_limiter is not None
+                    and isinstance(exc, ClientError)
+                    and exc.response.get("Error", {}).get("Code") in _THROTTLING_CODES
+                ):
+                    rate_limiter.throttled()
                 logger.warning(
                     "Bedrock invocation failed on attempt %s/%s: %s",
                     attempt,
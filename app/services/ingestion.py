@@ -2,40 +2,47 @@
 
 from __future__ import annotations
 
-import hashlib
-import io
 import logging
 import mimetypes
+import threading
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import BinaryIO, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 import boto3
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import BotoCoreError, ClientError
 
 from app.core.config import settings
-from app.services.vector_store import LocalVectorStore
+from app.services.vector_store import LocalVectorStore, VectorStore
 from app.utils.chunking import Chunk, Chunker
+from app.utils.document_extraction import ExtractionPool, Pages, extract_document
 from app.utils.embedding import EmbeddingService
+from app.utils.minhash import LSHIndex, document_signature
+from app.utils.pipeline import Pipeline, Stage, failed, finished
+from app.utils.upload_spool import SpooledUpload
 
 logger = logging.getLogger(__name__)
 
 
-try:
-    import pdfplumber
-except ImportError:  # pragma: no cover - optional dependency
-    pdfplumber = None
-
-try:
-    import docx
-except ImportError:  # pragma: no cover - optional dependency
-    docx = None
-
-
 @dataclass
 class IngestionResult:
     document_id: str
     chunks_indexed: int
     duplicate: bool
+    near_duplicate_of: Optional[str] = None
+
+
+@dataclass
+class _PreparedDocument:
+    """A parsed, chunked document moving through the ingestion stages."""
+
+    upload: SpooledUpload
+    filename: str
+    document_id: str
+    metadata: Dict[str, str]
+    chunks: List[Chunk]
+    embeddings: Optional[List[List[float]]] = None
 
 
 class DocumentIngestionService:
@@ -46,7 +53,8 @@ class DocumentIngestionService:
         embedding_service: EmbeddingService,
         chunker: Chunker,
         s3_client: Optional[boto3.client] = None,
-        vector_store: Optional[LocalVectorStore] = None,
+        vector_store: Optional[VectorStore] = None,
+        extraction_pool: Optional[ExtractionPool] = None,
     ) -> None:
         self.embedding_service = embedding_service
         self.chunker = chunker
@@ -58,77 +66,229 @@ class DocumentIngestionService:
             region_name=settings.aws_region,
         )
         self.vector_store = vector_store or LocalVectorStore(settings.vector_store_path)
+        # Files over one part are uploaded in parts, several at a time, read
+        # straight from the spooled upload.
+        part_size = settings.s3_multipart_chunksize_mb * 1024 * 1024
+        self._transfer_config = TransferConfig(
+            multipart_threshold=part_size,
+            multipart_chunksize=part_size,
+            max_concurrency=settings.s3_upload_concurrency,
+        )
+        # Batch ingestion extracts PDF/DOCX text in worker processes when a
+        # pool is given; single uploads stay in-process.
+        self.extraction_pool = extraction_pool
+        # Guards the batch-local near-duplicate indexes shared by extract workers.
+        self._batch_signatures_lock = threading.Lock()
+        # extract -> embed -> store, each with its own workers; documents in
+        # a batch overlap across stages and bounded queues cap how many are
+        # held in memory at once.
+        self._pipeline = Pipeline(
+            [
+                Stage(
+                    "extract",
+                    self._prepare_batch_item,
+                    # Enough threads to keep every extraction process busy.
+                    max(settings.ingestion_extract_workers, extraction_pool.processes if extraction_pool else 0),
+                ),
+                Stage("embed", self._embed, settings.ingestion_embed_workers),
+                Stage("store", self._store, settings.ingestion_store_workers),
+            ],
+            queue_size=settings.ingestion_queue_size,
+        )
 
     def ingest_document(
         self,
-        document_stream: io.BytesIO,
+        document_stream: Union[BinaryIO, SpooledUpload],
         filename: str,
         metadata: Optional[Dict[str, str]] = None,
     ) -> IngestionResult:
+        """Ingest one document, given as a binary stream or an already spooled upload.
+
+        Streams are spooled here, hashing as they are copied. The upload is
+        closed, and any temporary file removed, once ingestion is done.
+        """
+
+        if isinstance(document_stream, SpooledUpload):
+            upload = document_stream
+        else:
+            upload = SpooledUpload.from_stream(document_stream)
+        with upload:
+            prepared = self._prepare(upload, filename, metadata)
+            if isinstance(prepared, IngestionResult):
+                return prepared
+            return self._store(self._embed(prepared))
+
+    def ingest_batch(
+        self,
+        documents: Iterable[Tuple[BinaryIO, str, Dict[str, str]]],
+    ) -> List[IngestionResult]:
+        """Ingest ``documents`` through the staged pipeline.
+
+        Results are in input order; documents that fail are logged and left
+        out. ``documents`` is read lazily, so a generator opening files on
+        demand keeps memory bounded by the pipeline's queues. A document
+        merged into another one from the batch that then fails is ingested
+        on its own once the batch is done.
+        """
+
+        seen: Set[str] = set()
+        # Near-duplicates need chunked text, so they are caught within the
+        # batch by the extract stage: the first of a pair to get there wins.
+        signatures = LSHIndex()
+        filenames: List[str] = []
+        metadatas: List[Dict[str, str]] = []
+        hashes: Dict[int, str] = {}
+        repeated: Set[int] = set()
+        uploads: Dict[int, SpooledUpload] = {}
+        # Uploads of documents merged into another one from the batch, kept
+        # until it is known whether that one was ingested.
+        merged: Dict[int, SpooledUpload] = {}
+
+        def items():
+            # Hashing here, in input order, lets the first copy of a document
+            # repeated within the batch win even though extraction runs in
+            # parallel and neither copy is in the store yet.
+            for index, (stream, filename, metadata) in enumerate(documents):
+                filenames.append(filename)
+                metadatas.append(metadata)
+                try:
+                    upload = uploads[index] = SpooledUpload.from_stream(stream)
+                except Exception as exc:
+                    # One unreadable stream fails only its own document.
+                    yield failed(exc)
+                    continue
+                hashes[index] = upload.sha256
+                if upload.sha256 in seen:
+                    repeated.add(index)
+                seen.add(upload.sha256)
+                yield upload, filename, metadata, index in repeated, signatures
+
+        def release(index: int, result: Optional[IngestionResult], error: Optional[BaseException]) -> None:
+            # Closed as soon as the document leaves the pipeline, even while
+            # its result waits behind a slower earlier document, unless it was
+            # merged into another document from the batch.
+            upload = uploads.pop(index, None)
+            if upload is None:
+                return
+            if error is None and result.duplicate and (index in repeated or result.near_duplicate_of in seen):
+                merged[index] = upload
+            else:
+                upload.close()
+
+        outcomes: List[Optional[IngestionResult]] = []
+        failed_ids: Set[str] = set()
+        try:
+            for index, (result, error) in enumerate(self._pipeline.run(items(), on_done=release)):
+                if error is not None:
+                    logger.error("Failed to ingest %s: %s", filenames[index], error)
+                    if index in hashes:
+                        failed_ids.add(hashes[index])
+                outcomes.append(result)
+            for index in sorted(merged):
+                upload = merged.pop(index)
+                result = outcomes[index]
+                if (result.near_duplicate_of or result.document_id) not in failed_ids:
+                    upload.close()
+                    continue
+                try:
+                    outcomes[index] = self.ingest_document(upload, filenames[index], metadatas[index])
+                except Exception as exc:
+                    logger.error("Failed to ingest %s: %s", filenames[index], exc)
+                    outcomes[index] = None
+        finally:
+            for upload in merged.values():
+                upload.close()
+        return [result for result in outcomes if result is not None]
+
+    def pipeline_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage throughput and queue depth of batch ingestion."""
+
+        return self._pipeline.stats()
+
+    # ------------------------------------------------------------------
+    # Ingestion stages
+    # ------------------------------------------------------------------
+    def _prepare_batch_item(self, item: Tuple[SpooledUpload, str, Dict[str, str], bool, LSHIndex]):
+        prepared = self._prepare(*item, pooled=True)
+        return finished(prepared) if isinstance(prepared, IngestionResult) else prepared
+
+    def _prepare(
+        self,
+        upload: SpooledUpload,
+        filename: str,
+        metadata: Optional[Dict[str, str]] = None,
+        repeated_in_batch: bool = False,
+        batch_signatures: Optional[LSHIndex] = None,
+        pooled: bool = False,
+    ) -> Union[_PreparedDocument, IngestionResult]:
+        """De-duplicate, extract and chunk one spooled document."""
+
         metadata = metadata or {}
+        document_hash = upload.sha256
         extension = self._detect_extension(filename)
         if extension not in settings.supported_file_types:
             raise ValueError(f"Unsupported file type: {extension}")
 
-        document_bytes = document_stream.read()
-        document_hash = self._hash_document(document_bytes)
-
-        duplicate = self._check_duplicate(document_hash)
+        duplicate = repeated_in_batch or self._check_duplicate(document_hash)
         if duplicate:
             logger.info("Duplicate document detected: %s", filename)
             return IngestionResult(document_id=document_hash, chunks_indexed=0, duplicate=True)
 
-        text, extracted_metadata = self._extract_text_and_metadata(document_bytes, extension)
+        extracted_metadata, pages = self._extract_document(upload, extension, pooled)
         combined_metadata = {**metadata, **extracted_metadata, "document_id": document_hash}
 
-        chunks = self.chunker.chunk(text, combined_metadata)
+        chunks = self.chunker.chunk_pages(pages, combined_metadata)
         if not chunks:
             raise ValueError("Document produced no chunks after processing")
 
-        embeddings = self.embedding_service.embed(chunk.content for chunk in chunks)
+        # Checked before embedding, so a merged near-duplicate costs no Bedrock calls.
+        near_duplicate_of = self._check_near_duplicate(chunks, document_hash, batch_signatures)
+        if near_duplicate_of is not None:
+            if settings.near_duplicate_policy == "merge":
+                return IngestionResult(
+                    document_id=document_hash, chunks_indexed=0, duplicate=True, near_duplicate_of=near_duplicate_of
+                )
+            combined_metadata["near_duplicate_of"] = near_duplicate_of
+
+        return _PreparedDocument(upload, filename, document_hash, combined_metadata, chunks)
+
+    def _embed(self, document: _PreparedDocument) -> _PreparedDocument:
+        document.embeddings = self.embedding_service.embed(chunk.content for chunk in document.chunks)
+        return document
 
-        self._upload_to_s3(document_bytes, filename, combined_metadata)
+    def _store(self, document: _PreparedDocument) -> IngestionResult:
+        self._upload_to_s3(document.upload, document.filename, document.metadata)
         self.vector_store.add_document(
-            document_id=document_hash,
-            filename=filename,
-            document_metadata=combined_metadata,
-            chunks=chunks,
-            embeddings=embeddings,
+            document_id=document.document_id,
+            filename=document.filename,
+            document_metadata=document.metadata,
+            chunks=document.chunks,
+            embeddings=document.embeddings,
         )
 
         return IngestionResult(
-            document_id=document_hash,
-            chunks_indexed=len(chunks),
+            document_id=document.document_id,
+            chunks_indexed=len(document.chunks),
             duplicate=False,
+            near_duplicate_of=document.metadata.get("near_duplicate_of"),
         )
 
-    def ingest_batch(
-        self,
-        documents: Iterable[Tuple[io.BytesIO, str, Dict[str, str]]],
-    ) -> List[IngestionResult]:
-        results: List[IngestionResult] = []
-        for stream, filename, metadata in documents:
-            try:
-                results.append(self.ingest_document(stream, filename, metadata))
-            except Exception as exc:  # pragma: no cover - robust pipeline requirement
-                logger.exception("Failed to ingest %s: %s", filename, exc)
-        return results
-
     def _upload_to_s3(
         self,
-        document_bytes: bytes,
+        upload: SpooledUpload,
         filename: str,
         metadata: Dict[str, str],
     ) -> None:
         key = f"{settings.s3_prefix}{metadata.get('document_id')}/{filename}"
         try:
-            self.s3_client.put_object(
-                Bucket=settings.s3_bucket,
-                Key=key,
-                Body=document_bytes,
-                Metadata=metadata,
+            self.s3_client.upload_fileobj(
+                upload.open(),
+                settings.s3_bucket,
+                key,
+                ExtraArgs={"Metadata": metadata},
+                Config=self._transfer_config,
             )
-        except (BotoCoreError, ClientError) as exc:
+        except (BotoCoreError, ClientError, S3UploadFailedError) as exc:
             logger.exception("Failed to upload %s to S3: %s", filename, exc)
             raise
 
@@ -153,9 +313,32 @@ class DocumentIngestionService:
     def _check_duplicate(self, document_hash: str) -> bool:
         return self.vector_store.has_document(document_hash)
 
-    def _hash_document(self, document_bytes: bytes) -> str:
-        digest = hashlib.sha256(document_bytes).hexdigest()
-        return digest
+    def _check_near_duplicate(
+        self,
+        chunks: List[Chunk],
+        document_id: str,
+        batch_signatures: Optional[LSHIndex] = None,
+    ) -> Optional[str]:
+        """Id of a stored or same-batch document whose chunk shingles nearly match ``chunks``.
+
+        A document that matches nothing is added to ``batch_signatures``.
+        """
+
+        if settings.near_duplicate_policy == "off":
+            return None
+        threshold = settings.duplicate_detection_threshold
+        signature = document_signature(chunk.content for chunk in chunks)
+        match = self.vector_store.find_near_duplicate(signature, threshold)
+        if match is None and batch_signatures is not None:
+            with self._batch_signatures_lock:
+                match = batch_signatures.best_match(signature, threshold)
+                if match is None:
+                    batch_signatures.add(document_id, signature)
+        if match is None:
+            return None
+        document_id, similarity = match
+        logger.info("Near-duplicate of %s detected (estimated similarity %.2f)", document_id, similarity)
+        return document_id
 
     def _detect_extension(self, filename: str) -> str:
         extension = mimetypes.guess_extension(mimetypes.guess_type(filename)[0] or "")
@@ -163,43 +346,10 @@ class DocumentIngestionService:
             extension = filename[filename.rfind(".") :].lower()
         return extension or ""
 
-    def _extract_text_and_metadata(self, document_bytes: bytes, extension: str) -> Tuple[str, Dict[str, str]]:
-        if extension == ".pdf":
-            return self._extract_pdf(document_bytes)
-        if extension == ".docx":
-            return self._extract_docx(document_bytes)
-        return document_bytes.decode("utf-8", errors="ignore"), {}
-
-    def _extract_pdf(self, document_bytes: bytes) -> Tuple[str, Dict[str, str]]:
-        if pdfplumber is None:
-            raise RuntimeError("pdfplumber is required for PDF ingestion")
-
-        metadata: Dict[str, str] = {}
-        text_parts: List[str] = []
-        with pdfplumber.open(io.BytesIO(document_bytes)) as pdf:
-            doc_metadata = pdf.metadata or {}
-            for key in ["Title", "Author", "Subject", "Creator", "Producer", "CreationDate"]:
-                value = doc_metadata.get(key)
-                if value:
-                    metadata[key.lower()] = str(value)
-            for page_number, page in enumerate(pdf.pages, start=1):
-                page_text = page.extract_text() or ""
-                text_parts.append(page_text)
-                metadata[f"page_{page_number}_chars"] = str(len(page_text))
-
-        return "\n".join(text_parts), metadata
-
-    def _extract_docx(self, document_bytes: bytes) -> Tuple[str, Dict[str, str]]:
-        if docx is None:
-            raise RuntimeError("python-docx is required for DOCX ingestion")
-
-        document = docx.Document(io.BytesIO(document_bytes))
-        paragraphs = [paragraph.text for paragraph in document.paragraphs]
-        core_properties = document.core_properties
-        metadata = {
-            "title": core_properties.title or "",
-            "author": core_properties.author or "",
-            "created": core_properties.created.isoformat() if core_properties.created else "",
-        }
-        return "\n".join(paragraphs), metadata
-
+    def _extract_document(
+        self, upload: SpooledUpload, extension: str, pooled: bool = False
+    ) -> Tuple[Dict[str, str], Pages]:
+        if pooled and self.extraction_pool is not None:
+            # Workers open spooled files by path instead of receiving the bytes.
+            return self.extraction_pool.extract(upload.source(), extension)
+        return extract_document(upload.open(), extension)
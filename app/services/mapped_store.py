@@ -0,0 +1,1334 @@
+"""Log-structured columnar vector store backed by memory-mapped float32 segments.
+
+Embeddings live in immutable segments: contiguous ``float32`` files with one
+row per chunk, L2-normalised when written so cosine similarity for every chunk
+collapses into one matrix-vector product at query time. Each segment has a
+companion JSON file holding its documents, an offset-indexed content file with
+the row-aligned chunk text and metadata (read only for returned results), and
+a BM25 postings file for the lexical half of hybrid scoring. Per-document
+centroids and keyword summaries support an optional document-level first
+stage that narrows which chunks are scored, and per-document MinHash
+signatures are held in an in-memory LSH index for near-duplicate lookups.
+
+Writes never rewrite existing segments. New documents and deletions are
+appended to a write-ahead log (WAL) and held in an in-memory memtable; once the
+memtable grows past ``flush_threshold`` rows it is written out as a new
+segment. Deletions of documents that already live in a segment are recorded as
+tombstones in the manifest, and a background compaction merges segments and
+drops tombstoned documents. On startup the manifest is loaded and the WAL is
+replayed to recover writes that had not yet been flushed.
+
+Several processes may open the same directory. Every mutation holds an
+exclusive lock on ``writer.lock`` and first catches up with the manifest and
+WAL, so writers in different workers never lose each other's documents.
+Readers take no lock: segment files are immutable and memory-mapped, so all
+workers share their pages through the OS page cache.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.vector_store import (
+    VectorStore,
+    _batches,
+    _document_stage,
+    _keyword_summary,
+    _normalise_metadata,
+    _tokenise,
+    _top_k,
+)
+from app.utils.ann import IVFIndex, InvertedLists, default_nlist, sample_rows
+from app.utils.bm25 import CorpusStatistics, Postings, bm25_idf, normalise_scores
+from app.utils.chunking import Chunk
+from app.utils.file_lock import FileLock
+from app.utils.metadata_index import MetadataIndex
+from app.utils.minhash import LSHIndex, document_signature
+from app.utils.quantization import Quantizer, load_quantizer, train_quantizer
+from app.utils.record_file import RecordFile, write_records
+
+logger = logging.getLogger(__name__)
+
+_MANIFEST_FILE = "manifest.json"
+_WRITER_LOCK = "writer.lock"
+_MAINTENANCE_LOCK = "maintenance.lock"
+_SEGMENT_DIR = "segments"
+_MEMTABLE = "memtable"
+_POSTINGS_SUFFIX = "postings.npz"
+_CENTROIDS_SUFFIX = "centroids.npy"
+_CONTENT_SUFFIX = "content"
+_OFFSETS_SUFFIX = "offsets.npy"
+_QUANTIZER_MIN_TRAIN_ROWS = 1024
+
+
+def _normalise_rows(embeddings: List[List[float]], dimension: int) -> np.ndarray:
+    """Pack embeddings into an L2-normalised float32 matrix.
+
+    Rows whose length does not match ``dimension`` are stored as zeros so they
+    score 0.0, mirroring how the JSON store treats mismatched vectors.
+    """
+
+    matrix = np.zeros((len(embeddings), dimension), dtype=np.float32)
+    for row, embedding in enumerate(embeddings):
+        if len(embedding) != dimension:
+            logger.warning(
+                "Embedding dimension %s does not match store dimension %s; storing zero vector",
+                len(embedding),
+                dimension,
+            )
+            continue
+        matrix[row] = embedding
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def _serialise_chunk(chunk: Chunk) -> Dict:
+    return {
+        "chunk_id": chunk.chunk_id,
+        "position": chunk.position,
+        "content": chunk.content,
+        "metadata": _normalise_metadata(chunk.metadata),
+    }
+
+
+def _question_terms(question: str) -> List[str]:
+    return _tokenise(question) or [question.lower()]
+
+
+def _file_signature(stat: os.stat_result) -> Tuple[int, int, int]:
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _write_json(path: Path, payload: Dict) -> None:
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        json.dump(payload, handle, ensure_ascii=False)
+        handle.flush()
+        os.fsync(handle.fileno())
+    tmp_path.replace(path)
+
+
+class _Segment:
+    """Immutable group of documents with a row-aligned, normalised matrix.
+
+    Only what scoring needs stays in memory: the vectors (memory-mapped),
+    per-document metadata, filter and lexical indexes. Chunk text and
+    per-chunk metadata live in an offset-indexed ``.content`` file and are
+    read only for the rows a search returns. The memtable keeps its records
+    in a list instead.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        matrix: np.ndarray,
+        documents: Dict[str, Dict],
+        content: Union[List[Dict], RecordFile],
+        postings: Optional[Postings] = None,
+        centroids: Optional[np.ndarray] = None,
+    ) -> None:
+        self.name = name
+        self.matrix = matrix
+        self.documents = documents
+        self.content = content
+
+        self.lists: Optional[InvertedLists] = None
+        self.codes: Optional[np.ndarray] = None
+        if postings is None:
+            postings = Postings.build([_tokenise(record.get("content", "")) for record in self.chunk_records()])
+        self.postings = postings
+
+        self.doc_ids: List[str] = list(documents)
+        self.doc_index = {document_id: index for index, document_id in enumerate(self.doc_ids)}
+        self.row_doc = np.zeros(len(content), dtype=np.int32)
+        for document_id, details in documents.items():
+            self.row_doc[details["start"] : details["stop"]] = self.doc_index[document_id]
+        self.filters = MetadataIndex([details.get("metadata", {}) for details in documents.values()])
+
+        self.doc_keywords = [frozenset(details["keywords"]) for details in documents.values()]
+        self.centroids = centroids if centroids is not None else self._document_centroids()
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def _document_centroids(self) -> np.ndarray:
+        """Normalised mean of each document's (already normalised) rows."""
+
+        dimension = self.matrix.shape[1] if self.matrix.ndim == 2 else 0
+        centroids = np.zeros((len(self.doc_ids), dimension), dtype=np.float32)
+        starts = np.asarray([self.documents[document_id]["start"] for document_id in self.doc_ids], dtype=np.int64)
+        stops = np.asarray([self.documents[document_id]["stop"] for document_id in self.doc_ids], dtype=np.int64)
+        nonempty = np.flatnonzero(stops > starts)
+        if len(nonempty) and dimension:
+            centroids[nonempty] = np.add.reduceat(np.asarray(self.matrix), starts[nonempty], axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            np.divide(centroids, norms, out=centroids, where=norms > 0)
+        return centroids
+
+    def minhash(self, document_id: str) -> np.ndarray:
+        """MinHash signature of a document."""
+
+        signature = self._signatures.get(document_id)
+        if signature is None:
+            stored = self.documents[document_id]["minhash"]
+            signature = self._signatures[document_id] = np.asarray(stored, dtype=np.uint64)
+        return signature
+
+    @property
+    def rows(self) -> int:
+        return len(self.content)
+
+    def chunk_records(self, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+        stop = self.rows if stop is None else stop
+        if isinstance(self.content, list):
+            return self.content[start:stop]
+        return self.content.read_range(start, stop)
+
+    def result(self, row: int) -> Tuple[str, Dict, Dict[str, str]]:
+        """Fetch ``(document_id, chunk record, merged metadata)`` for one row."""
+
+        document_id = self.doc_ids[int(self.row_doc[row])]
+        record = self.content[row] if isinstance(self.content, list) else self.content.read(row)
+        metadata = {**self.documents[document_id].get("metadata", {}), **record.get("metadata", {})}
+        return document_id, record, metadata
+
+    def filter_mask(self, filters: Optional[Dict], metadata_filter_fields: List[str]) -> Optional[np.ndarray]:
+        """Rows whose document metadata passes ``filters`` (``None``: no filter)."""
+
+        document_mask = self.filters.mask(filters, metadata_filter_fields)
+        return None if document_mask is None else document_mask[self.row_doc]
+
+    def live_mask(self, dead: Set[str]) -> np.ndarray:
+        """Boolean row mask excluding rows of tombstoned documents."""
+
+        dead_indexes = [self.doc_index[document_id] for document_id in dead if document_id in self.doc_index]
+        if not dead_indexes:
+            return np.ones(self.rows, dtype=bool)
+        return ~np.isin(self.row_doc, dead_indexes)
+
+    def attach_ivf(self, assignments: np.ndarray, nlist: int) -> None:
+        self.lists = InvertedLists(assignments, nlist)
+
+    def sidecar(self, directory: Path, artifact_name: str) -> Path:
+        """Path of a derived per-segment array tied to a trained artifact."""
+
+        return directory / f"{self.name}.{artifact_name}"
+
+    @classmethod
+    def load(cls, directory: Path, name: str, dimension: Optional[int]) -> "_Segment":
+        with (directory / f"{name}.json").open("r", encoding="utf-8") as handle:
+            records = json.load(handle)
+        content = RecordFile(directory / f"{name}.{_CONTENT_SUFFIX}", directory / f"{name}.{_OFFSETS_SUFFIX}")
+
+        if len(content) and dimension:
+            matrix = np.memmap(
+                directory / f"{name}.f32", dtype=np.float32, mode="r", shape=(len(content), dimension)
+            )
+        else:
+            matrix = np.zeros((0, dimension or 0), dtype=np.float32)
+
+        postings = Postings.load(directory / f"{name}.{_POSTINGS_SUFFIX}")
+        centroids = np.load(directory / f"{name}.{_CENTROIDS_SUFFIX}", mmap_mode="r")
+        return cls(name, matrix, records["documents"], content, postings, centroids)
+
+    @classmethod
+    def write(
+        cls,
+        directory: Path,
+        name: str,
+        documents: Dict[str, Dict],
+        chunks: List[Dict],
+        matrix: np.ndarray,
+        postings: Optional[Postings] = None,
+    ) -> "_Segment":
+        vectors_path = directory / f"{name}.f32"
+        tmp_path = vectors_path.with_suffix(".tmp")
+        with tmp_path.open("wb") as handle:
+            handle.write(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+            handle.flush()
+            os.fsync(handle.fileno())
+        tmp_path.replace(vectors_path)
+        write_records(directory / f"{name}.{_CONTENT_SUFFIX}", directory / f"{name}.{_OFFSETS_SUFFIX}", chunks)
+        # Built in memory first, like the memtable, for the derived indexes.
+        built = cls(name, matrix, documents, chunks, postings)
+        built.postings.save(directory / f"{name}.{_POSTINGS_SUFFIX}")
+        centroids_path = directory / f"{name}.{_CENTROIDS_SUFFIX}"
+        tmp_path = centroids_path.with_suffix(".tmp")
+        with tmp_path.open("wb") as handle:
+            np.save(handle, built.centroids)
+            handle.flush()
+            os.fsync(handle.fileno())
+        tmp_path.replace(centroids_path)
+        _write_json(directory / f"{name}.json", {"documents": documents, "rows": len(chunks)})
+        return cls.load(directory, name, matrix.shape[1] if matrix.ndim == 2 else None)
+
+
+class MappedVectorStore(VectorStore):
+    """Vector store keeping embeddings in memory-mapped float32 segments.
+
+    Exposes the same interface as :class:`LocalVectorStore`. ``path`` is a
+    directory holding ``manifest.json``, the active WAL file and a
+    ``segments/`` directory of immutable ``.f32``/``.json``/``.content``
+    files and their derived sidecars. With ``create`` unset, only an existing
+    store is opened, and a missing one raises :class:`FileNotFoundError`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_threshold: int = settings.mapped_store_flush_rows,
+        max_segments: int = settings.mapped_store_max_segments,
+        ann_enabled: bool = settings.ann_enabled,
+        ann_nlist: int = settings.ann_nlist,
+        ann_nprobe: int = settings.ann_nprobe,
+        ann_train_threshold: int = settings.ann_train_threshold,
+        quantization: str = settings.vector_quantization,
+        pq_subspaces: int = settings.pq_subspaces,
+        rerank_factor: int = settings.quantization_rerank_factor,
+        top_documents: int = settings.two_stage_top_documents,
+        create: bool = True,
+    ) -> None:
+        self.path = Path(path)
+        self._segment_dir = self.path / _SEGMENT_DIR
+        self._manifest_path = self.path / _MANIFEST_FILE
+        self._create = create
+        if create:
+            self._segment_dir.mkdir(parents=True, exist_ok=True)
+        elif not self._manifest_path.exists():
+            raise FileNotFoundError(f"No mapped vector store at {self.path}")
+        self._flush_threshold = flush_threshold
+        self._max_segments = max_segments
+        self._ann_enabled = ann_enabled
+        self._ann_nlist = ann_nlist
+        self._ann_nprobe = ann_nprobe
+        self._ann_train_threshold = ann_train_threshold
+        self._quantization = quantization
+        self._pq_subspaces = pq_subspaces
+        self._rerank_factor = max(rerank_factor, 1)
+        self._top_documents = top_documents
+
+        self._lock = threading.Lock()
+        self._maintenance_lock = threading.Lock()
+        # Taken after ``_lock``; excludes writers in other processes.
+        self._file_lock = FileLock(self.path / _WRITER_LOCK)
+        self._maintenance_file_lock = FileLock(self.path / _MAINTENANCE_LOCK)
+        self._maintenance_thread: Optional[threading.Thread] = None
+
+        self._dimension: Optional[int] = None
+        self._next_id = 1
+        self._generation = 0
+        self._manifest_signature: Optional[Tuple[int, int, int]] = None
+        self._wal_name = ""
+        self._wal_offset = 0
+        self._wal = None
+        self._segments: List[_Segment] = []
+        self._tombstones: Dict[str, Set[str]] = {}
+        self._locations: Dict[str, str] = {}
+        self._pending: Dict[str, Dict] = {}
+        self._pending_rows = 0
+        self._memtable: Optional[_Segment] = None
+        self._near_duplicates = LSHIndex()
+        self._ivf: Optional[IVFIndex] = None
+        self._ivf_name: Optional[str] = None
+        self._ivf_trained_rows = 0
+        self._quantizer: Optional[Quantizer] = None
+        self._quantizer_name: Optional[str] = None
+
+        with self._file_lock:
+            self._load_manifest()
+            self._recover_wal()
+
+    # ------------------------------------------------------------------
+    # Persistence utilities
+    # ------------------------------------------------------------------
+    def _load_manifest(self) -> None:
+        """(Re)load the manifest, reusing already-mapped segments.
+
+        In-memory state is rebuilt from the manifest; the caller is expected to
+        replay the WAL it names afterwards.
+        """
+
+        if self._create and not self._manifest_path.exists():
+            self._wal_name = self._allocate_name("wal")
+            self._write_manifest()
+
+        with self._manifest_path.open("r", encoding="utf-8") as handle:
+            signature = _file_signature(os.fstat(handle.fileno()))
+            manifest = json.load(handle)
+
+        self._manifest_signature = signature
+        self._generation = manifest.get("generation", 0)
+        self._dimension = manifest.get("dimension")
+        self._next_id = manifest.get("next_id", 1)
+        self._tombstones = {name: set(ids) for name, ids in manifest.get("tombstones", {}).items()}
+
+        loaded = {segment.name: segment for segment in self._segments}
+        self._segments = [
+            loaded.get(name) or _Segment.load(self._segment_dir, name, self._dimension)
+            for name in manifest.get("segments", [])
+        ]
+        self._locations = {}
+        self._pending = {}
+        self._pending_rows = 0
+        self._memtable = None
+        self._near_duplicates = LSHIndex()
+        for segment in self._segments:
+            dead = self._tombstones.get(segment.name, set())
+            for document_id in segment.documents:
+                if document_id not in dead:
+                    self._locations[document_id] = segment.name
+                    self._near_duplicates.add(document_id, segment.minhash(document_id))
+
+        ivf = manifest.get("ivf") or {}
+        if ivf.get("name") != self._ivf_name:
+            self._ivf_name = ivf.get("name")
+            self._ivf = IVFIndex.load(self.path / self._ivf_name) if self._ivf_name else None
+            for segment in self._segments:
+                segment.lists = None
+        self._ivf_trained_rows = ivf.get("trained_rows", 0)
+        if self._ivf is not None:
+            for segment in self._segments:
+                if segment.lists is None:
+                    self._attach_segment_ivf(segment)
+
+        quantizer = manifest.get("quantizer") or {}
+        if quantizer.get("name") != self._quantizer_name:
+            self._quantizer_name = quantizer.get("name")
+            self._quantizer = load_quantizer(self.path / self._quantizer_name) if self._quantizer_name else None
+            for segment in self._segments:
+                segment.codes = None
+        if self._quantizer is not None:
+            for segment in self._segments:
+                if segment.codes is None:
+                    self._attach_segment_codes(segment)
+
+        if manifest["wal"] != self._wal_name or self._wal is None:
+            if self._wal is not None:
+                self._wal.close()
+            self._wal_name = manifest["wal"]
+            (self.path / self._wal_name).touch(exist_ok=True)
+            self._wal = (self.path / self._wal_name).open("ab")
+        self._wal_offset = 0
+
+    def _write_manifest(self) -> None:
+        self._generation += 1
+        _write_json(
+            self._manifest_path,
+            {
+                "generation": self._generation,
+                "dimension": self._dimension,
+                "segments": [segment.name for segment in self._segments],
+                "tombstones": {name: sorted(ids) for name, ids in self._tombstones.items() if ids},
+                "wal": self._wal_name,
+                "next_id": self._next_id,
+                "ivf": {"name": self._ivf_name, "trained_rows": self._ivf_trained_rows} if self._ivf_name else None,
+                "quantizer": {"name": self._quantizer_name} if self._quantizer_name else None,
+            },
+        )
+        self._manifest_signature = _file_signature(self._manifest_path.stat())
+
+    def _sidecar_array(self, segment: _Segment, artifact_name: str, compute) -> np.ndarray:
+        """Load a derived per-segment array, computing and persisting it if missing."""
+
+        sidecar = segment.sidecar(self._segment_dir, artifact_name)
+        if sidecar.exists():
+            return np.load(sidecar, mmap_mode="r")
+        values = compute()
+        tmp_path = sidecar.with_suffix(".tmp")
+        with tmp_path.open("wb") as handle:
+            np.save(handle, values)
+        tmp_path.replace(sidecar)
+        return values
+
+    def _attach_segment_ivf(self, segment: _Segment, assignments: Optional[np.ndarray] = None) -> None:
+        """Attach IVF lists to ``segment``, persisting assignments as a sidecar."""
+
+        values = self._sidecar_array(
+            segment,
+            self._ivf_name,
+            lambda: assignments if assignments is not None else self._ivf.assign(segment.matrix),
+        )
+        segment.attach_ivf(values, self._ivf.nlist)
+
+    def _attach_segment_codes(self, segment: _Segment, codes: Optional[np.ndarray] = None) -> None:
+        """Attach compressed codes to ``segment``, persisting them as a sidecar."""
+
+        segment.codes = self._sidecar_array(
+            segment,
+            f"{self._quantizer_name}.npy",
+            lambda: codes if codes is not None else self._quantizer.encode(segment.matrix),
+        )
+
+    def _allocate_name(self, prefix: str) -> str:
+        name = f"{prefix}-{self._next_id:06d}"
+        self._next_id += 1
+        return name if prefix != "wal" else f"{name}.log"
+
+    def _tail_wal(self) -> int:
+        """Apply complete WAL entries written since the last read.
+
+        Returns the number of entries applied. A trailing partial line is left
+        for the next call, since another process may still be writing it.
+        """
+
+        applied = 0
+        with (self.path / self._wal_name).open("rb") as handle:
+            handle.seek(self._wal_offset)
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                self._apply(entry)
+                self._wal_offset += len(line)
+                applied += 1
+        return applied
+
+    def _recover_wal(self) -> None:
+        """Replay the WAL and drop a torn tail; the caller holds the writer lock."""
+
+        wal_path = self.path / self._wal_name
+        replayed = self._tail_wal()
+        if wal_path.stat().st_size > self._wal_offset:
+            logger.warning("Discarding torn WAL tail in %s after %s entries", wal_path, replayed)
+            os.truncate(wal_path, self._wal_offset)
+        if replayed:
+            logger.info("Replayed %s WAL entries from %s", replayed, wal_path)
+
+    def _refresh(self) -> None:
+        """Bring in-memory state up to date with the files on disk.
+
+        Costs two ``stat`` calls when nothing changed. A new manifest
+        generation (flush or compaction by another process) maps only the new
+        segments; otherwise only WAL entries appended since the last read are
+        applied. Must be called with ``self._lock`` held.
+        """
+
+        try:
+            manifest_signature = _file_signature(self._manifest_path.stat())
+            wal_size = (self.path / self._wal_name).stat().st_size
+        except FileNotFoundError:
+            # A concurrent flush replaced the WAL; the manifest names the new one.
+            manifest_signature, wal_size = None, 0
+
+        if manifest_signature != self._manifest_signature or wal_size < self._wal_offset:
+            previous_generation = self._generation
+            for attempt in range(3):
+                try:
+                    self._load_manifest()
+                    break
+                except FileNotFoundError:
+                    # A compaction elsewhere removed files named by the manifest
+                    # we just read; the next manifest generation is already out.
+                    if attempt == 2:
+                        raise
+            self._tail_wal()
+            logger.debug("Reloaded manifest generation %s (was %s)", self._generation, previous_generation)
+        elif wal_size > self._wal_offset:
+            self._tail_wal()
+
+    def _log(self, entry: Dict) -> None:
+        self._wal.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+        self._wal_offset = self._wal.tell()
+
+    # ------------------------------------------------------------------
+    # In-memory state transitions (shared by live writes and WAL replay)
+    # ------------------------------------------------------------------
+    def _apply(self, entry: Dict) -> None:
+        document_id = entry["document_id"]
+        if entry["op"] == "remove":
+            self._unlink(document_id)
+            return
+
+        if entry.get("dimension") and self._dimension is None:
+            self._dimension = entry["dimension"]
+        vectors = base64.b64decode(entry.get("vectors", ""))
+        matrix = np.frombuffer(vectors, dtype=np.float32).reshape(len(entry["chunks"]), self._dimension or 0)
+        self._stage(document_id, entry["filename"], entry["metadata"], entry["chunks"], matrix, entry["minhash"])
+
+    def _stage(
+        self,
+        document_id: str,
+        filename: str,
+        document_metadata: Dict[str, str],
+        chunk_records: List[Dict],
+        matrix: np.ndarray,
+        minhash: List[int],
+    ) -> None:
+        self._unlink(document_id)
+        self._pending[document_id] = {
+            "filename": filename,
+            "metadata": document_metadata,
+            "chunks": chunk_records,
+            "matrix": matrix,
+            "lists": self._ivf.assign(matrix) if self._ivf is not None else None,
+            "codes": self._quantizer.encode(matrix) if self._quantizer is not None else None,
+            "keywords": _keyword_summary(chunk_records),
+            "minhash": minhash,
+        }
+        self._pending_rows += len(chunk_records)
+        self._locations[document_id] = _MEMTABLE
+        self._near_duplicates.add(document_id, minhash)
+        self._memtable = None
+
+    def _unlink(self, document_id: str) -> bool:
+        location = self._locations.pop(document_id, None)
+        if location is None:
+            return False
+        self._near_duplicates.remove(document_id)
+        if location == _MEMTABLE:
+            self._pending_rows -= len(self._pending.pop(document_id)["chunks"])
+            self._memtable = None
+        else:
+            self._tombstones.setdefault(location, set()).add(document_id)
+        return True
+
+    def _memtable_segment(self) -> _Segment:
+        memtable = self._memtable
+        if memtable is None:
+            documents: Dict[str, Dict] = {}
+            chunks: List[Dict] = []
+            matrices = []
+            for document_id, details in self._pending.items():
+                start = len(chunks)
+                chunks.extend(details["chunks"])
+                matrices.append(details["matrix"])
+                documents[document_id] = {
+                    "filename": details["filename"],
+                    "metadata": details["metadata"],
+                    "keywords": details["keywords"],
+                    "minhash": details["minhash"],
+                    "start": start,
+                    "stop": len(chunks),
+                }
+            matrix = np.vstack(matrices) if matrices else np.zeros((0, self._dimension or 0), dtype=np.float32)
+            memtable = _Segment(_MEMTABLE, matrix, documents, chunks)
+            if self._ivf is not None:
+                assignments = [
+                    details["lists"] if details["lists"] is not None else self._ivf.assign(details["matrix"])
+                    for details in self._pending.values()
+                ]
+                memtable.attach_ivf(np.concatenate(assignments), self._ivf.nlist)
+            if self._quantizer is not None:
+                codes = [
+                    details["codes"] if details["codes"] is not None else self._quantizer.encode(details["matrix"])
+                    for details in self._pending.values()
+                ]
+                memtable.codes = np.concatenate(codes)
+            self._memtable = memtable
+        return memtable
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+
+        memtable = self._memtable_segment()
+        name = self._allocate_name("seg")
+        segment = _Segment.write(
+            self._segment_dir, name, memtable.documents, memtable.content, memtable.matrix, memtable.postings
+        )
+        if self._ivf is not None:
+            self._attach_segment_ivf(segment, memtable.lists.assignments)
+        if self._quantizer is not None:
+            self._attach_segment_codes(segment, memtable.codes)
+
+        old_wal = self.path / self._wal_name
+        self._wal_name = self._allocate_name("wal")
+        self._segments.append(segment)
+        for document_id in segment.documents:
+            self._locations[document_id] = name
+        self._pending = {}
+        self._pending_rows = 0
+        self._memtable = None
+
+        # The manifest switch is the commit point: it names the new segment
+        # and a fresh, empty WAL in one atomic replace.
+        self._write_manifest()
+        self._wal.close()
+        self._wal = (self.path / self._wal_name).open("ab")
+        self._wal_offset = 0
+        old_wal.unlink(missing_ok=True)
+        logger.info("Flushed %s rows to segment %s", segment.rows, name)
+
+        self._maybe_schedule_maintenance()
+
+    # ------------------------------------------------------------------
+    # Background maintenance: compaction and ANN training
+    # ------------------------------------------------------------------
+    def _needs_compaction(self) -> bool:
+        if len(self._segments) > self._max_segments:
+            return True
+        total = sum(len(segment.documents) for segment in self._segments)
+        dead = sum(len(ids) for ids in self._tombstones.values())
+        return total > 0 and dead / total > 0.3
+
+    def _needs_ann_training(self) -> bool:
+        if not self._ann_enabled:
+            return False
+        rows = sum(segment.rows for segment in self._segments)
+        if self._ivf is None:
+            return rows >= self._ann_train_threshold
+        # Retrain once the corpus has grown well past what the lists were sized for.
+        return rows >= 4 * max(self._ivf_trained_rows, 1)
+
+    def _needs_quantizer_training(self) -> bool:
+        if self._quantization == "none":
+            return False
+        if self._quantizer is not None and self._quantizer.kind == self._quantization:
+            return False
+        return sum(segment.rows for segment in self._segments) >= _QUANTIZER_MIN_TRAIN_ROWS
+
+    def _maybe_schedule_maintenance(self) -> None:
+        if not (self._needs_compaction() or self._needs_ann_training() or self._needs_quantizer_training()):
+            return
+        if self._maintenance_thread is not None and self._maintenance_thread.is_alive():
+            return
+        self._maintenance_thread = threading.Thread(
+            target=self._run_maintenance, name="vector-store-maintenance", daemon=True
+        )
+        self._maintenance_thread.start()
+
+    def _run_maintenance(self) -> None:
+        # Only one process maintains a directory at a time; the others pick
+        # up its results from the manifest.
+        if not self._maintenance_file_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                self._refresh()
+                compaction = self._needs_compaction()
+                ann_training = self._needs_ann_training()
+                quantizer_training = self._needs_quantizer_training()
+            if compaction:
+                self.compact()
+            if ann_training:
+                self.rebuild_ann_index()
+            if quantizer_training:
+                self.train_quantizer()
+        except Exception:  # pragma: no cover - background safety net
+            logger.exception("Vector store maintenance failed")
+        finally:
+            self._maintenance_file_lock.release()
+
+    def rebuild_ann_index(self, sample_limit: int = 100_000) -> None:
+        """Train IVF centroids on the flushed segments and assign every row.
+
+        Training runs on a random sample of at most ``sample_limit`` rows
+        without holding the write lock.
+        """
+
+        with self._maintenance_lock:
+            sample, total = self._training_sample(sample_limit)
+            if total == 0:
+                return
+            nlist = self._ann_nlist or default_nlist(total)
+            ivf = IVFIndex.train(sample, nlist)
+
+            with self._lock, self._file_lock:
+                self._refresh()
+                ivf_name = f"{self._allocate_name('ivf')}.npy"
+                ivf.save(self.path / ivf_name)
+                previous = self._ivf_name
+                self._ivf, self._ivf_name, self._ivf_trained_rows = ivf, ivf_name, total
+                for segment in self._segments:
+                    self._attach_segment_ivf(segment)
+                for details in self._pending.values():
+                    details["lists"] = ivf.assign(details["matrix"])
+                self._memtable = None
+                self._write_manifest()
+
+            if previous:
+                (self.path / previous).unlink(missing_ok=True)
+                for sidecar in self._segment_dir.glob(f"*.{previous}"):
+                    sidecar.unlink(missing_ok=True)
+            logger.info("Trained IVF index with %s lists on %s of %s rows", ivf.nlist, len(sample), total)
+
+    def train_quantizer(self, sample_limit: int = 50_000) -> None:
+        """Train the configured quantizer and encode every stored row."""
+
+        if self._quantization == "none":
+            return
+        with self._maintenance_lock:
+            sample, total = self._training_sample(sample_limit)
+            if total == 0:
+                return
+            quantizer = train_quantizer(self._quantization, sample, pq_subspaces=self._pq_subspaces)
+
+            with self._lock, self._file_lock:
+                self._refresh()
+                name = f"{self._allocate_name(quantizer.kind)}.npz"
+                quantizer.save(self.path / name)
+                previous = self._quantizer_name
+                self._quantizer, self._quantizer_name = quantizer, name
+                for segment in self._segments:
+                    self._attach_segment_codes(segment)
+                for details in self._pending.values():
+                    details["codes"] = quantizer.encode(details["matrix"])
+                self._memtable = None
+                self._write_manifest()
+
+            if previous:
+                (self.path / previous).unlink(missing_ok=True)
+                for sidecar in self._segment_dir.glob(f"*.{previous}.npy"):
+                    sidecar.unlink(missing_ok=True)
+            logger.info(
+                "Trained %s quantizer: %.1f MB of float32 vectors held as %.1f MB of codes",
+                quantizer.kind,
+                total * (self._dimension or 0) * 4 / 1e6,
+                total * quantizer.code_bytes() / 1e6,
+            )
+
+    def _training_sample(self, sample_limit: int) -> Tuple[np.ndarray, int]:
+        """Return a random sample of flushed rows and the total row count."""
+
+        with self._lock:
+            segments = list(self._segments)
+        total = sum(segment.rows for segment in segments)
+        rows = sample_rows(total, sample_limit)
+        offsets = np.cumsum([0] + [segment.rows for segment in segments])
+        parts = [
+            np.asarray(segment.matrix[rows[(rows >= start) & (rows < stop)] - start])
+            for segment, start, stop in zip(segments, offsets[:-1], offsets[1:])
+        ]
+        sample = np.vstack(parts) if parts else np.zeros((0, self._dimension or 0), dtype=np.float32)
+        return sample, total
+
+    def compact(self) -> None:
+        """Merge every segment into one, dropping tombstoned documents."""
+
+        with self._maintenance_lock:
+            with self._lock, self._file_lock:
+                self._refresh()
+                inputs = list(self._segments)
+                dead_at_start = {segment.name: set(self._tombstones.get(segment.name, ())) for segment in inputs}
+                if len(inputs) <= 1 and not any(dead_at_start.values()):
+                    return
+                name = self._allocate_name("seg")
+                # Persist the allocation so other processes do not reuse the name.
+                self._write_manifest()
+
+            # The merge runs without the write lock; deletions that land in the
+            # meantime are carried over to the merged segment below.
+            documents: Dict[str, Dict] = {}
+            chunks: List[Dict] = []
+            matrices = []
+            assignments: Optional[List[np.ndarray]] = [] if all(s.lists is not None for s in inputs) else None
+            codes: Optional[List[np.ndarray]] = [] if all(s.codes is not None for s in inputs) else None
+            for segment in inputs:
+                dead = dead_at_start[segment.name]
+                for document_id, details in segment.documents.items():
+                    if document_id in dead:
+                        continue
+                    start = len(chunks)
+                    chunks.extend(segment.chunk_records(details["start"], details["stop"]))
+                    matrices.append(np.asarray(segment.matrix[details["start"] : details["stop"]]))
+                    if assignments is not None:
+                        assignments.append(segment.lists.assignments[details["start"] : details["stop"]])
+                    if codes is not None:
+                        codes.append(segment.codes[details["start"] : details["stop"]])
+                    documents[document_id] = {**details, "start": start, "stop": len(chunks)}
+            matrix = np.vstack(matrices) if matrices else np.zeros((0, self._dimension or 0), dtype=np.float32)
+            merged = _Segment.write(self._segment_dir, name, documents, chunks, matrix)
+            if self._ivf is not None:
+                merged_assignments = np.concatenate(assignments) if assignments else None
+                self._attach_segment_ivf(merged, merged_assignments)
+            if self._quantizer is not None:
+                self._attach_segment_codes(merged, np.concatenate(codes) if codes else None)
+
+            with self._lock, self._file_lock:
+                self._refresh()
+                input_names = {segment.name for segment in inputs}
+                if not input_names <= {segment.name for segment in self._segments}:
+                    # Another process compacted these segments first.
+                    for path in self._segment_dir.glob(f"{name}.*"):
+                        path.unlink(missing_ok=True)
+                    return
+                late_deletes: Set[str] = set()
+                for segment_name in input_names:
+                    late_deletes |= self._tombstones.pop(segment_name, set()) - dead_at_start[segment_name]
+                late_deletes &= set(documents)
+                if late_deletes:
+                    self._tombstones[name] = late_deletes
+
+                self._segments = [merged] + [s for s in self._segments if s.name not in input_names]
+                for document_id in documents:
+                    if self._locations.get(document_id) in input_names:
+                        self._locations[document_id] = name
+                self._write_manifest()
+
+            for segment_name in input_names:
+                for path in self._segment_dir.glob(f"{segment_name}.*"):
+                    path.unlink(missing_ok=True)
+            logger.info("Compacted %s segments into %s (%s rows)", len(inputs), name, merged.rows)
+
+    # ------------------------------------------------------------------
+    # Document management
+    # ------------------------------------------------------------------
+    def add_document(
+        self,
+        document_id: str,
+        filename: str,
+        document_metadata: Dict[str, str],
+        chunks: List[Chunk],
+        embeddings: List[List[float]],
+    ) -> None:
+        pairs = list(zip(chunks, embeddings))
+        chunk_records = [_serialise_chunk(chunk) for chunk, _ in pairs]
+        metadata = _normalise_metadata(document_metadata)
+        minhash = document_signature(record["content"] for record in chunk_records).tolist()
+
+        with self._lock, self._file_lock:
+            self._refresh()
+            if self._dimension is None and pairs:
+                self._dimension = next((len(embedding) for _, embedding in pairs if embedding), None)
+                if self._dimension is None:
+                    raise ValueError("Cannot index chunks without embeddings")
+            matrix = _normalise_rows([embedding for _, embedding in pairs], self._dimension or 0)
+
+            self._log(
+                {
+                    "op": "add",
+                    "document_id": document_id,
+                    "filename": filename,
+                    "metadata": metadata,
+                    "chunks": chunk_records,
+                    "dimension": self._dimension,
+                    "vectors": base64.b64encode(matrix.tobytes()).decode("ascii"),
+                    "minhash": minhash,
+                }
+            )
+            self._stage(document_id, filename, metadata, chunk_records, matrix, minhash)
+            if self._pending_rows >= self._flush_threshold:
+                self._flush_locked()
+
+    def remove_document(self, document_id: str) -> bool:
+        with self._lock, self._file_lock:
+            self._refresh()
+            if document_id not in self._locations:
+                return False
+            self._log({"op": "remove", "document_id": document_id})
+            self._unlink(document_id)
+            self._maybe_schedule_maintenance()
+            return True
+
+    def flush(self) -> None:
+        """Write the memtable out as a new segment and start a fresh WAL."""
+
+        with self._lock, self._file_lock:
+            self._refresh()
+            self._flush_locked()
+
+    def has_document(self, document_id: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return document_id in self._locations
+
+    def find_near_duplicate(self, signature: Sequence[int], threshold: float) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            self._refresh()
+            return self._near_duplicates.best_match(signature, threshold)
+
+    def export_document(self, document_id: str) -> Optional[Tuple[str, Dict[str, str], List[Chunk], np.ndarray]]:
+        """Return ``(filename, metadata, chunks, vectors)`` for a stored document."""
+
+        for segment, dead in self._live_segments():
+            details = segment.documents.get(document_id)
+            if details is None or document_id in dead:
+                continue
+            chunks = [
+                Chunk(
+                    content=record.get("content", ""),
+                    position=record.get("position"),
+                    metadata=record.get("metadata", {}),
+                    chunk_id=record.get("chunk_id"),
+                )
+                for record in segment.chunk_records(details["start"], details["stop"])
+            ]
+            vectors = np.asarray(segment.matrix[details["start"] : details["stop"]])
+            return details.get("filename", ""), details.get("metadata", {}), chunks, vectors
+        return None
+
+    def _live_segments(self) -> List[Tuple[_Segment, Set[str]]]:
+        with self._lock:
+            self._refresh()
+            view = [(segment, set(self._tombstones.get(segment.name, ()))) for segment in self._segments]
+            if self._pending:
+                view.append((self._memtable_segment(), set()))
+        return view
+
+    def list_documents(self) -> List[Dict[str, Optional[str]]]:
+        result = []
+        for segment, dead in self._live_segments():
+            for doc_id, details in segment.documents.items():
+                if doc_id in dead:
+                    continue
+                metadata = details.get("metadata", {})
+                year_value = metadata.get("year")
+                try:
+                    year_numeric = int(year_value) if year_value is not None else None
+                except (TypeError, ValueError):
+                    year_numeric = None
+                result.append(
+                    {
+                        "id": doc_id,
+                        "title": metadata.get("title"),
+                        "authors": metadata.get("authors"),
+                        "journal": metadata.get("journal"),
+                        "year": year_numeric,
+                        "chunks": details["stop"] - details["start"],
+                    }
+                )
+        return result
+
+    # ------------------------------------------------------------------
+    # Retrieval
+    # ------------------------------------------------------------------
+    def _normalised_query(self, query_embedding: List[float]) -> Optional[np.ndarray]:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if query.shape != (self._dimension,):
+            return None
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return None
+        return query / norm
+
+    @staticmethod
+    def _idf_weights(view: List[Tuple[_Segment, Set[str]]], terms: List[str]) -> Dict[str, float]:
+        total_rows = sum(segment.rows for segment, _ in view)
+        weights = {}
+        for term in set(terms):
+            frequency = sum(segment.postings.document_frequency(term) for segment, _ in view)
+            if frequency:
+                weights[term] = bm25_idf(frequency, total_rows)
+        return weights
+
+    def _document_masks(
+        self,
+        view: List[Tuple[_Segment, Set[str]]],
+        masks: List[np.ndarray],
+        query: Optional[np.ndarray],
+        weights: Dict[str, float],
+        hybrid_weight: float,
+    ) -> List[np.ndarray]:
+        """Row masks restricted to the ``top_documents`` best documents overall."""
+
+        candidates = [
+            (position, doc_index)
+            for position, ((segment, _), mask) in enumerate(zip(view, masks))
+            for doc_index in np.unique(segment.row_doc[mask]).tolist()
+        ]
+        if len(candidates) <= self._top_documents:
+            return masks
+        dimension = self._dimension or 0
+        centroids = np.stack(
+            [view[position][0].centroids[doc_index] for position, doc_index in candidates]
+        ).reshape(len(candidates), dimension)
+        keywords = [view[position][0].doc_keywords[doc_index] for position, doc_index in candidates]
+        selected = _document_stage(centroids, keywords, query, weights, hybrid_weight, self._top_documents)
+        chosen: Dict[int, List[int]] = {}
+        for index in selected.tolist():
+            position, doc_index = candidates[index]
+            chosen.setdefault(position, []).append(doc_index)
+        return [
+            mask & np.isin(segment.row_doc, chosen.get(position, []))
+            for position, ((segment, _), mask) in enumerate(zip(view, masks))
+        ]
+
+    @staticmethod
+    def _lexical_maximum(view: List[Tuple[_Segment, Set[str]]], raw: List[np.ndarray]) -> float:
+        return max(
+            (float(scores[segment.live_mask(dead)].max(initial=0.0)) for scores, (segment, dead) in zip(raw, view)),
+            default=0.0,
+        )
+
+    def _lexical_scores(
+        self,
+        view: List[Tuple[_Segment, Set[str]]],
+        terms: List[str],
+        corpus: Optional[CorpusStatistics] = None,
+    ) -> List[np.ndarray]:
+        """Per-segment BM25 scores scaled by the best live score in the store.
+
+        Corpus statistics (document frequencies, average length) include
+        tombstoned rows until compaction drops them. ``corpus`` replaces
+        them, and the best score, with values shared by several stores.
+        """
+
+        if corpus is None:
+            total_rows = sum(segment.rows for segment, _ in view)
+            if not total_rows:
+                return [np.zeros(0, dtype=np.float32) for _ in view]
+            average_length = sum(segment.postings.total_length for segment, _ in view) / total_rows
+            weights = self._idf_weights(view, terms)
+        else:
+            weights, average_length = corpus.weights, corpus.average_length
+
+        raw = [segment.postings.scores(weights, average_length) for segment, _ in view]
+        maximum = self._lexical_maximum(view, raw) if corpus is None else corpus.maximum
+        return [normalise_scores(scores, maximum) for scores in raw]
+
+    def lexical_statistics(self, question: str) -> Tuple[int, int, Dict[str, int]]:
+        """``(rows, total length, document frequency per term)`` for the question's terms.
+
+        Stores holding parts of one corpus combine these, and then
+        :meth:`lexical_maximum`, into the :class:`CorpusStatistics` they all
+        search with.
+        """
+
+        view = self._live_segments()
+        frequencies = {
+            term: sum(segment.postings.document_frequency(term) for segment, _ in view)
+            for term in set(_question_terms(question))
+        }
+        return (
+            sum(segment.rows for segment, _ in view),
+            sum(segment.postings.total_length for segment, _ in view),
+            frequencies,
+        )
+
+    def lexical_maximum(self, weights: Dict[str, float], average_length: float) -> float:
+        """Best raw BM25 score of a live chunk under shared ``weights`` and ``average_length``."""
+
+        view = self._live_segments()
+        return self._lexical_maximum(view, [segment.postings.scores(weights, average_length) for segment, _ in view])
+
+    def search(
+        self,
+        question: str,
+        query_embedding: List[float],
+        filters: Optional[Dict],
+        metadata_filter_fields: Iterable[str],
+        hybrid_weight: float,
+        top_k: int,
+        exact: bool = False,
+        corpus: Optional[CorpusStatistics] = None,
+    ) -> List[Dict]:
+        """Hybrid search over live chunks.
+
+        Metadata filters are resolved against per-segment indexes first, so
+        only the candidate rows are scored. With two-stage search enabled, the
+        candidates are further limited to the ``top_documents`` documents whose
+        centroid and keyword summary best match the query. When the ANN index
+        is enabled and trained, only chunks in the ``nprobe`` IVF lists
+        closest to the query are scored. ``exact=True`` skips the document
+        stage, ANN and quantization. When a quantizer is trained, chunks are first
+        scored from their compressed codes and the best ``top_k *
+        rerank_factor`` are re-scored from the full-precision vectors, which
+        are only read from disk for that shortlist. ``corpus`` gives BM25
+        statistics shared with other stores searched for the same query.
+        """
+
+        return self._search_view(
+            self._live_segments(),
+            question,
+            self._normalised_query(query_embedding),
+            filters,
+            list(metadata_filter_fields),
+            hybrid_weight,
+            top_k,
+            exact,
+            corpus=corpus,
+        )
+
+    def search_batch(
+        self,
+        questions: List[str],
+        query_embeddings: List[List[float]],
+        filters: Sequence[Optional[Dict]],
+        metadata_filter_fields: Iterable[str],
+        hybrid_weight: float,
+        top_k: int,
+        exact: bool = False,
+        corpora: Optional[Sequence[CorpusStatistics]] = None,
+    ) -> List[List[Dict]]:
+        """Search every question against one view of the store.
+
+        When scoring is exact (no trained ANN index or quantizer in play, or
+        ``exact`` set), each segment's vectors are multiplied by a whole block
+        of queries at once, so the mapped matrix is read once per block rather
+        than once per query. Otherwise queries run one by one on the shared
+        view.
+        """
+
+        view = self._live_segments()
+        filter_fields = list(metadata_filter_fields)
+        queries = [self._normalised_query(embedding) for embedding in query_embeddings]
+        dense = exact or not (self._quantizer is not None or (self._ann_enabled and self._ivf is not None))
+
+        results: List[List[Dict]] = []
+        for block in _batches(len(questions), sum(segment.rows for segment, _ in view)):
+            scored = [index for index in block if queries[index] is not None] if dense else []
+            products = None
+            if scored:
+                block_queries = np.stack([queries[index] for index in scored]).T
+                products = [np.asarray(segment.matrix @ block_queries) for segment, _ in view]
+            columns = {index: column for column, index in enumerate(scored)}
+            for index in block:
+                results.append(
+                    self._search_view(
+                        view,
+                        questions[index],
+                        queries[index],
+                        filters[index],
+                        filter_fields,
+                        hybrid_weight,
+                        top_k,
+                        exact,
+                        [part[:, columns[index]] for part in products] if index in columns else None,
+                        corpora[index] if corpora is not None else None,
+                    )
+                )
+        return results
+
+    def _search_view(
+        self,
+        view: List[Tuple[_Segment, Set[str]]],
+        question: str,
+        query: Optional[np.ndarray],
+        filters: Optional[Dict],
+        filter_fields: List[str],
+        hybrid_weight: float,
+        top_k: int,
+        exact: bool,
+        vector_scores: Optional[List[np.ndarray]] = None,
+        corpus: Optional[CorpusStatistics] = None,
+    ) -> List[Dict]:
+        """Search one view; ``vector_scores`` are precomputed exact scores per segment row."""
+
+        question_terms = _question_terms(question)
+        lexical = self._lexical_scores(view, question_terms, corpus)
+        ivf = self._ivf
+        probes = None
+        if self._ann_enabled and ivf is not None and query is not None and not exact and vector_scores is None:
+            probes = ivf.probe(query, self._ann_nprobe)
+        quantizer = self._quantizer if not exact and query is not None and vector_scores is None else None
+        rerank = False
+
+        filter_masks = [segment.filter_mask(filters, filter_fields) for segment, _ in view]
+        masks = [
+            segment.live_mask(dead) if filter_mask is None else segment.live_mask(dead) & filter_mask
+            for (segment, dead), filter_mask in zip(view, filter_masks)
+        ]
+        if self._top_documents > 0 and not exact:
+            weights = corpus.weights if corpus is not None else self._idf_weights(view, question_terms)
+            masks = self._document_masks(view, masks, query, weights, hybrid_weight)
+
+        scored: List[Tuple[np.ndarray, _Segment, np.ndarray, np.ndarray]] = []
+        for position, ((segment, _), segment_lexical, mask) in enumerate(zip(view, lexical, masks)):
+            # Selective filters or the document stage can leave fewer candidates
+            # than the probed lists would hold; scoring them all is cheaper and
+            # loses nothing.
+            probe_rows = segment.rows * len(probes) / ivf.nlist if probes is not None else 0
+            if probes is not None and segment.lists is not None and mask.sum() > probe_rows:
+                mask &= segment.lists.mask(probes)
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                continue
+            lexical_scores = segment_lexical[rows]
+            if query is None:
+                segment_scores = np.zeros(len(rows), dtype=np.float32)
+            elif vector_scores is not None:
+                segment_scores = vector_scores[position][rows]
+            elif quantizer is not None and segment.codes is not None:
+                segment_scores = quantizer.scores(segment.codes[rows], query)
+                rerank = True
+            else:
+                segment_scores = segment.matrix[rows] @ query
+            scores = hybrid_weight * segment_scores + (1 - hybrid_weight) * lexical_scores
+            scored.append((scores, segment, rows, lexical_scores))
+
+        if not scored:
+            return []
+
+        all_scores = np.concatenate([scored_part[0] for scored_part in scored])
+        owners = np.concatenate([np.full(len(part[0]), index) for index, part in enumerate(scored)])
+        all_rows = np.concatenate([scored_part[2] for scored_part in scored])
+
+        if rerank:
+            all_lexical = np.concatenate([scored_part[3] for scored_part in scored])
+            shortlist = _top_k(all_scores, top_k * self._rerank_factor)
+            for index in shortlist.tolist():
+                segment = scored[int(owners[index])][1]
+                vector_score = float(segment.matrix[int(all_rows[index])] @ query)
+                all_scores[index] = hybrid_weight * vector_score + (1 - hybrid_weight) * all_lexical[index]
+            order = shortlist[_top_k(all_scores[shortlist], top_k)]
+        else:
+            order = _top_k(all_scores, top_k)
+
+        results = []
+        for index in order:
+            segment = scored[int(owners[index])][1]
+            document_id, record, metadata = segment.result(int(all_rows[index]))
+            results.append(
+                {
+                    "document_id": document_id,
+                    "chunk": record,
+                    "metadata": metadata,
+                    "score": float(all_scores[index]),
+                }
+            )
+        return results
+
+
+def migrate_json_store(source_path: str, target_path: str) -> int:
+    """Copy a ``LocalVectorStore`` JSON file into a new mapped store.
+
+    Every document is written into a single segment without going through the
+    WAL. Returns the number of documents migrated. The target directory must
+    not already contain indexed documents.
+    """
+
+    with Path(source_path).open("r", encoding="utf-8") as handle:
+        data = json.load(handle)
+
+    store = MappedVectorStore(target_path)
+    with store._lock, store._file_lock:
+        store._refresh()
+        if store._locations:
+            raise ValueError(f"Target store at {target_path} is not empty")
+
+        migrated = 0
+        for document_id, details in data.get("documents", {}).items():
+            chunks = details.get("chunks", [])
+            if not chunks:
+                continue
+            embeddings = [chunk.get("embedding", []) for chunk in chunks]
+            if store._dimension is None:
+                store._dimension = next((len(embedding) for embedding in embeddings if embedding), None)
+            chunk_records = [
+                {
+                    "chunk_id": chunk.get("chunk_id"),
+                    "position": chunk.get("position"),
+                    "content": chunk.get("content", ""),
+                    "metadata": chunk.get("metadata", {}),
+                }
+                for chunk in chunks
+            ]
+            minhash = details.get("minhash")
+            if minhash is None:
+                minhash = document_signature(record["content"] for record in chunk_records).tolist()
+            store._stage(
+                document_id,
+                details.get("filename", ""),
+                details.get("metadata", {}),
+                chunk_records,
+                _normalise_rows(embeddings, store._dimension or 0),
+                minhash,
+            )
+            migrated += 1
+        store._flush_locked()
+
+    logger.info("Migrated %s documents from %s to %s", migrated, source_path, target_path)
+    return migrated
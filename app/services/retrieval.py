@@ -4,12 +4,12 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List
 
 from app.core.config import settings
 from app.models.schemas import Citation, ResearchQuery
 from app.utils.embedding import EmbeddingService
-from app.services.vector_store import LocalVectorStore
+from app.services.vector_store import VectorStore
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +52,7 @@ class RetrievalService:
     def __init__(
         self,
         embedding_service: EmbeddingService,
-        vector_store: LocalVectorStore,
+        vector_store: VectorStore,
         hybrid_weight: float = settings.hybrid_search_weight,
     ) -> None:
         self.embedding_service = embedding_service
@@ -60,7 +60,7 @@ class RetrievalService:
         self.hybrid_weight = hybrid_weight
 
     def retrieve(self, query: ResearchQuery) -> List[RetrievedDocument]:
-        vector = self.embedding_service.embed([query.question])[0]
+        vector = self.embedding_service.embed_queries([query.question])[0]
         top_k = max(query.max_results, settings.rerank_top_k)
         search_results = self.vector_store.search(
             question=query.question,
@@ -71,20 +71,37 @@ class RetrievalService:
             top_k=top_k,
         )
 
-        documents: Dict[str, RetrievedDocument] = {}
-        for result in search_results:
-            chunk = result["chunk"]
-            metadata = result["metadata"]
-            retrieved = RetrievedDocument(
-                chunk_id=chunk.get("chunk_id"),
+        documents = self._documents(search_results, query.max_results)
+        logger.debug("Vector store retrieval produced %s documents", len(documents))
+        return documents
+
+    def retrieve_batch(self, queries: List[ResearchQuery]) -> List[List[RetrievedDocument]]:
+        """Retrieve for several queries with one embedding call and one store pass."""
+
+        if not queries:
+            return []
+        vectors = self.embedding_service.embed_queries([query.question for query in queries])
+        top_k = max(max(query.max_results for query in queries), settings.rerank_top_k)
+        search_results = self.vector_store.search_batch(
+            questions=[query.question for query in queries],
+            query_embeddings=vectors,
+            filters=[query.filters for query in queries],
+            metadata_filter_fields=settings.metadata_filter_fields,
+            hybrid_weight=self.hybrid_weight,
+            top_k=top_k,
+        )
+        return [self._documents(results, query.max_results) for query, results in zip(queries, search_results)]
+
+    @staticmethod
+    def _documents(search_results: List[Dict], max_results: int) -> List[RetrievedDocument]:
+        # The store returns unique chunks already ordered by score.
+        return [
+            RetrievedDocument(
+                chunk_id=result["chunk"].get("chunk_id"),
                 score=result["score"],
-                content=chunk.get("content", ""),
-                metadata=metadata,
+                content=result["chunk"].get("content", ""),
+                metadata=result["metadata"],
             )
-            documents[retrieved.chunk_id] = retrieved
-
-        reranked = sorted(documents.values(), key=lambda doc: doc.score, reverse=True)
-        top_k = reranked[: query.max_results]
-        logger.debug("Vector store retrieval produced %s documents", len(top_k))
-        return top_k
+            for result in search_results[:max_results]
+        ]
 
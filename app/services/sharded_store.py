@@ -0,0 +1,375 @@
+"""Vector store partitioned across several mapped shard stores.
+
+Documents are assigned to shards by rendezvous (highest-random-weight) hashing
+of their ``document_id``: every shard gets a hash-derived weight for a
+document and the heaviest shard owns it. Adding or removing a shard therefore
+only moves the documents that shard wins or held, roughly ``1/N`` of the
+corpus.
+
+Writes go through this process. Searches are fanned out to a process pool in
+which every worker maps the shard directories read-only; each shard returns
+its own top-k and the lists are merged here. BM25 document frequencies,
+average chunk length and the best score used to scale it are first gathered
+from every shard, so lexical scores from different shards are comparable.
+
+Rebalancing copies a moving document into its new shard before deleting it
+from the old one, so it is always searchable; results are de-duplicated by
+chunk id while a document briefly lives in both.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import logging
+import multiprocessing
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from app.core.config import settings
+from app.services.mapped_store import MappedVectorStore, _write_json
+from app.services.vector_store import VectorStore
+from app.utils.bm25 import CorpusStatistics, bm25_idf
+from app.utils.chunking import Chunk
+
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+_LAYOUT_FILE = "shards.json"
+
+# Shard stores opened inside pool workers, keyed by shard directory.
+_worker_stores: Dict[str, MappedVectorStore] = {}
+
+
+def _search_shard(shard_path: str, live_paths: List[str], method: str, search_kwargs: Dict):
+    """Pool worker entry point: run ``method`` on one shard, opening it on first use.
+
+    Shards are never created here: one deleted while the query was queued
+    raises :class:`FileNotFoundError` for the caller to skip.
+    """
+
+    for stale in set(_worker_stores) - set(live_paths):
+        del _worker_stores[stale]
+    store = _worker_stores.get(shard_path)
+    if store is None:
+        store = _worker_stores[shard_path] = MappedVectorStore(shard_path, create=False)
+    return getattr(store, method)(**search_kwargs)
+
+
+def _shard_weight(shard: str, document_id: str) -> int:
+    digest = hashlib.blake2b(f"{shard}:{document_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def owner_shard(shards: Iterable[str], document_id: str) -> str:
+    """Shard that owns ``document_id`` under rendezvous hashing."""
+
+    return max(shards, key=lambda shard: _shard_weight(shard, document_id))
+
+
+def merge_results(per_shard: List[List[Dict]], top_k: int) -> List[Dict]:
+    """Merge score-ordered shard results, dropping duplicate chunks."""
+
+    merged: List[Dict] = []
+    seen = set()
+    for result in heapq.merge(*per_shard, key=lambda result: -result["score"]):
+        chunk_id = result["chunk"].get("chunk_id")
+        if chunk_id in seen:
+            continue
+        seen.add(chunk_id)
+        merged.append(result)
+        if len(merged) == top_k:
+            break
+    return merged
+
+
+class ShardedVectorStore(VectorStore):
+    """Hash-partitioned collection of :class:`MappedVectorStore` shards.
+
+    ``path`` holds ``shards.json`` (the live shard list) and one directory per
+    shard. ``search_workers`` is the size of the search process pool; ``0``
+    searches the shards sequentially in this process.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        shards: int = settings.vector_store_shards,
+        search_workers: int = settings.shard_search_workers,
+    ) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._layout_path = self.path / _LAYOUT_FILE
+        self._search_workers = search_workers
+        self._lock = threading.RLock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._stores: Dict[str, MappedVectorStore] = {}
+        self._draining: Set[str] = set()
+        self._next_id = 0
+
+        if self._layout_path.exists():
+            with self._layout_path.open("r", encoding="utf-8") as handle:
+                layout = json.load(handle)
+            self._next_id = layout.get("next_id", 0)
+            for name in layout.get("shards", []):
+                self._stores[name] = MappedVectorStore(str(self.path / name))
+        else:
+            for _ in range(max(shards, 1)):
+                self._create_shard()
+            self._write_layout()
+
+    # ------------------------------------------------------------------
+    # Layout management
+    # ------------------------------------------------------------------
+    @property
+    def shards(self) -> List[str]:
+        return list(self._stores)
+
+    def _create_shard(self) -> str:
+        name = f"shard-{self._next_id:03d}"
+        self._next_id += 1
+        self._stores[name] = MappedVectorStore(str(self.path / name))
+        return name
+
+    def _write_layout(self) -> None:
+        _write_json(self._layout_path, {"shards": self.shards, "next_id": self._next_id})
+
+    def _move_documents(self, source: MappedVectorStore, targets: Dict[str, MappedVectorStore]) -> int:
+        """Move documents of ``source`` that another shard now owns."""
+
+        names = list(targets)
+        moved = 0
+        for document in source.list_documents():
+            document_id = document["id"]
+            owner = owner_shard(names, document_id)
+            if targets[owner] is source:
+                continue
+            with self._lock:
+                exported = source.export_document(document_id)
+                if exported is None:
+                    continue
+                filename, metadata, chunks, vectors = exported
+                targets[owner].add_document(document_id, filename, metadata, chunks, vectors.tolist())
+                source.remove_document(document_id)
+            moved += 1
+        return moved
+
+    def add_shard(self) -> str:
+        """Add an empty shard and move to it the documents it now owns."""
+
+        with self._lock:
+            name = self._create_shard()
+            self._write_layout()
+            stores = dict(self._stores)
+        moved = sum(self._move_documents(store, stores) for shard, store in stores.items() if shard != name)
+        stores[name].flush()
+        logger.info("Added shard %s; moved %s documents", name, moved)
+        return name
+
+    def remove_shard(self, name: str) -> None:
+        """Drain ``name`` into the remaining shards, then delete it."""
+
+        with self._lock:
+            if name not in self._stores or len(self._stores) - len(self._draining) <= 1:
+                raise ValueError(f"Cannot remove shard {name}")
+            # New writes stop landing on the shard, but it stays searchable
+            # until every document has been copied out.
+            self._draining.add(name)
+            source = self._stores[name]
+            remaining = {shard: store for shard, store in self._stores.items() if shard not in self._draining}
+
+        moved = self._move_documents(source, remaining)
+        with self._lock:
+            del self._stores[name]
+            self._draining.discard(name)
+            self._write_layout()
+        for store in remaining.values():
+            store.flush()
+        shutil.rmtree(self.path / name, ignore_errors=True)
+        logger.info("Removed shard %s; moved %s documents", name, moved)
+
+    def resize(self, shards: int) -> None:
+        """Add or remove shards one at a time until there are ``shards``."""
+
+        while len(self._stores) < shards:
+            self.add_shard()
+        while len(self._stores) > max(shards, 1):
+            self.remove_shard(self.shards[-1])
+
+    # ------------------------------------------------------------------
+    # Document management
+    # ------------------------------------------------------------------
+    def add_document(
+        self,
+        document_id: str,
+        filename: str,
+        document_metadata: Dict[str, str],
+        chunks: List[Chunk],
+        embeddings: List[List[float]],
+    ) -> None:
+        with self._lock:
+            owner = owner_shard([shard for shard in self._stores if shard not in self._draining], document_id)
+            for shard, store in self._stores.items():
+                if shard != owner:
+                    store.remove_document(document_id)
+            self._stores[owner].add_document(document_id, filename, document_metadata, chunks, embeddings)
+
+    def remove_document(self, document_id: str) -> bool:
+        with self._lock:
+            removed = [store.remove_document(document_id) for store in self._stores.values()]
+        return any(removed)
+
+    def has_document(self, document_id: str) -> bool:
+        return any(store.has_document(document_id) for store in list(self._stores.values()))
+
+    def find_near_duplicate(self, signature: Sequence[int], threshold: float) -> Optional[Tuple[str, float]]:
+        # Documents are placed by id, not content, so every shard is asked;
+        # each answers from its own LSH index.
+        matches = [store.find_near_duplicate(signature, threshold) for store in list(self._stores.values())]
+        return max((match for match in matches if match is not None), key=lambda match: match[1], default=None)
+
+    def list_documents(self) -> List[Dict[str, Optional[str]]]:
+        documents: Dict[str, Dict[str, Optional[str]]] = {}
+        for store in list(self._stores.values()):
+            for document in store.list_documents():
+                documents.setdefault(document["id"], document)
+        return list(documents.values())
+
+    def flush(self) -> None:
+        for store in list(self._stores.values()):
+            store.flush()
+
+    # ------------------------------------------------------------------
+    # Retrieval
+    # ------------------------------------------------------------------
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned workers do not inherit this process's threads or locks.
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._search_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def search(
+        self,
+        question: str,
+        query_embedding: List[float],
+        filters: Optional[Dict],
+        metadata_filter_fields: Iterable[str],
+        hybrid_weight: float,
+        top_k: int,
+        exact: bool = False,
+    ) -> List[Dict]:
+        with self._lock:
+            stores = dict(self._stores)
+        search_kwargs = {
+            "question": question,
+            "query_embedding": list(query_embedding),
+            "filters": filters,
+            "metadata_filter_fields": list(metadata_filter_fields),
+            "hybrid_weight": hybrid_weight,
+            "top_k": top_k,
+            "exact": exact,
+            "corpus": self._corpus_statistics(stores, question, hybrid_weight),
+        }
+        return merge_results(self._fan_out(stores, "search", search_kwargs), top_k)
+
+    def search_batch(
+        self,
+        questions: List[str],
+        query_embeddings: List[List[float]],
+        filters: Sequence[Optional[Dict]],
+        metadata_filter_fields: Iterable[str],
+        hybrid_weight: float,
+        top_k: int,
+        exact: bool = False,
+    ) -> List[List[Dict]]:
+        """Send the whole batch to every shard once and merge per question."""
+
+        with self._lock:
+            stores = dict(self._stores)
+        search_kwargs = {
+            "questions": list(questions),
+            "query_embeddings": [list(embedding) for embedding in query_embeddings],
+            "filters": list(filters),
+            "metadata_filter_fields": list(metadata_filter_fields),
+            "hybrid_weight": hybrid_weight,
+            "top_k": top_k,
+            "exact": exact,
+            "corpora": [self._corpus_statistics(stores, question, hybrid_weight) for question in questions],
+        }
+        per_shard = self._fan_out(stores, "search_batch", search_kwargs)
+        return [
+            merge_results([shard_results[index] for shard_results in per_shard], top_k)
+            for index in range(len(questions))
+        ]
+
+    def _corpus_statistics(
+        self, stores: Dict[str, MappedVectorStore], question: str, hybrid_weight: float
+    ) -> Optional[CorpusStatistics]:
+        """BM25 statistics of the question's terms over all ``stores``.
+
+        Each shard would otherwise weight terms by its own document
+        frequencies and scale by its own best score. ``None`` when the
+        lexical half does not count.
+        """
+
+        if hybrid_weight >= 1.0:
+            return None
+        rows, total_length = 0, 0
+        frequencies: Dict[str, int] = {}
+        for shard_rows, shard_length, shard_frequencies in self._each_shard(
+            stores, lambda store: store.lexical_statistics(question)
+        ):
+            rows += shard_rows
+            total_length += shard_length
+            for term, frequency in shard_frequencies.items():
+                frequencies[term] = frequencies.get(term, 0) + frequency
+        if not rows:
+            return CorpusStatistics({}, 0.0, 0.0)
+
+        weights = {term: bm25_idf(frequency, rows) for term, frequency in frequencies.items() if frequency}
+        average_length = total_length / rows
+        maxima = self._each_shard(stores, lambda store: store.lexical_maximum(weights, average_length))
+        return CorpusStatistics(weights, average_length, max(maxima, default=0.0))
+
+    def _each_shard(self, stores: Dict[str, MappedVectorStore], call: Callable[[MappedVectorStore], _T]) -> List[_T]:
+        """``call`` on every store in this process, skipping shards deleted meanwhile."""
+
+        answers = []
+        for shard, store in stores.items():
+            try:
+                answers.append(call(store))
+            except FileNotFoundError:
+                if shard in self._stores:
+                    raise
+        return answers
+
+    def _fan_out(self, stores: Dict[str, MappedVectorStore], method: str, search_kwargs: Dict) -> List:
+        """Run ``method`` on every shard of ``stores``, in the pool when one is configured."""
+
+        if self._search_workers <= 0:
+            return self._each_shard(stores, lambda store: getattr(store, method)(**search_kwargs))
+
+        paths = [str(self.path / shard) for shard in stores]
+        futures = [self._executor().submit(_search_shard, path, paths, method, search_kwargs) for path in paths]
+        per_shard = []
+        for shard, future in zip(stores, futures):
+            try:
+                per_shard.append(future.result())
+            except FileNotFoundError:
+                # The shard was drained and deleted while the query ran.
+                if shard in self._stores:
+                    raise
+        return per_shard
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,489 @@
+"""Vector store kept in a single SQLite database.
+
+Documents and chunks are ordinary tables, so every add or remove is one
+transaction touching only that document's rows, and several worker processes
+can share the file (SQLite serialises writers; WAL mode lets readers carry
+on). The pieces of hybrid search map onto SQLite features:
+
+* lexical scores come from an FTS5 index over chunk text (``bm25()``);
+* filters resolve through indexed columns: an integer ``year`` column for
+  ``year_range`` and a ``(field, value)`` table holding every lower-cased
+  metadata value (authors split on ``";"``);
+* near-duplicate lookups go through a table of LSH band buckets of each
+  document's MinHash signature, indexed by ``(band, bucket)``;
+* embeddings are L2-normalised ``float32`` BLOBs. They are cached as one
+  matrix per process and topped up incrementally when the store changes, so
+  cosine scoring is a single matrix-vector product.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.vector_store import (
+    VectorStore,
+    _batches,
+    _normalise_metadata,
+    _normalised_vector,
+    _tokenise,
+    _top_k,
+)
+from app.utils.chunking import Chunk
+from app.utils.metadata_index import filter_tokens
+from app.utils.minhash import band_keys, best_match, document_signature
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+
+CREATE TABLE IF NOT EXISTS documents (
+    document_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id TEXT NOT NULL REFERENCES documents (document_id),
+    chunk_id TEXT,
+    position INTEGER,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    year INTEGER,
+    embedding BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_document ON chunks (document_id);
+CREATE INDEX IF NOT EXISTS chunks_year ON chunks (year);
+
+CREATE TABLE IF NOT EXISTS chunk_filters (
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    chunk INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunk_filters_value ON chunk_filters (field, value);
+CREATE INDEX IF NOT EXISTS chunk_filters_chunk ON chunk_filters (chunk);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5 (content, content='chunks', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS chunks_fts_insert AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS chunks_fts_delete AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts (chunks_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+
+CREATE TABLE IF NOT EXISTS document_minhash (
+    document_id TEXT PRIMARY KEY REFERENCES documents (document_id),
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS minhash_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    document_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS minhash_buckets_key ON minhash_buckets (band, bucket);
+CREATE INDEX IF NOT EXISTS minhash_buckets_document ON minhash_buckets (document_id);
+"""
+
+
+def _year(metadata: Dict[str, str]) -> Optional[int]:
+    try:
+        return int(metadata["year"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _match_expression(terms: Iterable[str]) -> str:
+    """FTS5 query matching any of ``terms``, each quoted as a literal phrase."""
+
+    phrases = ['"{}"'.format(term.replace('"', '""')) for term in terms if any(ch.isalnum() for ch in term)]
+    return " OR ".join(phrases)
+
+
+class SQLiteVectorStore(VectorStore):
+    """Vector store backed by one SQLite database file at ``path``.
+
+    The document-level first stage of the other backends is not implemented:
+    ``exact`` is accepted for interface compatibility and every chunk passing
+    the filters is scored.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._cache_lock = threading.Lock()
+        # (generation, sorted chunk row ids, row-aligned normalised matrix)
+        self._vectors: Tuple[int, np.ndarray, np.ndarray] = (-1, np.zeros(0, dtype=np.int64), np.zeros((0, 0)))
+        self._connection().executescript(_SCHEMA)
+
+    # ------------------------------------------------------------------
+    # Connections and transactions
+    # ------------------------------------------------------------------
+    def _connection(self) -> sqlite3.Connection:
+        """Connection owned by the calling thread."""
+
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self, write: bool = False) -> Iterator[sqlite3.Connection]:
+        """Run the block in one transaction; reads see a single snapshot."""
+
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    @staticmethod
+    def _generation(connection: sqlite3.Connection) -> int:
+        return connection.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    @staticmethod
+    def _bump_generation(connection: sqlite3.Connection) -> None:
+        connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+
+    @staticmethod
+    def _delete_document(connection: sqlite3.Connection, document_id: str) -> bool:
+        connection.execute(
+            "DELETE FROM chunk_filters WHERE chunk IN (SELECT id FROM chunks WHERE document_id = ?)", (document_id,)
+        )
+        connection.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+        connection.execute("DELETE FROM minhash_buckets WHERE document_id = ?", (document_id,))
+        connection.execute("DELETE FROM document_minhash WHERE document_id = ?", (document_id,))
+        return connection.execute("DELETE FROM documents WHERE document_id = ?", (document_id,)).rowcount > 0
+
+    # ------------------------------------------------------------------
+    # Document management
+    # ------------------------------------------------------------------
+    def add_document(
+        self,
+        document_id: str,
+        filename: str,
+        document_metadata: Dict[str, str],
+        chunks: List[Chunk],
+        embeddings: List[List[float]],
+    ) -> None:
+        doc_metadata = _normalise_metadata(document_metadata)
+        with self._transaction(write=True) as connection:
+            self._delete_document(connection, document_id)
+            connection.execute(
+                "INSERT INTO documents (document_id, filename, metadata) VALUES (?, ?, ?)",
+                (document_id, filename, json.dumps(doc_metadata, ensure_ascii=False)),
+            )
+            for chunk, embedding in zip(chunks, embeddings):
+                chunk_metadata = _normalise_metadata(chunk.metadata)
+                merged = {**doc_metadata, **chunk_metadata}
+                vector = _normalised_vector(embedding)
+                row = connection.execute(
+                    "INSERT INTO chunks (document_id, chunk_id, position, content, metadata, year, embedding)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        document_id,
+                        chunk.chunk_id,
+                        chunk.position,
+                        chunk.content,
+                        json.dumps(chunk_metadata, ensure_ascii=False),
+                        _year(merged),
+                        (vector if vector is not None else np.zeros(len(embedding), dtype=np.float32)).tobytes(),
+                    ),
+                ).lastrowid
+                connection.executemany(
+                    "INSERT INTO chunk_filters (field, value, chunk) VALUES (?, ?, ?)",
+                    [(field, key, row) for field, value in merged.items() for key in filter_tokens(field, value)],
+                )
+            self._index_signature(connection, document_id, [chunk.content for chunk in chunks])
+            self._bump_generation(connection)
+
+    def remove_document(self, document_id: str) -> bool:
+        with self._transaction(write=True) as connection:
+            removed = self._delete_document(connection, document_id)
+            if removed:
+                self._bump_generation(connection)
+        return removed
+
+    def has_document(self, document_id: str) -> bool:
+        row = self._connection().execute("SELECT 1 FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+        return row is not None
+
+    def find_near_duplicate(self, signature: Sequence[int], threshold: float) -> Optional[Tuple[str, float]]:
+        keys = band_keys(signature)
+        with self._transaction() as connection:
+            candidates = {
+                document_id
+                for band, bucket in keys
+                for document_id, in connection.execute(
+                    "SELECT document_id FROM minhash_buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                )
+            }
+            stored = [
+                (document_id, np.frombuffer(blob, dtype=np.uint64))
+                for document_id in candidates
+                for blob, in connection.execute(
+                    "SELECT signature FROM document_minhash WHERE document_id = ?", (document_id,)
+                )
+            ]
+        return best_match(stored, signature, threshold)
+
+    @staticmethod
+    def _index_signature(connection: sqlite3.Connection, document_id: str, texts: List[str]) -> None:
+        signature = document_signature(texts)
+        connection.execute(
+            "INSERT INTO document_minhash (document_id, signature) VALUES (?, ?)", (document_id, signature.tobytes())
+        )
+        connection.executemany(
+            "INSERT INTO minhash_buckets (band, bucket, document_id) VALUES (?, ?, ?)",
+            [(band, bucket, document_id) for band, bucket in band_keys(signature)],
+        )
+
+    def list_documents(self) -> List[Dict[str, Optional[str]]]:
+        rows = self._connection().execute(
+            "SELECT d.document_id, d.metadata, COUNT(c.id) FROM documents d"
+            " LEFT JOIN chunks c ON c.document_id = d.document_id GROUP BY d.document_id ORDER BY d.rowid"
+        )
+        result = []
+        for doc_id, metadata_json, chunk_count in rows:
+            metadata = json.loads(metadata_json)
+            result.append(
+                {
+                    "id": doc_id,
+                    "title": metadata.get("title"),
+                    "authors": metadata.get("authors"),
+                    "journal": metadata.get("journal"),
+                    "year": _year(metadata),
+                    "chunks": chunk_count,
+                }
+            )
+        return result
+
+    # ------------------------------------------------------------------
+    # Retrieval
+    # ------------------------------------------------------------------
+    def _cached_vectors(self, connection: sqlite3.Connection) -> Tuple[np.ndarray, np.ndarray]:
+        """Chunk row ids and embeddings as of the connection's snapshot.
+
+        Row ids only grow, so a change drops deleted rows from the cached
+        matrix and reads just the rows added since it was built.
+        """
+
+        generation = self._generation(connection)
+        with self._cache_lock:
+            cached_generation, ids, matrix = self._vectors
+            if cached_generation >= generation:
+                # Another thread may already have moved the cache past this
+                # snapshot; rows it does not know about are skipped below.
+                return ids, matrix
+
+            live = np.fromiter((row for row, in connection.execute("SELECT id FROM chunks")), dtype=np.int64)
+            keep = np.isin(ids, live)
+            ids, matrix = ids[keep], matrix[keep]
+            added = connection.execute(
+                "SELECT id, embedding FROM chunks WHERE id > ? ORDER BY id", (int(ids[-1]) if len(ids) else 0,)
+            ).fetchall()
+            if added:
+                dimension = matrix.shape[1] if len(ids) else len(added[0][1]) // 4
+                vectors = [np.frombuffer(blob, dtype=np.float32) for _, blob in added]
+                new_matrix = np.stack(
+                    [
+                        vector if len(vector) == dimension else np.zeros(dimension, dtype=np.float32)
+                        for vector in vectors
+                    ]
+                )
+                ids = np.concatenate((ids, np.asarray([row for row, _ in added], dtype=np.int64)))
+                matrix = np.vstack((matrix.reshape(-1, dimension), new_matrix))
+            self._vectors = (generation, ids, matrix)
+            return ids, matrix
+
+    @staticmethod
+    def _candidate_ids(
+        connection: sqlite3.Connection,
+        filters: Optional[Dict],
+        metadata_filter_fields: Iterable[str],
+    ) -> Optional[np.ndarray]:
+        """Row ids passing ``filters`` via the indexed columns (``None``: no filter)."""
+
+        if not filters:
+            return None
+        clauses, params = [], []
+        if "year_range" in filters:
+            start, end = filters["year_range"]
+            clauses.append("year BETWEEN ? AND ?")
+            params.extend([int(start), int(end)])
+        for field in metadata_filter_fields:
+            if field in filters and filters[field]:
+                values = filters[field] if isinstance(filters[field], list) else [filters[field]]
+                keys = sorted({key for value in values for key in filter_tokens(field, str(value))})
+                clauses.append(
+                    "id IN (SELECT chunk FROM chunk_filters WHERE field = ? AND value IN ({}))".format(
+                        ", ".join("?" * len(keys))
+                    )
+                )
+                params.extend([field, *keys])
+        if not clauses:
+            return None
+        query = "SELECT id FROM chunks WHERE " + " AND ".join(clauses)
+        return np.fromiter((row for row, in connection.execute(query, params)), dtype=np.int64)
+
+    @staticmethod
+    def _lexical_scores(connection: sqlite3.Connection, terms: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Row ids matching any term and their BM25 scores (higher is better)."""
+
+        expression = _match_expression(terms)
+        if not expression:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        rows = connection.execute(
+            "SELECT rowid, -bm25(chunks_fts) FROM chunks_fts WHERE chunks_fts MATCH ? ORDER BY rowid", (expression,)
+        ).fetchall()
+        return np.asarray([row for row, _ in rows], dtype=np.int64), np.asarray([score for _, score in rows])
+
+    def search(
+        self,
+        question: str,
+        query_embedding: List[float],
+        filters: Optional[Dict],
+        metadata_filter_fields: Iterable[str],
+        hybrid_weight: float,
+        top_k: int,
+        exact: bool = False,
+    ) -> List[Dict]:
+        with self._transaction() as connection:
+            ids, matrix = self._cached_vectors(connection)
+            return self._search_snapshot(
+                connection,
+                ids,
+                matrix,
+                question,
+                _normalised_vector(query_embedding),
+                filters,
+                metadata_filter_fields,
+                hybrid_weight,
+                top_k,
+            )
+
+    def search_batch(
+        self,
+        questions: List[str],
+        query_embeddings: List[List[float]],
+        filters: Sequence[Optional[Dict]],
+        metadata_filter_fields: Iterable[str],
+        hybrid_weight: float,
+        top_k: int,
+        exact: bool = False,
+    ) -> List[List[Dict]]:
+        """Search every question in one read transaction, scoring vectors in blocks."""
+
+        filter_fields = list(metadata_filter_fields)
+        queries = [_normalised_vector(embedding) for embedding in query_embeddings]
+        results: List[List[Dict]] = []
+        with self._transaction() as connection:
+            ids, matrix = self._cached_vectors(connection)
+            for block in _batches(len(questions), len(ids)):
+                scored = [
+                    index for index in block if queries[index] is not None and len(queries[index]) == matrix.shape[1]
+                ]
+                products = matrix @ np.stack([queries[index] for index in scored]).T if scored else None
+                columns = {index: column for column, index in enumerate(scored)}
+                for index in block:
+                    results.append(
+                        self._search_snapshot(
+                            connection,
+                            ids,
+                            matrix,
+                            questions[index],
+                            queries[index],
+                            filters[index],
+                            filter_fields,
+                            hybrid_weight,
+                            top_k,
+                            products[:, columns[index]] if index in columns else None,
+                        )
+                    )
+        return results
+
+    def _search_snapshot(
+        self,
+        connection: sqlite3.Connection,
+        ids: np.ndarray,
+        matrix: np.ndarray,
+        question: str,
+        query: Optional[np.ndarray],
+        filters: Optional[Dict],
+        metadata_filter_fields: Iterable[str],
+        hybrid_weight: float,
+        top_k: int,
+        vector_scores: Optional[np.ndarray] = None,
+    ) -> List[Dict]:
+        """Search inside an open read transaction; ``vector_scores`` are precomputed per cached row."""
+
+        question_terms = _tokenise(question) or [question.lower()]
+        candidates = self._candidate_ids(connection, filters, metadata_filter_fields)
+        positions = np.arange(len(ids)) if candidates is None else np.flatnonzero(np.isin(ids, candidates))
+
+        lexical = np.zeros(len(ids))
+        lexical_ids, lexical_scores = self._lexical_scores(connection, question_terms)
+        if len(lexical_ids):
+            found = np.isin(lexical_ids, ids)
+            lexical[np.searchsorted(ids, lexical_ids[found])] = lexical_scores[found]
+            lexical /= max(lexical_scores.max(), 0.0) or 1.0
+
+        if vector_scores is not None:
+            vector_scores = vector_scores[positions]
+        elif query is not None and matrix.ndim == 2 and matrix.shape[1] == len(query):
+            vector_scores = matrix[positions] @ query
+        else:
+            vector_scores = np.zeros(len(positions))
+        scores = hybrid_weight * vector_scores + (1 - hybrid_weight) * lexical[positions]
+
+        winners = _top_k(scores, top_k)
+        rows = {
+            row[0]: row
+            for row in connection.execute(
+                "SELECT c.id, c.document_id, c.chunk_id, c.position, c.content, c.metadata, d.metadata"
+                " FROM chunks c JOIN documents d ON d.document_id = c.document_id"
+                " WHERE c.id IN ({})".format(", ".join("?" * len(winners))),
+                [int(ids[positions[index]]) for index in winners.tolist()],
+            )
+        }
+
+        results = []
+        for index in winners.tolist():
+            row = rows.get(int(ids[positions[index]]))
+            if row is None:
+                continue
+            _, document_id, chunk_id, position, content, chunk_json, doc_json = row
+            chunk_metadata = json.loads(chunk_json)
+            results.append(
+                {
+                    "document_id": document_id,
+                    "chunk": {
+                        "chunk_id": chunk_id,
+                        "position": position,
+                        "content": content,
+                        "metadata": chunk_metadata,
+                    },
+                    "metadata": {**json.loads(doc_json), **chunk_metadata},
+                    "score": float(scores[index]),
+                }
+            )
+        return results
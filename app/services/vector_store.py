@@ -1,25 +1,139 @@
 import json
-import math
+import logging
+import os
 import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+import numpy as np
+
+from app.core.config import settings
+from app.utils.bm25 import LexicalIndex
 from app.utils.chunking import Chunk
+from app.utils.file_lock import FileLock
+from app.utils.metadata_index import MetadataIndex
+from app.utils.minhash import LSHIndex, document_signature
+
+logger = logging.getLogger(__name__)
+
+_KEYWORD_SUMMARY_TERMS = 64
+
+# Upper bound on one block of batch scores (rows x queries, float32).
+_BATCH_SCORE_BYTES = 256 * 1024 * 1024
 
 
 def _tokenise(text: str) -> List[str]:
     return [token for token in text.lower().split() if token]
 
 
-def _cosine_similarity(vector_a: List[float], vector_b: List[float]) -> float:
-    if not vector_a or not vector_b or len(vector_a) != len(vector_b):
-        return 0.0
-    dot_product = sum(a * b for a, b in zip(vector_a, vector_b))
-    norm_a = math.sqrt(sum(a * a for a in vector_a))
-    norm_b = math.sqrt(sum(b * b for b in vector_b))
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
-    return dot_product / (norm_a * norm_b)
+def _keyword_summary(chunks: Iterable[Dict]) -> List[str]:
+    """Most frequent terms of a document, used by the document stage of search."""
+
+    counts = Counter(term for chunk in chunks for term in _tokenise(chunk.get("content", "")))
+    return [term for term, _ in counts.most_common(_KEYWORD_SUMMARY_TERMS)]
+
+
+def _embedding_matrix(embeddings: List[List[float]]) -> np.ndarray:
+    """Stack the embeddings sharing the first embedding's dimension."""
+
+    dimension = next((len(embedding) for embedding in embeddings if embedding), 0)
+    rows = [embedding for embedding in embeddings if embedding and len(embedding) == dimension]
+    return np.asarray(rows, dtype=np.float32).reshape(len(rows), dimension)
+
+
+def _normalised_matrix(embeddings: List[List[float]], dimension: Optional[int] = None) -> np.ndarray:
+    """Row-aligned L2-normalised matrix of ``embeddings``.
+
+    Rows whose length differs from ``dimension`` (by default the first
+    non-empty embedding's) are left as zeros, so they score 0 like a
+    mismatched cosine similarity.
+    """
+
+    if dimension is None:
+        dimension = next((len(embedding) for embedding in embeddings if embedding), 0)
+    matrix = np.zeros((len(embeddings), dimension), dtype=np.float32)
+    for row, embedding in enumerate(embeddings):
+        if dimension and len(embedding) == dimension:
+            matrix[row] = embedding
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def _batches(count: int, rows: int) -> Iterator[range]:
+    """Split ``count`` queries so a ``rows`` x batch score block fits the budget."""
+
+    size = max(1, _BATCH_SCORE_BYTES // max(rows * 4, 1))
+    for start in range(0, count, size):
+        yield range(start, min(start + size, count))
+
+
+def _centroid(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalised mean of the L2-normalised rows of ``vectors``."""
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if not vectors.size:
+        return vectors.reshape(-1)[:0]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    mean = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0).mean(axis=0)
+    norm = np.linalg.norm(mean)
+    return mean / norm if norm > 0 else mean
+
+
+def _normalised_vector(vector: List[float]) -> Optional[np.ndarray]:
+    query = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(query)
+    return query / norm if query.size and norm > 0 else None
+
+
+def _document_stage(
+    centroids: np.ndarray,
+    keywords: List[frozenset],
+    query: Optional[np.ndarray],
+    idf_weights: Dict[str, float],
+    hybrid_weight: float,
+    top_m: int,
+) -> np.ndarray:
+    """Indices of the ``top_m`` documents by centroid and keyword-summary score.
+
+    The keyword score is the IDF-weighted share of query terms found in a
+    document's summary, so common words barely move it.
+    """
+
+    vector_scores = np.zeros(len(keywords))
+    if query is not None and centroids.ndim == 2 and centroids.shape[1] == len(query):
+        vector_scores = centroids @ query
+    total_weight = sum(idf_weights.values())
+    keyword_scores = np.zeros(len(keywords))
+    if total_weight > 0:
+        keyword_scores = np.fromiter(
+            (sum(weight for term, weight in idf_weights.items() if term in summary) for summary in keywords),
+            dtype=np.float64,
+            count=len(keywords),
+        ) / total_weight
+    return _top_k(hybrid_weight * vector_scores + (1 - hybrid_weight) * keyword_scores, top_m)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest scores, best first.
+
+    Selects with a partition instead of sorting every score; ties keep index
+    order, matching a stable descending sort.
+    """
+
+    if k <= 0 or not len(scores):
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+        above = np.flatnonzero(scores > threshold)
+        ties = np.flatnonzero(scores == threshold)[: k - len(above)]
+        candidates = np.sort(np.concatenate((above, ties)))
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
 
 
 def _normalise_metadata(metadata: Dict[str, object]) -> Dict[str, str]:
@@ -34,28 +148,405 @@ def _normalise_metadata(metadata: Dict[str, object]) -> Dict[str, str]:
     return normalised
 
 
-class LocalVectorStore:
-    """JSON-backed vector store for small-scale deployments."""
+def _file_signature(stat: os.stat_result) -> Tuple[int, int, int]:
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+@dataclass
+class _ResidentDocument:
+    """Query-ready view of one stored document."""
+
+    document_id: str
+    metadata: Dict[str, str]
+    chunk_ids: Tuple[str, ...]
+    chunks: List[Tuple[Dict, Dict[str, str]]]
+    centroid: np.ndarray
+    keywords: frozenset
+    vectors: np.ndarray
+    minhash: np.ndarray
+
+    @classmethod
+    def build(cls, document_id: str, details: Dict) -> "_ResidentDocument":
+        doc_metadata = details.get("metadata", {})
+        chunks = details.get("chunks", [])
+        prepared = [(chunk, {**doc_metadata, **chunk.get("metadata", {})}) for chunk in chunks]
+        # Documents written before summaries were stored get them computed here.
+        centroid = details.get("centroid")
+        if centroid is None:
+            centroid = _centroid(_embedding_matrix([chunk.get("embedding", []) for chunk in chunks]))
+        keywords = details.get("keywords")
+        if keywords is None:
+            keywords = _keyword_summary(chunks)
+        minhash = details.get("minhash")
+        if minhash is None:
+            minhash = document_signature(chunk.get("content", "") for chunk in chunks)
+        return cls(
+            document_id=document_id,
+            metadata=doc_metadata,
+            chunk_ids=tuple(chunk.get("chunk_id") for chunk in chunks),
+            chunks=prepared,
+            centroid=np.asarray(centroid, dtype=np.float32),
+            keywords=frozenset(keywords),
+            vectors=_normalised_matrix([chunk.get("embedding", []) for chunk in chunks]),
+            minhash=np.asarray(minhash, dtype=np.uint64),
+        )
+
+
+# (document_id, chunk record, merged metadata)
+_ResidentRow = Tuple[str, Dict, Dict[str, str]]
+
+
+class VectorStore(ABC):
+    """Interface shared by every vector store backend.
+
+    Services depend on this class only; ``app.api.dependencies`` picks the
+    implementation from ``VECTOR_STORE_BACKEND``. ``search`` returns at most
+    ``top_k`` results, best first, each a dict with ``document_id``, the
+    ``chunk`` record (``chunk_id``, ``position``, ``content``, ``metadata``),
+    the chunk's ``metadata`` merged over its document's, and a ``score``
+    mixing cosine similarity and normalised BM25 by ``hybrid_weight``.
+    """
+
+    @abstractmethod
+    def add_document(
+        self,
+        document_id: str,
+        filename: str,
+        document_metadata: Dict[str, str],
+        chunks: List[Chunk],
+        embeddings: List[List[float]],
+    ) -> None:
+        """Index ``chunks``, replacing any document stored under ``document_id``."""
+
+    @abstractmethod
+    def remove_document(self, document_id: str) -> bool:
+        """Delete a document; returns ``False`` if it was not stored."""
+
+    @abstractmethod
+    def has_document(self, document_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def list_documents(self) -> List[Dict[str, Optional[str]]]:
+        """Summaries with ``id``, ``title``, ``authors``, ``journal``, ``year`` and ``chunks``."""
+
+    @abstractmethod
+    def find_near_duplicate(self, signature: Sequence[int], threshold: float) -> Optional[Tuple[str, float]]:
+        """Stored document most similar to a MinHash ``signature``, if at least ``threshold``.
+
+        Returns ``(document_id, estimated Jaccard similarity)``. Backends keep
+        an LSH index of their documents' chunk-shingle signatures
+        (:mod:`app.utils.minhash`), so only colliding documents are compared.
+        """
+
+    @abstractmethod
+    def search(
+        self,
+        question: str,
+        query_embedding: List[float],
+        filters: Optional[Dict],
+        metadata_filter_fields: Iterable[str],
+        hybrid_weight: float,
+        top_k: int,
+        exact: bool = False,
+    ) -> List[Dict]:
+        """Hybrid search over the chunks passing ``filters``."""
+
+    def search_batch(
+        self,
+        questions: List[str],
+        query_embeddings: List[List[float]],
+        filters: Sequence[Optional[Dict]],
+        metadata_filter_fields: Iterable[str],
+        hybrid_weight: float,
+        top_k: int,
+        exact: bool = False,
+    ) -> List[List[Dict]]:
+        """Run ``search`` for each question, with ``filters`` given per question.
+
+        Backends override this to score all query embeddings in one pass.
+        """
+
+        filter_fields = list(metadata_filter_fields)
+        return [
+            self.search(question, embedding, query_filters, filter_fields, hybrid_weight, top_k, exact)
+            for question, embedding, query_filters in zip(questions, query_embeddings, filters)
+        ]
+
+
+class _Generation:
+    """One immutable, query-ready version of the store file.
+
+    A search pins the generation that is current when it starts and reads
+    nothing else, so writers publishing later generations never change what it
+    sees. A replaced generation drops its structures once its last reader
+    unpins it.
+    """
+
+    def __init__(
+        self,
+        signature: Tuple[int, int, int],
+        data: Dict,
+        documents: List[_ResidentDocument],
+        lexical: LexicalIndex,
+        near_duplicates: LSHIndex,
+    ) -> None:
+        self.number = 0
+        self.signature = signature
+        self.data: Optional[Dict] = data
+        self.documents = documents
+        self.lexical = lexical
+        self.near_duplicates = near_duplicates
+        self.rows: List[_ResidentRow] = [
+            (entry.document_id, chunk, chunk_metadata) for entry in documents for chunk, chunk_metadata in entry.chunks
+        ]
+        self.filters = MetadataIndex([metadata for _, _, metadata in self.rows])
+        self.chunk_rows = {chunk.get("chunk_id"): row for row, (_, chunk, _) in enumerate(self.rows)}
+        self.document_rows = np.repeat(
+            np.arange(len(documents)), [len(entry.chunks) for entry in documents]
+        ).astype(np.int64)
+        dimension = next((len(entry.centroid) for entry in documents if len(entry.centroid)), 0)
+        self.centroids = np.stack(
+            [
+                entry.centroid if len(entry.centroid) == dimension else np.zeros(dimension, dtype=np.float32)
+                for entry in documents
+            ]
+        ) if documents else np.zeros((0, dimension), dtype=np.float32)
+        self._matrix: Optional[np.ndarray] = None
+        self.readers = 0
+        self.retired = False
+        self._lock = threading.Lock()
+
+    @property
+    def released(self) -> bool:
+        return self.data is None
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Normalised chunk embeddings aligned with ``rows``, built on first use."""
+
+        if self._matrix is None:
+            dimension = next((entry.vectors.shape[1] for entry in self.documents if entry.vectors.size), 0)
+            blocks = [
+                entry.vectors
+                if entry.vectors.shape[1] == dimension
+                else np.zeros((len(entry.chunks), dimension), dtype=np.float32)
+                for entry in self.documents
+            ]
+            self._matrix = np.vstack(blocks) if blocks else np.zeros((0, dimension), dtype=np.float32)
+        return self._matrix
+
+    def lexical_scores(self, terms: List[str]) -> np.ndarray:
+        """Raw BM25 score of every row, scattered from the postings of ``terms``."""
+
+        scores = self.lexical.scores(terms)
+        dense = np.zeros(len(self.rows), dtype=np.float64)
+        if scores:
+            rows = np.fromiter((self.chunk_rows[key] for key in scores), dtype=np.int64, count=len(scores))
+            dense[rows] = np.fromiter(scores.values(), dtype=np.float64, count=len(scores))
+        return dense
+
+    def pin(self) -> bool:
+        """Register a reader; fails if the generation was already released."""
+
+        with self._lock:
+            if self.data is None:
+                return False
+            self.readers += 1
+            return True
 
-    def __init__(self, path: str) -> None:
+    def unpin(self) -> None:
+        with self._lock:
+            self.readers -= 1
+            if self.retired and not self.readers:
+                self._release()
+
+    def retire(self) -> None:
+        """Mark the generation as replaced and release it once unpinned."""
+
+        with self._lock:
+            self.retired = True
+            if not self.readers:
+                self._release()
+
+    def _release(self) -> None:
+        self.data = None
+        self.documents, self.rows = [], []
+        self.lexical = LexicalIndex()
+        self.near_duplicates = LSHIndex()
+        self.filters = MetadataIndex([])
+        self.chunk_rows = {}
+        self.document_rows = np.zeros(0, dtype=np.int64)
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self._matrix = None
+
+
+class LocalVectorStore(VectorStore):
+    """JSON-backed vector store for small-scale deployments.
+
+    The parsed file is kept resident as a :class:`_Generation` and only
+    re-read when the file's inode, mtime or size changes, so writes from other
+    workers are still picked up while repeated reads cost a single ``stat``
+    call. Writers are serialised, across processes by a lock file next to the
+    store, re-read the file under the lock and publish a new generation after
+    replacing it; readers never take a lock and keep the generation they
+    started with. A BM25 inverted index of chunk text is carried from each
+    generation to the next with only the changed documents' chunks swapped,
+    and saved to a ``<store>.lexical`` file every ``lexical_snapshot_writes``
+    writes; on startup only documents changed since then are re-indexed.
+
+    Each document also stores a centroid embedding and a keyword summary.
+    When ``top_documents`` is positive, search first picks that many
+    documents from their summaries and only scores their chunks. A MinHash
+    signature per document feeds the near-duplicate LSH index, which is
+    carried between generations the same way as the lexical index.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        top_documents: int = settings.two_stage_top_documents,
+        lexical_snapshot_writes: int = settings.lexical_snapshot_writes,
+    ) -> None:
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        self._lock = threading.Lock()
-        if not self.path.exists():
-            self._write({"documents": {}})
+        self._lexical_path = self.path.with_name(f"{self.path.name}.lexical")
+        self._top_documents = top_documents
+        self._lexical_snapshot_writes = max(lexical_snapshot_writes, 1)
+        self._writes = 0
+        self._write_lock = threading.Lock()
+        self._file_lock = FileLock(self.path.with_name(f"{self.path.name}.lock"))
+        self._publish_lock = threading.Lock()
+        self._generation: Optional[_Generation] = None
+        with self._write_lock, self._file_lock:
+            if not self.path.exists():
+                self._commit({"documents": {}}, None)
 
     # ------------------------------------------------------------------
-    # Persistence utilities
+    # Generations
     # ------------------------------------------------------------------
-    def _read(self) -> Dict:
-        with self.path.open("r", encoding="utf-8") as handle:
-            return json.load(handle)
+    def _build_generation(
+        self,
+        signature: Tuple[int, int, int],
+        data: Dict,
+        previous: Optional[_Generation],
+    ) -> _Generation:
+        """Build query structures for ``data``.
+
+        Documents whose chunk ids and metadata are unchanged since ``previous``
+        are reused rather than re-tokenised, and only the others are swapped
+        in derived copies of its lexical and near-duplicate indexes. Without a
+        previous generation the lexical index starts from the saved snapshot
+        and the near-duplicate index is built from the stored signatures.
+        """
+
+        reusable = {entry.document_id: entry for entry in previous.documents} if previous is not None else {}
+        documents = []
+        for document_id, details in data.get("documents", {}).items():
+            entry = reusable.get(document_id)
+            chunk_ids = tuple(chunk.get("chunk_id") for chunk in details.get("chunks", []))
+            if entry is None or entry.chunk_ids != chunk_ids or entry.metadata != details.get("metadata", {}):
+                entry = _ResidentDocument.build(document_id, details)
+            documents.append(entry)
+
+        if previous is None:
+            lexical = self._load_lexical_index(documents)
+            near_duplicates = LSHIndex()
+            for entry in documents:
+                near_duplicates.add(entry.document_id, entry.minhash)
+        else:
+            lexical = previous.lexical.derive()
+            near_duplicates = previous.near_duplicates.derive()
+            current = {entry.document_id: entry for entry in documents}
+            for entry in previous.documents:
+                if current.get(entry.document_id) is not entry:
+                    near_duplicates.remove(entry.document_id)
+                    for chunk, _ in entry.chunks:
+                        lexical.remove(chunk.get("chunk_id"), _tokenise(chunk.get("content", "")))
+            for entry in documents:
+                if reusable.get(entry.document_id) is not entry:
+                    near_duplicates.add(entry.document_id, entry.minhash)
+                    for chunk, _ in entry.chunks:
+                        lexical.add(chunk.get("chunk_id"), _tokenise(chunk.get("content", "")))
+        return _Generation(signature, data, documents, lexical, near_duplicates)
+
+    def _load_lexical_index(self, documents: List[_ResidentDocument]) -> LexicalIndex:
+        """Snapshot of the lexical index brought up to date with ``documents``."""
+
+        lexical = LexicalIndex()
+        try:
+            with self._lexical_path.open("r", encoding="utf-8") as handle:
+                lexical = LexicalIndex.from_dict(json.load(handle))
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            logger.warning("Ignoring unreadable lexical index snapshot %s", self._lexical_path)
+
+        live = {chunk.get("chunk_id"): chunk for entry in documents for chunk, _ in entry.chunks}
+        stale = [key for key in lexical.keys() if key not in live]
+        if stale:
+            lexical.discard(stale)
+        for key, chunk in live.items():
+            if key not in lexical:
+                lexical.add(key, _tokenise(chunk.get("content", "")))
+        return lexical
+
+    def _save_lexical_index(self, lexical: LexicalIndex) -> None:
+        tmp_path = self._lexical_path.with_name(f"{self._lexical_path.name}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump(lexical.to_dict(), handle, ensure_ascii=False)
+        tmp_path.replace(self._lexical_path)
+
+    def _publish(self, generation: _Generation) -> _Generation:
+        """Make ``generation`` current; the caller holds the publish lock."""
+
+        previous, self._generation = self._generation, generation
+        if previous is not None:
+            generation.number = previous.number + 1
+            previous.retire()
+        return generation
+
+    def _current_generation(self) -> _Generation:
+        """Current generation, reloaded if the file was rewritten elsewhere."""
+
+        generation = self._generation
+        if generation is not None and _file_signature(self.path.stat()) == generation.signature:
+            return generation
+
+        with self._publish_lock:
+            generation = self._generation
+            with self.path.open("r", encoding="utf-8") as handle:
+                signature = _file_signature(os.fstat(handle.fileno()))
+                if generation is not None and signature == generation.signature:
+                    return generation
+                data = json.load(handle)
+            return self._publish(self._build_generation(signature, data, generation))
+
+    @contextmanager
+    def snapshot(self) -> Iterator[_Generation]:
+        """Pin the current generation for the duration of the block."""
+
+        generation = self._current_generation()
+        while not generation.pin():
+            generation = self._current_generation()
+        try:
+            yield generation
+        finally:
+            generation.unpin()
+
+    def _commit(self, data: Dict, previous: Optional[_Generation]) -> None:
+        """Replace the file with ``data`` and publish it; the caller holds both write locks."""
 
-    def _write(self, data: Dict) -> None:
         tmp_path = self.path.with_suffix(".tmp")
         with tmp_path.open("w", encoding="utf-8") as handle:
             json.dump(data, handle, ensure_ascii=False)
         tmp_path.replace(self.path)
+        generation = self._build_generation(_file_signature(self.path.stat()), data, previous)
+        with self._publish_lock:
+            self._publish(generation)
+        self._writes += 1
+        if self._writes % self._lexical_snapshot_writes == 0:
+            self._save_lexical_index(generation.lexical)
 
     # ------------------------------------------------------------------
     # Document management
@@ -84,30 +575,38 @@ class LocalVectorStore:
             "filename": filename,
             "metadata": _normalise_metadata(document_metadata),
             "chunks": serialised_chunks,
+            "centroid": _centroid(_embedding_matrix(embeddings)).tolist(),
+            "keywords": _keyword_summary(serialised_chunks),
+            "minhash": document_signature(chunk.content for chunk in chunks).tolist(),
         }
 
-        with self._lock:
-            data = self._read()
-            data.setdefault("documents", {})[document_id] = payload
-            self._write(data)
+        with self._write_lock, self._file_lock, self.snapshot() as current:
+            documents = dict(current.data.get("documents", {}))
+            documents[document_id] = payload
+            self._commit({**current.data, "documents": documents}, current)
 
     def remove_document(self, document_id: str) -> bool:
-        with self._lock:
-            data = self._read()
-            if document_id not in data.get("documents", {}):
+        with self._write_lock, self._file_lock, self.snapshot() as current:
+            if document_id not in current.data.get("documents", {}):
                 return False
-            del data["documents"][document_id]
-            self._write(data)
+            documents = dict(current.data["documents"])
+            del documents[document_id]
+            self._commit({**current.data, "documents": documents}, current)
             return True
 
     def has_document(self, document_id: str) -> bool:
-        data = self._read()
-        return document_id in data.get("documents", {})
+        with self.snapshot() as generation:
+            return document_id in generation.data.get("documents", {})
+
+    def find_near_duplicate(self, signature: Sequence[int], threshold: float) -> Optional[Tuple[str, float]]:
+        with self.snapshot() as generation:
+            return generation.near_duplicates.best_match(signature, threshold)
 
     def list_documents(self) -> List[Dict[str, Optional[str]]]:
-        data = self._read()
+        with self.snapshot() as generation:
+            documents = generation.data.get("documents", {})
         result = []
-        for doc_id, details in data.get("documents", {}).items():
+        for doc_id, details in documents.items():
             metadata = details.get("metadata", {})
             year_value = metadata.get("year")
             try:
@@ -129,89 +628,139 @@ class LocalVectorStore:
     # ------------------------------------------------------------------
     # Retrieval
     # ------------------------------------------------------------------
-    def _passes_filters(
+    def search(
         self,
-        metadata: Dict[str, str],
+        question: str,
+        query_embedding: List[float],
         filters: Optional[Dict],
         metadata_filter_fields: Iterable[str],
-    ) -> bool:
-        if not filters:
-            return True
-
-        if "year_range" in filters:
-            try:
-                year_value = int(metadata.get("year"))
-            except (TypeError, ValueError):
-                return False
-            start, end = filters["year_range"]
-            if year_value < start or year_value > end:
-                return False
+        hybrid_weight: float,
+        top_k: int,
+        exact: bool = False,
+    ) -> List[Dict]:
+        """Hybrid search over every chunk passing ``filters``.
+
+        With two-stage search enabled and ``exact`` unset, only chunks of the
+        ``top_documents`` best-matching documents are scored.
+        """
+
+        with self.snapshot() as generation:
+            return self._search_generation(
+                generation,
+                question,
+                _normalised_vector(query_embedding),
+                filters,
+                metadata_filter_fields,
+                hybrid_weight,
+                top_k,
+                exact,
+            )
 
-        for field in metadata_filter_fields:
-            if field in filters and filters[field]:
-                allowed_values = filters[field]
-                target_value = metadata.get(field)
-                if target_value is None:
-                    return False
-                normalised_target = target_value.lower()
-                if isinstance(allowed_values, list):
-                    if all(normalised_target != str(value).lower() for value in allowed_values):
-                        return False
-                else:
-                    if normalised_target != str(allowed_values).lower():
-                        return False
-
-        return True
+    def search_batch(
+        self,
+        questions: List[str],
+        query_embeddings: List[List[float]],
+        filters: Sequence[Optional[Dict]],
+        metadata_filter_fields: Iterable[str],
+        hybrid_weight: float,
+        top_k: int,
+        exact: bool = False,
+    ) -> List[List[Dict]]:
+        """Search every question against one generation.
+
+        Cosine scores for all chunks come from one matrix product per block
+        of queries instead of one pass over the store per query.
+        """
+
+        filter_fields = list(metadata_filter_fields)
+        queries = [_normalised_vector(embedding) for embedding in query_embeddings]
+        results: List[List[Dict]] = []
+        with self.snapshot() as generation:
+            matrix = generation.matrix
+            for block in _batches(len(questions), len(matrix)):
+                scored = [
+                    index for index in block if queries[index] is not None and len(queries[index]) == matrix.shape[1]
+                ]
+                products = matrix @ np.stack([queries[index] for index in scored]).T if scored else None
+                columns = {index: column for column, index in enumerate(scored)}
+                for index in block:
+                    results.append(
+                        self._search_generation(
+                            generation,
+                            questions[index],
+                            queries[index],
+                            filters[index],
+                            filter_fields,
+                            hybrid_weight,
+                            top_k,
+                            exact,
+                            products[:, columns[index]] if index in columns else None,
+                        )
+                    )
+        return results
 
-    def search(
+    def _search_generation(
         self,
+        generation: _Generation,
         question: str,
-        query_embedding: List[float],
+        query: Optional[np.ndarray],
         filters: Optional[Dict],
         metadata_filter_fields: Iterable[str],
         hybrid_weight: float,
         top_k: int,
+        exact: bool,
+        vector_scores: Optional[np.ndarray] = None,
     ) -> List[Dict]:
+        """Search one pinned generation; ``vector_scores`` are precomputed cosine scores per row."""
+
         question_terms = _tokenise(question)
         if not question_terms:
             question_terms = [question.lower()]
 
-        data = self._read()
-        results: List[Tuple[float, Dict]] = []
-
-        for document_id, details in data.get("documents", {}).items():
-            doc_metadata = details.get("metadata", {})
-            if not self._passes_filters(doc_metadata, filters, metadata_filter_fields):
-                continue
-
-            for chunk in details.get("chunks", []):
-                chunk_metadata = {**doc_metadata, **chunk.get("metadata", {})}
-
-                if not self._passes_filters(chunk_metadata, filters, metadata_filter_fields):
-                    continue
-
-                chunk_terms = _tokenise(chunk.get("content", ""))
-                if not chunk_terms:
-                    lexical_overlap = 0.0
-                else:
-                    overlap = len(set(question_terms) & set(chunk_terms))
-                    lexical_overlap = overlap / len(question_terms)
-
-                vector_score = _cosine_similarity(query_embedding, chunk.get("embedding", []))
-                score = hybrid_weight * vector_score + (1 - hybrid_weight) * lexical_overlap
-
-                results.append(
-                    (
-                        score,
-                        {
-                            "document_id": document_id,
-                            "chunk": chunk,
-                            "metadata": chunk_metadata,
-                            "score": score,
-                        },
-                    )
+        lexical_scores = generation.lexical_scores(question_terms)
+        max_lexical = lexical_scores.max(initial=0.0) or 1.0
+
+        resident, rows, document_rows = generation.documents, generation.rows, generation.document_rows
+        candidates = generation.filters.mask(filters, metadata_filter_fields)
+
+        if self._top_documents > 0 and not exact and len(resident) > self._top_documents:
+            eligible = np.arange(len(resident))
+            if candidates is not None:
+                eligible = np.unique(document_rows[candidates])
+            selected = eligible[
+                _document_stage(
+                    generation.centroids[eligible],
+                    [resident[index].keywords for index in eligible.tolist()],
+                    query,
+                    generation.lexical.idf_weights(question_terms),
+                    hybrid_weight,
+                    self._top_documents,
                 )
+            ]
+            document_mask = np.isin(document_rows, selected)
+            candidates = document_mask if candidates is None else candidates & document_mask
 
-        results.sort(key=lambda item: item[0], reverse=True)
-        return [payload for _, payload in results[:top_k]]
+        candidate_rows = np.arange(len(rows)) if candidates is None else np.flatnonzero(candidates)
+
+        if vector_scores is not None:
+            vector_scores = vector_scores[candidate_rows]
+        elif query is not None and generation.matrix.shape[1] == len(query):
+            vector_scores = generation.matrix[candidate_rows] @ query
+        else:
+            vector_scores = np.zeros(len(candidate_rows), dtype=np.float32)
+        lexical = lexical_scores[candidate_rows]
+        scores = hybrid_weight * vector_scores + (1 - hybrid_weight) * lexical / max_lexical
+
+        results = []
+        for index in _top_k(scores, top_k).tolist():
+            document_id, chunk, chunk_metadata = rows[int(candidate_rows[index])]
+            results.append(
+                {
+                    "document_id": document_id,
+                    "chunk": chunk,
+                    "metadata": chunk_metadata,
+                    "score": float(scores[index]),
+                }
+            )
+        return results
 
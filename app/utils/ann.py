@@ -0,0 +1,135 @@
+"""Approximate nearest neighbour search using an inverted-file (IVF) index.
+
+Vectors are clustered with spherical k-means; each vector is assigned to its
+closest centroid ("list"). A query only scores vectors in the ``nprobe`` lists
+whose centroids are most similar to it, trading a little recall for a search
+cost proportional to ``nprobe / nlist`` of the corpus.
+"""
+
+from __future__ import annotations
+
+import math
+from pathlib import Path
+
+import numpy as np
+
+_ASSIGN_BLOCK_ROWS = 16384
+
+
+def default_nlist(rows: int) -> int:
+    """Rule-of-thumb list count: roughly ``4 * sqrt(rows)``."""
+
+    return max(1, int(4 * math.sqrt(rows)))
+
+
+def _normalise(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+class IVFIndex:
+    """Spherical k-means coarse quantiser over L2-normalised vectors."""
+
+    def __init__(self, centroids: np.ndarray) -> None:
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        nlist: int,
+        iterations: int = 10,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """Cluster ``vectors`` into ``nlist`` lists."""
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        nlist = max(1, min(nlist, vectors.shape[0]))
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(vectors.shape[0], size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = cls(centroids).assign(vectors)
+            counts = np.bincount(assignments, minlength=nlist)
+            order = np.argsort(assignments, kind="stable")
+            offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            occupied = np.flatnonzero(counts)
+            sums = np.zeros_like(centroids)
+            sums[occupied] = np.add.reduceat(vectors[order], offsets[occupied], axis=0)
+            empty = np.flatnonzero(counts == 0)
+            if empty.size:
+                # Re-seed empty clusters from random vectors so every list is used.
+                sums[empty] = vectors[rng.choice(vectors.shape[0], size=empty.size, replace=False)]
+            centroids = _normalise(sums)
+
+        return cls(centroids)
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Return the closest list id for every row of ``vectors``."""
+
+        assignments = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], _ASSIGN_BLOCK_ROWS):
+            block = np.asarray(vectors[start : start + _ASSIGN_BLOCK_ROWS], dtype=np.float32)
+            assignments[start : start + block.shape[0]] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignments
+
+    def probe(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Return the ids of the ``nprobe`` lists closest to ``query``."""
+
+        similarities = self.centroids @ query
+        nprobe = min(max(nprobe, 1), self.nlist)
+        if nprobe == self.nlist:
+            return np.arange(self.nlist)
+        return np.argpartition(-similarities, nprobe - 1)[:nprobe]
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open("wb") as handle:
+            np.save(handle, self.centroids)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        return cls(np.load(path))
+
+
+class InvertedLists:
+    """CSR-style mapping from list id to the rows assigned to it."""
+
+    def __init__(self, assignments: np.ndarray, nlist: int) -> None:
+        self.assignments = assignments
+        self._order = np.argsort(assignments, kind="stable").astype(np.int64)
+        counts = np.bincount(assignments, minlength=nlist)
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def rows(self, lists: np.ndarray) -> np.ndarray:
+        """Return the (unsorted) rows belonging to any of ``lists``."""
+
+        parts = [self._order[self._offsets[item] : self._offsets[item + 1]] for item in lists]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def mask(self, lists: np.ndarray) -> np.ndarray:
+        mask = np.zeros(len(self.assignments), dtype=bool)
+        mask[self.rows(lists)] = True
+        return mask
+
+
+def recall_at_k(exact: np.ndarray, approximate: np.ndarray) -> float:
+    """Fraction of exact top-k ids recovered by the approximate search."""
+
+    if not len(exact):
+        return 1.0
+    return len(set(exact.tolist()) & set(approximate.tolist())) / len(exact)
+
+
+def sample_rows(total: int, limit: int, seed: int = 0) -> np.ndarray:
+    """Pick up to ``limit`` distinct row ids, in ascending order, for training."""
+
+    if total <= limit:
+        return np.arange(total)
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(total, size=limit, replace=False))
@@ -0,0 +1,262 @@
+"""Okapi BM25 scoring over inverted indexes.
+
+Two layouts share the same scoring formula:
+
+* :class:`LexicalIndex` maps ``term -> {key: term frequency}`` in plain dicts
+  so it can be updated per document and saved next to the JSON vector store.
+* :class:`Postings` holds the same information for one immutable segment of
+  the mapped store as CSR arrays saved next to the segment.
+
+Only the postings of the query terms are touched when scoring. Callers
+tokenise text themselves so both stores keep using the same tokeniser.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import ChainMap, Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Copy-on-write layers a LexicalIndex version may stack before they are flattened.
+_MAX_LAYERS = 32
+
+
+def bm25_idf(document_frequency: int, total_documents: int) -> float:
+    """Non-negative BM25 inverse document frequency (Lucene variant)."""
+
+    return math.log(1 + (total_documents - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+def normalise_scores(scores: np.ndarray, maximum: float) -> np.ndarray:
+    """Scale BM25 scores into ``[0, 1]`` so they can be mixed with cosine scores."""
+
+    if maximum <= 0:
+        return np.zeros_like(scores)
+    return scores / maximum
+
+
+@dataclass(frozen=True)
+class CorpusStatistics:
+    """BM25 inputs shared by several indexes so their scores are comparable.
+
+    ``weights`` are the query terms' IDFs and ``maximum`` the best raw score,
+    used to scale scores into ``[0, 1]``, over all of them.
+    """
+
+    weights: Dict[str, float]
+    average_length: float
+    maximum: float
+
+
+class LexicalIndex:
+    """Mutable inverted index keyed by chunk id.
+
+    :meth:`derive` starts a new version whose updates go into fresh top
+    layers over this index's dicts, which it never changes, so versions share
+    everything a write does not touch. Removals are masked in the top layer
+    (an empty posting dict, a ``None`` length). Past ``_MAX_LAYERS`` the
+    layers are flattened into one.
+    """
+
+    def __init__(
+        self,
+        postings: Optional[Dict[str, Dict[str, int]]] = None,
+        lengths: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.postings: ChainMap = ChainMap(dict(postings or {}))
+        self.lengths: ChainMap = ChainMap(dict(lengths or {}))
+        self.size = len(self.lengths)
+        self.total_length = sum(self.lengths.values())
+
+    def __contains__(self, key: str) -> bool:
+        return self.lengths.get(key) is not None
+
+    def keys(self) -> List[str]:
+        return [key for key, length in self.lengths.items() if length is not None]
+
+    def derive(self) -> "LexicalIndex":
+        """New version of the index to apply a write to, leaving this one unchanged."""
+
+        derived = LexicalIndex()
+        if len(self.postings.maps) < _MAX_LAYERS:
+            derived.postings = self.postings.new_child()
+            derived.lengths = self.lengths.new_child()
+        else:
+            payload = self.to_dict()
+            derived.postings = ChainMap({}, payload["postings"])
+            derived.lengths = ChainMap({}, payload["lengths"])
+        derived.size, derived.total_length = self.size, self.total_length
+        return derived
+
+    def add(self, key: str, terms: List[str]) -> None:
+        for term, count in Counter(terms).items():
+            self.postings[term] = {**self.postings.get(term, {}), key: count}
+        previous = self.lengths.get(key)
+        self.lengths[key] = len(terms)
+        self.size += previous is None
+        self.total_length += len(terms) - (previous or 0)
+
+    def remove(self, key: str, terms: Iterable[str]) -> None:
+        for term in set(terms):
+            postings = self.postings.get(term, {})
+            self._set_posting(term, {other: count for other, count in postings.items() if other != key})
+        self._drop_length(key)
+
+    def discard(self, keys: Iterable[str]) -> None:
+        """Remove ``keys`` without their terms, by scanning every posting dict."""
+
+        keys = set(keys)
+        for term, postings in list(self.postings.items()):
+            if not keys.isdisjoint(postings):
+                self._set_posting(term, {other: count for other, count in postings.items() if other not in keys})
+        for key in keys:
+            self._drop_length(key)
+
+    def _set_posting(self, term: str, postings: Dict[str, int]) -> None:
+        if postings or len(self.postings.maps) > 1:
+            self.postings[term] = postings
+        else:
+            self.postings.pop(term, None)
+
+    def _drop_length(self, key: str) -> None:
+        length = self.lengths.get(key)
+        if length is None:
+            return
+        if len(self.lengths.maps) > 1:
+            self.lengths[key] = None
+        else:
+            del self.lengths[key]
+        self.size -= 1
+        self.total_length -= length
+
+    def idf_weights(self, terms: Iterable[str]) -> Dict[str, float]:
+        """IDF of each query term that occurs in the index."""
+
+        return {term: bm25_idf(len(self.postings[term]), self.size) for term in set(terms) if self.postings.get(term)}
+
+    def scores(self, terms: Iterable[str]) -> Dict[str, float]:
+        """Return raw BM25 scores for every key containing a query term."""
+
+        total = self.size
+        if not total:
+            return {}
+        average_length = self.total_length / total or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            weight = bm25_idf(len(postings), total)
+            for key, frequency in postings.items():
+                length_norm = 1 - BM25_B + BM25_B * self.lengths[key] / average_length
+                scores[key] = scores.get(key, 0.0) + weight * frequency * (BM25_K1 + 1) / (
+                    frequency + BM25_K1 * length_norm
+                )
+        return scores
+
+    def to_dict(self) -> Dict:
+        return {
+            "postings": {term: postings for term, postings in self.postings.items() if postings},
+            "lengths": {key: length for key, length in self.lengths.items() if length is not None},
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict) -> "LexicalIndex":
+        return cls(payload.get("postings"), payload.get("lengths"))
+
+
+class Postings:
+    """Immutable CSR inverted index over the rows of one segment."""
+
+    def __init__(
+        self,
+        vocabulary: np.ndarray,
+        offsets: np.ndarray,
+        rows: np.ndarray,
+        frequencies: np.ndarray,
+        lengths: np.ndarray,
+    ) -> None:
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.row_ids = rows
+        self.frequencies = frequencies
+        self.lengths = lengths
+        self._term_index = {term: index for index, term in enumerate(vocabulary.tolist())}
+
+    @property
+    def rows(self) -> int:
+        return len(self.lengths)
+
+    @property
+    def total_length(self) -> int:
+        return int(self.lengths.sum())
+
+    @classmethod
+    def build(cls, token_lists: List[List[str]]) -> "Postings":
+        by_term: Dict[str, List[tuple]] = {}
+        for row, tokens in enumerate(token_lists):
+            for term, count in Counter(tokens).items():
+                by_term.setdefault(term, []).append((row, count))
+
+        vocabulary = sorted(by_term)
+        counts = [len(by_term[term]) for term in vocabulary]
+        entries = [entry for term in vocabulary for entry in by_term[term]]
+        return cls(
+            np.asarray(vocabulary, dtype=str),
+            np.concatenate(([0], np.cumsum(counts, dtype=np.int64))).astype(np.int64),
+            np.asarray([row for row, _ in entries], dtype=np.int32),
+            np.asarray([count for _, count in entries], dtype=np.float32),
+            np.asarray([len(tokens) for tokens in token_lists], dtype=np.float32),
+        )
+
+    def document_frequency(self, term: str) -> int:
+        index = self._term_index.get(term)
+        if index is None:
+            return 0
+        return int(self.offsets[index + 1] - self.offsets[index])
+
+    def scores(self, weights: Dict[str, float], average_length: float) -> np.ndarray:
+        """Dense raw BM25 scores for every row given per-term IDF ``weights``."""
+
+        scores = np.zeros(self.rows, dtype=np.float32)
+        length_norm = 1 - BM25_B + BM25_B * self.lengths / (average_length or 1.0)
+        for term, weight in weights.items():
+            index = self._term_index.get(term)
+            if index is None:
+                continue
+            start, stop = self.offsets[index], self.offsets[index + 1]
+            rows = self.row_ids[start:stop]
+            frequencies = self.frequencies[start:stop]
+            scores[rows] += weight * frequencies * (BM25_K1 + 1) / (frequencies + BM25_K1 * length_norm[rows])
+        return scores
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open("wb") as handle:
+            np.savez(
+                handle,
+                vocabulary=self.vocabulary,
+                offsets=self.offsets,
+                rows=self.row_ids,
+                frequencies=self.frequencies,
+                lengths=self.lengths,
+            )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "Postings":
+        with np.load(path) as payload:
+            return cls(
+                payload["vocabulary"],
+                payload["offsets"],
+                payload["rows"],
+                payload["frequencies"],
+                payload["lengths"],
+            )
@@ -10,7 +10,7 @@ from __future__ import annotations
 import re
 import uuid
 from dataclasses import dataclass, field
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 
 def _normalise_whitespace(text: str) -> str:
@@ -48,58 +48,90 @@ class Chunker:
     def split_paragraphs(self, text: str) -> List[str]:
         """Split text into paragraphs while respecting headings and tables."""
 
-        # Preserve table-like structures by converting multiple spaces to tabs for detection
-        text = text.replace("\t", "    ")
-        paragraphs = re.split(r"\n{2,}", text)
-        cleaned = []
-        buffer: List[str] = []
+        return [paragraph for paragraph, _ in self._merge_paragraphs(self._page_paragraphs([(None, text)]))]
 
-        for paragraph in paragraphs:
-            candidate = paragraph.strip()
+    def _page_paragraphs(
+        self, pages: Iterable[Tuple[Optional[int], str]]
+    ) -> Iterator[List[Tuple[Optional[int], str]]]:
+        """Blank-line separated paragraphs of ``pages`` joined by newlines, as ``(page_number, text)`` parts.
+
+        Only the paragraph still open at the end of a page is carried onto
+        the next one, so a paragraph running over a page break stays whole.
+        """
+
+        open_parts: List[Tuple[Optional[int], str]] = []
+        for page_number, page_text in pages:
+            # Preserve table-like structures by converting multiple spaces to tabs for detection
+            pieces = re.split(r"\n{2,}", (page_text or "").replace("\t", "    "))
+            if open_parts:
+                # Pages are joined by a newline, which ends the open paragraph
+                # when a newline is already on either side of it.
+                last_text = open_parts[-1][1]
+                ends_line = last_text.endswith("\n") or (not last_text and len(open_parts) > 1)
+                if ends_line or pieces[0].startswith("\n"):
+                    yield open_parts
+                    open_parts = []
+            open_parts.append((page_number, pieces[0]))
+            for piece in pieces[1:]:
+                yield open_parts
+                open_parts = [(page_number, piece)]
+        if open_parts:
+            yield open_parts
+
+    def _merge_paragraphs(
+        self, paragraphs: Iterable[List[Tuple[Optional[int], str]]]
+    ) -> Iterator[Tuple[str, List[Optional[int]]]]:
+        """Paragraph texts, with headings and table rows kept with what follows, and the page of each word."""
+
+        buffer: List[Tuple[str, List[Optional[int]]]] = []
+
+        def joined(separator: str) -> Tuple[str, List[Optional[int]]]:
+            return separator.join(text for text, _ in buffer), [page for _, pages in buffer for page in pages]
+
+        for parts in paragraphs:
+            candidate = "\n".join(text for _, text in parts).strip()
             if not candidate:
                 continue
+            # Pages join on a newline, so no word is split between two parts.
+            paragraph = (candidate, [page for page, text in parts for _ in text.split()])
 
             # Keep table rows together
             if re.search(r"(?:\|\s{2,}|\t)", candidate) and buffer:
-                buffer.append(candidate)
-                cleaned.append("\n".join(buffer))
+                buffer.append(paragraph)
+                yield joined("\n")
                 buffer = []
                 continue
 
             if candidate.endswith(":"):
-                buffer.append(candidate)
+                buffer.append(paragraph)
                 continue
 
             if buffer:
-                buffer.append(candidate)
-                cleaned.append(" ".join(buffer))
+                buffer.append(paragraph)
+                yield joined(" ")
                 buffer = []
             else:
-                cleaned.append(candidate)
+                yield paragraph
 
         if buffer:
-            cleaned.append(" ".join(buffer))
-
-        return cleaned
+            yield joined(" ")
 
     def _too_many_tokens(self, text: str) -> bool:
         approx_tokens = len(text) * self.approx_tokens_per_char
         return approx_tokens > self.max_tokens
 
-    def _split_long_paragraph(self, paragraph: str) -> Iterable[str]:
-        words = paragraph.split()
-        chunk_words: List[str] = []
+    def _split_long_paragraph(self, words: List[str]) -> Iterable[Tuple[int, int]]:
+        """``(start, end)`` ranges of ``words`` making up each piece of an oversized paragraph."""
 
-        for word in words:
-            chunk_words.append(word)
-            current_chunk = " ".join(chunk_words)
+        start = 0
+        for end in range(1, len(words) + 1):
+            current_chunk = " ".join(words[start:end])
             if len(current_chunk) > self.max_characters or self._too_many_tokens(current_chunk):
-                yield current_chunk
-                overlap_words = chunk_words[-self.overlap :] if self.overlap else []
-                chunk_words = list(overlap_words)
+                yield start, end
+                start = max(start, end - self.overlap) if self.overlap else end
 
-        if chunk_words:
-            yield " ".join(chunk_words)
+        if start < len(words):
+            yield start, len(words)
 
     def chunk(
         self,
@@ -118,55 +150,61 @@ class Chunker:
 
         if not text:
             return []
+        return self.chunk_pages([(None, text)], metadata)
+
+    def chunk_pages(
+        self,
+        pages: Iterable[Tuple[Optional[int], str]],
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> List[Chunk]:
+        """Chunk a document supplied as ``(page_number, text)`` pages.
+
+        Pages are consumed one at a time, so a generator reading a PDF page
+        by page holds at most the paragraph still open at a page break, and
+        chunks come out as they would for the pages joined by newlines.
+        Chunks may straddle a page break; each records the page it starts on
+        as ``page_number`` and, when it runs onto later pages, the last one
+        as ``page_end``. Pages numbered ``None`` add no page keys.
+        """
 
         metadata = metadata or {}
-        paragraphs = self.split_paragraphs(text)
         chunks: List[Chunk] = []
         buffer = ""
-        position = 0
-
-        for paragraph in paragraphs:
+        buffer_pages: Tuple[Optional[int], Optional[int]] = (None, None)
+
+        def emit(content: str, first_page: Optional[int], last_page: Optional[int]) -> None:
+            position = len(chunks)
+            chunk_metadata = {**metadata, "chunk_position": str(position)}
+            if first_page is not None:
+                chunk_metadata["page_number"] = str(first_page)
+                if last_page is not None and last_page != first_page:
+                    chunk_metadata["page_end"] = str(last_page)
+            chunks.append(Chunk(content=content, position=position, metadata=chunk_metadata))
+
+        for paragraph, word_pages in self._merge_paragraphs(self._page_paragraphs(pages)):
             paragraph = _normalise_whitespace(paragraph)
             if not paragraph:
                 continue
 
             if len(paragraph) > self.max_characters or self._too_many_tokens(paragraph):
-                for sub_chunk in self._split_long_paragraph(paragraph):
-                    chunks.append(
-                        Chunk(
-                            content=sub_chunk,
-                            position=position,
-                            metadata={**metadata, "chunk_position": str(position)},
-                        )
-                    )
-                    position += 1
+                words = paragraph.split()
+                for start, end in self._split_long_paragraph(words):
+                    emit(" ".join(words[start:end]), word_pages[start], word_pages[end - 1])
                 continue
 
             candidate = (buffer + " " + paragraph).strip() if buffer else paragraph
             if len(candidate) <= self.max_characters and not self._too_many_tokens(candidate):
+                buffer_pages = (buffer_pages[0] if buffer else word_pages[0], word_pages[-1])
                 buffer = candidate
                 continue
 
             if buffer:
-                chunks.append(
-                    Chunk(
-                        content=buffer,
-                        position=position,
-                        metadata={**metadata, "chunk_position": str(position)},
-                    )
-                )
-                position += 1
+                emit(buffer, *buffer_pages)
 
             buffer = paragraph
+            buffer_pages = (word_pages[0], word_pages[-1])
 
         if buffer:
-            chunks.append(
-                Chunk(
-                    content=buffer,
-                    position=position,
-                    metadata={**metadata, "chunk_position": str(position)},
-                )
-            )
+            emit(buffer, *buffer_pages)
 
         return chunks
-
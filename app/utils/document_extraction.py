@@ -0,0 +1,254 @@
+"""Text extraction from PDF and DOCX documents, optionally in worker processes.
+
+Documents come back as ``(page_number, text)`` pages rather than one joined
+string. In-process PDF extraction is a generator, so the chunker consumes
+one page at a time and keeps page numbers for citations.
+
+The extraction functions are module-level so they can run in a process
+pool. pdfplumber is pure Python and CPU-bound, so :class:`ExtractionPool`
+spreads documents, and page ranges of long PDFs, across processes instead of
+pinning one core of the API process. Each task has a timeout. A pathological
+document that hangs or crashes its worker fails on its own: the pool is
+replaced, and other documents caught up in the restart are retried once.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+try:
+    import pdfplumber
+except ImportError:  # pragma: no cover - optional dependency
+    pdfplumber = None
+
+try:
+    import docx
+except ImportError:  # pragma: no cover - optional dependency
+    docx = None
+
+_PDF_METADATA_KEYS = ["Title", "Author", "Subject", "Creator", "Producer", "CreationDate"]
+
+
+class ExtractionTimeout(RuntimeError):
+    """A document took longer than the extraction timeout."""
+
+
+# ----------------------------------------------------------------------
+# Extraction functions (safe to run in worker processes)
+# ----------------------------------------------------------------------
+# A document is read from its bytes, a file path or an open binary file, and
+# returned as its metadata and an iterable of ``(page_number, text)`` pages;
+# formats without pages yield one ``None`` page. Only bytes and paths can be
+# sent to worker processes.
+Source = Union[bytes, str, BinaryIO]
+Pages = Iterable[Tuple[Optional[int], str]]
+
+
+def _open_source(source: Source) -> Union[str, BinaryIO]:
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    if not isinstance(source, str):
+        source.seek(0)
+    return source
+
+
+def _read_source(source: Source) -> bytes:
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, str):
+        with open(source, "rb") as handle:
+            return handle.read()
+    source.seek(0)
+    return source.read()
+
+
+def _pdf_metadata(pdf) -> Dict[str, str]:
+    doc_metadata = pdf.metadata or {}
+    return {key.lower(): str(doc_metadata[key]) for key in _PDF_METADATA_KEYS if doc_metadata.get(key)}
+
+
+def _pdf_pages(pdf, first_page: int, last_page: Optional[int]) -> Iterator[Tuple[int, str]]:
+    for page_number, page in enumerate(pdf.pages[first_page:last_page], start=first_page + 1):
+        text = page.extract_text() or ""
+        # Drop the parsed layout of pages already read.
+        page.flush_cache()
+        yield page_number, text
+
+
+def iter_pdf(source: Source) -> Tuple[Dict[str, str], Iterator[Tuple[int, str]]]:
+    """PDF metadata and a generator reading one page at a time."""
+
+    if pdfplumber is None:
+        raise RuntimeError("pdfplumber is required for PDF ingestion")
+
+    pdf = pdfplumber.open(_open_source(source))
+
+    def pages() -> Iterator[Tuple[int, str]]:
+        with pdf:
+            yield from _pdf_pages(pdf, 0, None)
+
+    return _pdf_metadata(pdf), pages()
+
+
+def pdf_info(source: Source) -> Tuple[int, Dict[str, str]]:
+    """Page count and metadata of a PDF."""
+
+    if pdfplumber is None:
+        raise RuntimeError("pdfplumber is required for PDF ingestion")
+    with pdfplumber.open(_open_source(source)) as pdf:
+        return len(pdf.pages), _pdf_metadata(pdf)
+
+
+def extract_pdf_pages(source: Source, first_page: int = 0, last_page: Optional[int] = None) -> List[Tuple[int, str]]:
+    """Text of pages ``[first_page, last_page)`` (0-based, numbered from 1 in the output)."""
+
+    if pdfplumber is None:
+        raise RuntimeError("pdfplumber is required for PDF ingestion")
+    with pdfplumber.open(_open_source(source)) as pdf:
+        return list(_pdf_pages(pdf, first_page, last_page))
+
+
+def extract_docx(source: Source) -> Tuple[Dict[str, str], List[Tuple[Optional[int], str]]]:
+    if docx is None:
+        raise RuntimeError("python-docx is required for DOCX ingestion")
+
+    document = docx.Document(_open_source(source))
+    paragraphs = [paragraph.text for paragraph in document.paragraphs]
+    core_properties = document.core_properties
+    metadata = {
+        "title": core_properties.title or "",
+        "author": core_properties.author or "",
+        "created": core_properties.created.isoformat() if core_properties.created else "",
+    }
+    return metadata, [(None, "\n".join(paragraphs))]
+
+
+def extract_document(source: Source, extension: str) -> Tuple[Dict[str, str], Pages]:
+    """Metadata and pages of a document; PDF pages are read lazily as they are consumed."""
+
+    if extension == ".pdf":
+        return iter_pdf(source)
+    if extension == ".docx":
+        return extract_docx(source)
+    return {}, [(None, _read_source(source).decode("utf-8", errors="ignore"))]
+
+
+# ----------------------------------------------------------------------
+# Process pool
+# ----------------------------------------------------------------------
+class ExtractionPool:
+    """Runs PDF and DOCX extraction in ``processes`` worker processes.
+
+    PDFs longer than ``pages_per_task`` pages are split into page ranges that
+    are extracted in parallel and joined in page order. Each task must finish
+    within ``timeout`` seconds of a worker picking it up. Plain text is
+    decoded in the calling thread.
+    """
+
+    def __init__(self, processes: int, timeout: float, pages_per_task: int) -> None:
+        self.processes = processes
+        self.timeout = timeout
+        self.pages_per_task = max(1, pages_per_task)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        # One slot per worker process: a task is only handed to the executor
+        # when a worker is free to run it.
+        self._slots = threading.BoundedSemaphore(processes)
+
+    def extract(self, source: Union[bytes, str], extension: str) -> Tuple[Dict[str, str], Pages]:
+        """Like :func:`extract_document`, with the parsing done in worker processes.
+
+        ``source`` is the document's bytes or the path of a file the workers can read.
+        """
+
+        if extension == ".docx":
+            return self._run(extract_docx, source)
+        if extension != ".pdf":
+            return extract_document(source, extension)
+
+        page_count, metadata = self._run(pdf_info, source)
+        ranges = [
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
+        submitted = [self._submit(extract_pdf_pages, source, first, last) for first, last in ranges]
+        pages = [
+            page
+            for (future, generation), (first, last) in zip(submitted, ranges)
+            for page in self._result(future, generation, extract_pdf_pages, (source, first, last))
+        ]
+        return metadata, pages
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    # ------------------------------------------------------------------
+    # Task execution
+    # ------------------------------------------------------------------
+    def _run(self, function: Callable, *args):
+        future, generation = self._submit(function, *args)
+        return self._result(future, generation, function, args)
+
+    def _submit(self, function: Callable, *args) -> Tuple[Future, int]:
+        self._slots.acquire()
+        try:
+            with self._lock:
+                if self._executor is None:
+                    # Spawned rather than forked: the API process runs threads.
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+                    )
+                future, generation = self._executor.submit(function, *args), self._generation
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future, generation
+
+    def _result(self, future: Future, generation: int, function: Callable, args: tuple, retry: bool = True):
+        # Tasks wait for a free worker before they are submitted, so once the
+        # executor reports one running a worker has it. The executor also
+        # marks tasks running while they sit in its call queue, which is why
+        # the wait for a slot is needed for the timeout to exclude queueing.
+        while not future.running() and not future.done():
+            wait([future], timeout=0.05)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._restart(generation)
+            raise ExtractionTimeout(f"{function.__name__} did not finish within {self.timeout:g}s") from None
+        except BrokenProcessPool:
+            # Either this task crashed its worker or another task's restart
+            # took the pool down under it; try once more on a fresh pool.
+            self._restart(generation)
+            if not retry:
+                raise
+            future, generation = self._submit(function, *args)
+            return self._result(future, generation, function, args, retry=False)
+
+    def _restart(self, generation: int) -> None:
+        """Kill the workers of pool ``generation`` unless it was already replaced."""
+
+        with self._lock:
+            if generation != self._generation or self._executor is None:
+                return
+            executor, self._executor = self._executor, None
+            self._generation += 1
+        logger.warning("Restarting the extraction process pool")
+        # A hung worker never returns, so shutdown alone would not stop it.
+        for process in list(getattr(executor, "_processes", {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -2,79 +2,202 @@
 
 from __future__ import annotations
 
-import hashlib
 import logging
-import random
-from typing import Iterable, List
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from botocore.exceptions import BotoCoreError, ClientError
 
+from app.core.config import settings
 from app.services.bedrock_client import BedrockClient
+from app.utils.embedding_cache import EmbeddingCache
+from app.utils.local_embedding import HashingEmbedder
+from app.utils.micro_batcher import MicroBatcher
+from app.utils.query_cache import QueryEmbeddingCache, normalise_question
+from app.utils.rate_limiter import AdaptiveRateLimiter
 
 logger = logging.getLogger(__name__)
 
-_EMBEDDING_DIMENSION = 128
 
+@lru_cache()
+def _local_embedder() -> HashingEmbedder:
+    """Process-wide local embedder of ``EMBEDDING_DIMENSION`` floats."""
 
-def _fallback_embedding(text: str, dimension: int = _EMBEDDING_DIMENSION) -> List[float]:
-    """Deterministically generate a pseudo-embedding for offline scenarios."""
-
-    seed = hashlib.sha256(text.encode("utf-8")).digest()
-    rng = random.Random(int.from_bytes(seed, "big"))
-    return [rng.uniform(-1.0, 1.0) for _ in range(dimension)]
+    return HashingEmbedder.load(settings.embedding_dimension, settings.local_embedding_idf_path)
 
 
 class EmbeddingService:
-    """Encapsulates embedding generation with batching and retry logic."""
+    """Encapsulates embedding generation with batching and retry logic.
+
+    With a ``cache``, texts the model has already embedded are served from
+    it and only the misses are sent to Bedrock. Fallback embeddings are never
+    written to the cache.
+
+    Batches are sent from up to ``workers`` threads at once, paced by a token
+    bucket of ``requests_per_second`` that backs off when Bedrock throttles.
+
+    With ``backend="local"`` every text is embedded by the local hashing
+    engine and Bedrock is never called; it also supplies the fallbacks for
+    batches Bedrock fails to embed.
+
+    Questions embedded through :meth:`embed_queries` are also kept in an
+    in-memory LRU of ``query_cache_size`` entries, and questions from
+    concurrent callers that miss it are grouped into shared Bedrock batches
+    (waiting at most ``query_batch_wait_ms``; 0 sends each call on its own).
+    """
 
     def __init__(
         self,
         bedrock_client: BedrockClient,
         model_id: str,
-        batch_size: int = 10,
+        batch_size: Optional[int] = None,
+        cache: Optional[EmbeddingCache] = None,
+        workers: Optional[int] = None,
+        requests_per_second: Optional[float] = None,
+        backend: Optional[str] = None,
+        query_cache_size: Optional[int] = None,
+        query_batch_wait_ms: Optional[float] = None,
     ) -> None:
         self._client = bedrock_client
+        self._backend = backend or settings.embedding_backend
+        if self._backend not in ("bedrock", "local"):
+            raise ValueError(f"Unknown embedding backend: {self._backend}")
         self._model_id = model_id
-        self._batch_size = batch_size
+        self._batch_size = batch_size or settings.embedding_batch_size
+        self._cache = cache
+        self._workers = workers if workers is not None else settings.embedding_workers
+        self._rate_limiter = AdaptiveRateLimiter(
+            requests_per_second if requests_per_second is not None else settings.embedding_requests_per_second,
+            burst=max(self._workers, 1),
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = Lock()
+        self._query_cache = QueryEmbeddingCache(
+            query_cache_size if query_cache_size is not None else settings.query_embedding_cache_size
+        )
+        if query_batch_wait_ms is None:
+            query_batch_wait_ms = settings.query_batch_max_wait_ms
+        self._query_batcher: Optional[MicroBatcher[str, Tuple[List[float], bool]]] = None
+        if query_batch_wait_ms > 0 and self._backend == "bedrock":
+            self._query_batcher = MicroBatcher(
+                lambda texts: list(zip(*self._embed_with_status(texts))),
+                max_batch_size=self._batch_size,
+                max_wait=query_batch_wait_ms / 1000,
+                workers=max(self._workers, 1),
+            )
 
     def embed(self, texts: Iterable[str]) -> List[List[float]]:
         """Generate embeddings for a collection of texts."""
 
-        vector_list: List[List[float]] = []
-        batch: List[str] = []
+        return self._embed_with_status(list(texts))[0]
+
+    def embed_queries(self, questions: List[str]) -> List[List[float]]:
+        """Embed search questions through the in-memory query LRU.
+
+        Questions are normalised (lower case, collapsed whitespace) before
+        they are looked up and embedded, and concurrent misses on the same
+        question share one Bedrock call.
+        """
+
+        keys = [normalise_question(question) for question in questions]
+        return self._query_cache.get_or_compute(keys, self._embed_query_misses)
+
+    def cache_stats(self) -> Optional[Dict[str, float]]:
+        """Hit-rate and size statistics of the embedding cache, if one is configured."""
+
+        return self._cache.stats() if self._cache is not None else None
+
+    def query_cache_stats(self) -> Dict[str, float]:
+        """Hit, miss and coalesced-request counters of the query LRU."""
+
+        return self._query_cache.stats()
+
+    def query_batch_stats(self) -> Optional[Dict[str, float]]:
+        """Batch counts and mean batch size of question micro-batching, if enabled."""
+
+        return self._query_batcher.stats() if self._query_batcher is not None else None
+
+    def _embed_query_misses(self, questions: List[str]) -> Tuple[List[List[float]], List[bool]]:
+        if self._query_batcher is None or len(questions) >= self._batch_size:
+            return self._embed_with_status(questions)
+        vectors, real = zip(*self._query_batcher.submit(questions))
+        return list(vectors), list(real)
+
+    def _embed_with_status(self, texts: List[str]) -> Tuple[List[List[float]], List[bool]]:
+        """Embeddings for ``texts`` and, per text, whether it is a real (non-fallback) one."""
 
         for text in texts:
             if not isinstance(text, str):
                 raise TypeError("All items to embed must be strings")
 
-            batch.append(text)
-            if len(batch) >= self._batch_size:
-                vectors = self._embed_batch(batch)
-                vector_list.extend(vectors)
-                batch = []
+        if self._backend == "local":
+            return (_local_embedder().embed(texts) if texts else []), [True] * len(texts)
+        if self._cache is None:
+            return self._embed_texts(texts)
+
+        vectors = self._cache.get_many(self._model_id, texts)
+        real = [True] * len(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            embedded = dict(zip(missing, zip(*self._embed_texts(missing, self._cache))))
+            for index, text in enumerate(texts):
+                if vectors[index] is None:
+                    vectors[index], real[index] = embedded[text]
+        return vectors, real
+
+    def _embed_texts(
+        self, texts: List[str], cache: Optional[EmbeddingCache] = None
+    ) -> Tuple[List[List[float]], List[bool]]:
+        """Embed ``texts`` in batches, storing real (non-fallback) vectors in ``cache``.
+
+        Batches run concurrently on the worker pool; results are reassembled
+        in input order.
+        """
+
+        batches = [texts[start : start + self._batch_size] for start in range(0, len(texts), self._batch_size)]
+        if len(batches) > 1 and self._workers > 1:
+            results = list(self._pool().map(lambda batch: self._embed_cached(batch, cache), batches))
+        else:
+            results = [self._embed_cached(batch, cache) for batch in batches]
+        vectors = [vector for batch_vectors, _ in results for vector in batch_vectors]
+        real = [batch_real for batch, (_, batch_real) in zip(batches, results) for _ in batch]
+        return vectors, real
+
+    def _embed_cached(self, batch: List[str], cache: Optional[EmbeddingCache]) -> Tuple[List[List[float]], bool]:
+        vectors = self._embed_batch(batch)
+        if vectors is None:
+            return _local_embedder().embed(batch), False
+        if cache is not None:
+            cache.put_many(self._model_id, batch, vectors)
+        return vectors, True
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="embedding")
+            return self._executor
+
+    def _embed_batch(self, batch: List[str]) -> Optional[List[List[float]]]:
+        """Bedrock embeddings for ``batch``, or ``None`` when fallbacks must be used."""
 
-        if batch:
-            vector_list.extend(self._embed_batch(batch))
-
-        return vector_list
-
-    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
         try:
-            response = self._client.invoke_embedding_model(self._model_id, batch)
+            response = self._client.invoke_embedding_model(self._model_id, batch, rate_limiter=self._rate_limiter)
         except (BotoCoreError, ClientError, Exception) as exc:  # pragma: no cover - external call
             logger.warning(
                 "Falling back to local embeddings due to Bedrock error: %s", exc
             )
-            return [_fallback_embedding(text) for text in batch]
+            return None
 
         if not response or "embeddings" not in response:
             logger.warning("Bedrock embedding response missing 'embeddings' field. Using fallback.")
-            return [_fallback_embedding(text) for text in batch]
+            return None
 
         vectors = response["embeddings"]
         if len(vectors) != len(batch):
             logger.warning("Embedding count mismatch. Using fallback embeddings.")
-            return [_fallback_embedding(text) for text in batch]
+            return None
 
         return vectors
 
@@ -82,5 +205,11 @@ class EmbeddingService:
     def generate_local_embedding(text: str) -> List[float]:
         """Expose the fallback embedding so other components can seed data."""
 
-        return _fallback_embedding(text)
+        return _local_embedder().embed([text])[0]
+
+    @staticmethod
+    def generate_local_embeddings(texts: List[str]) -> List[List[float]]:
+        """Local embeddings for ``texts``, computed as one batch."""
+
+        return _local_embedder().embed(texts) if texts else []
 
@@ -0,0 +1,185 @@
+"""Persistent, content-addressed cache of embedding vectors.
+
+Entries are keyed by ``(model_id, sha256(text))`` so re-ingesting a corpus,
+re-running a batch job or re-seeding samples only pays for texts the model
+has not embedded before. Vectors live in a SQLite file as ``float32`` BLOBs.
+When the stored vectors grow past ``max_bytes`` the least recently used
+entries are evicted. Several worker processes can share the file: SQLite
+serialises the writers and WAL mode lets readers carry on.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model_id TEXT NOT NULL,
+    text_hash BLOB NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model_id, text_hash)
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('bytes', 0);
+"""
+
+# SQLite's default limit on host parameters in one statement is 999.
+_LOOKUP_CHUNK = 500
+
+
+def _text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """SQLite-backed embedding cache at ``path`` holding at most ``max_bytes`` of vectors.
+
+    Hit and miss counters cover lookups made through this instance since it
+    was created; entry and byte counts describe the shared file.
+    """
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connection owned by the calling thread."""
+
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    # ------------------------------------------------------------------
+    # Lookups and inserts
+    # ------------------------------------------------------------------
+    def get_many(self, model_id: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Cached vectors for ``texts`` in order, ``None`` where there is no entry."""
+
+        hashes = [_text_hash(text) for text in texts]
+        found: Dict[bytes, List[float]] = {}
+        connection = self._connection()
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), _LOOKUP_CHUNK):
+            block = unique[start : start + _LOOKUP_CHUNK]
+            rows = connection.execute(
+                "SELECT text_hash, vector FROM embeddings WHERE model_id = ? AND text_hash IN ({})".format(
+                    ",".join("?" * len(block))
+                ),
+                [model_id, *block],
+            )
+            for text_hash, vector in rows:
+                found[text_hash] = np.frombuffer(vector, dtype=np.float32).tolist()
+
+        if found:
+            now = time.time()
+            with self._transaction() as connection:
+                connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model_id = ? AND text_hash = ?",
+                    [(now, model_id, text_hash) for text_hash in found],
+                )
+
+        vectors = [found.get(text_hash) for text_hash in hashes]
+        hits = sum(vector is not None for vector in vectors)
+        with self._stats_lock:
+            self._hits += hits
+            self._misses += len(vectors) - hits
+        return vectors
+
+    def put_many(self, model_id: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Store ``vectors`` for ``texts``, then evict old entries beyond ``max_bytes``."""
+
+        if not texts:
+            return
+        now = time.time()
+        entries = {
+            _text_hash(text): np.asarray(vector, dtype=np.float32).tobytes() for text, vector in zip(texts, vectors)
+        }
+        with self._transaction() as connection:
+            added = 0
+            for text_hash, blob in entries.items():
+                previous = connection.execute(
+                    "SELECT length(vector) FROM embeddings WHERE model_id = ? AND text_hash = ?",
+                    (model_id, text_hash),
+                ).fetchone()
+                connection.execute(
+                    "INSERT OR REPLACE INTO embeddings (model_id, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                    (model_id, text_hash, blob, now),
+                )
+                added += len(blob) - (previous[0] if previous else 0)
+            connection.execute("UPDATE meta SET value = value + ? WHERE key = 'bytes'", (added,))
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Delete least recently used entries until the stored vectors fit ``max_bytes``."""
+
+        (stored,) = connection.execute("SELECT value FROM meta WHERE key = 'bytes'").fetchone()
+        excess = stored - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        freed = 0
+        for rowid, size in connection.execute(
+            "SELECT rowid, length(vector) FROM embeddings ORDER BY last_used"
+        ):
+            victims.append((rowid,))
+            freed += size
+            if freed >= excess:
+                break
+        connection.executemany("DELETE FROM embeddings WHERE rowid = ?", victims)
+        connection.execute("UPDATE meta SET value = value - ? WHERE key = 'bytes'", (freed,))
+        logger.debug("Evicted %s cached embeddings (%s bytes)", len(victims), freed)
+
+    # ------------------------------------------------------------------
+    # Statistics
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, float]:
+        connection = self._connection()
+        (entries,) = connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        (stored,) = connection.execute("SELECT value FROM meta WHERE key = 'bytes'").fetchone()
+        with self._stats_lock:
+            hits, misses = self._hits, self._misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": entries,
+            "bytes": stored,
+        }
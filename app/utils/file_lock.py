@@ -0,0 +1,60 @@
+"""Advisory inter-process locks on lock files.
+
+Several API worker processes can open the same on-disk store. Writers take an
+exclusive ``flock`` on a lock file next to the store so their
+read-modify-write cycles do not interleave; the kernel drops the lock if the
+holder dies. Platforms without ``fcntl`` get a no-op lock, so a single worker
+process must own writes there.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import weakref
+from pathlib import Path
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """Exclusive lock held through an open descriptor on ``path``.
+
+    Each instance has its own descriptor, so instances exclude each other even
+    inside one process. An instance is not re-entrant and must not be shared
+    between threads without an outer thread lock.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        weakref.finalize(self, os.close, self._fd)
+        if fcntl is None:
+            logger.warning("fcntl is unavailable; %s does not exclude other processes", path)
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Take the lock; with ``blocking`` unset, return ``False`` if it is held."""
+
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def release(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
@@ -0,0 +1,156 @@
+"""Local embedding engine based on feature hashing.
+
+Used when Bedrock is unavailable (offline mode, tests, benchmarks, seeded
+samples, and as the fallback for failed Bedrock batches). Each text becomes
+a sparse bag of features:
+
+* words, weighted 1;
+* adjacent word pairs, weighted 0.5;
+* character 3- and 4-grams of each word, sharing a total weight of 1 per word,
+  so misspellings and inflections ("statin" / "statins") still overlap.
+
+Features are hashed into ``dimension`` signed buckets (the sign halves the
+bias that collisions add to dot products). Each bucket value is
+sublinear-scaled (``sign * log1p(|x|)``) and multiplied by a per-bucket IDF
+weight, then each row is L2-normalised. The IDF weights are uniform unless
+they are fitted on a corpus with :meth:`HashingEmbedder.fit`. Without them the
+output is a function of the text alone, so vectors are identical across
+processes and runs.
+
+Hashing uses CRC-32 once per distinct word (memoised); bigram hashes are
+combined from word hashes and all vectors of a batch are accumulated with a
+single ``np.bincount``.
+"""
+
+from __future__ import annotations
+
+import re
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+_CHAR_NGRAMS = (3, 4)
+_BIGRAM_WEIGHT = 0.5
+_BIGRAM_SALT = np.uint64(0x9E3779B1)
+
+
+@lru_cache(maxsize=200_000)
+def _word_features(word: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashes and weights of ``word`` and its character n-grams."""
+
+    padded = f"<{word}>"
+    grams = [padded[start : start + n] for n in _CHAR_NGRAMS for start in range(len(padded) - n + 1)]
+    hashes = np.fromiter(
+        (zlib.crc32(feature.encode("utf-8")) for feature in [word, *grams]),
+        dtype=np.uint64,
+        count=len(grams) + 1,
+    )
+    weights = np.full(len(hashes), 1.0 / max(len(grams), 1))
+    weights[0] = 1.0
+    return hashes, weights
+
+
+def _word_hash(word: str) -> int:
+    return int(_word_features(word)[0][0])
+
+
+class HashingEmbedder:
+    """Deterministic, batch-capable text embedder of ``dimension`` floats."""
+
+    def __init__(self, dimension: int, idf: Optional[np.ndarray] = None) -> None:
+        if idf is not None and len(idf) != dimension:
+            raise ValueError(f"IDF weights have {len(idf)} entries, expected {dimension}")
+        self.dimension = dimension
+        self.idf = np.asarray(idf, dtype=np.float32) if idf is not None else None
+
+    # ------------------------------------------------------------------
+    # Embedding
+    # ------------------------------------------------------------------
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return self.embed_matrix(texts).tolist()
+
+    def embed_matrix(self, texts: Sequence[str]) -> np.ndarray:
+        """L2-normalised ``float32`` matrix with one row per text."""
+
+        matrix = self._term_frequencies(texts)
+        np.copysign(np.log1p(np.abs(matrix)), matrix, out=matrix)
+        if self.idf is not None:
+            matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    def _term_frequencies(self, texts: Sequence[str]) -> np.ndarray:
+        """Signed, weighted feature counts per hash bucket, before scaling."""
+
+        hashes: List[np.ndarray] = []
+        weights: List[np.ndarray] = []
+        rows: List[np.ndarray] = []
+        for row, text in enumerate(texts):
+            words = _WORD.findall(text.lower())
+            if not words:
+                continue
+            features = [_word_features(word) for word in words]
+            word_hashes = np.fromiter((_word_hash(word) for word in words), dtype=np.uint64, count=len(words))
+            bigrams = (word_hashes[:-1] * _BIGRAM_SALT + word_hashes[1:]) & np.uint64(0xFFFFFFFF)
+            text_hashes = np.concatenate([*(feature[0] for feature in features), bigrams])
+            text_weights = np.concatenate(
+                [*(feature[1] for feature in features), np.full(len(bigrams), _BIGRAM_WEIGHT)]
+            )
+            hashes.append(text_hashes)
+            weights.append(text_weights)
+            rows.append(np.full(len(text_hashes), row, dtype=np.int64))
+
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        if not hashes:
+            return matrix
+        hashed = np.concatenate(hashes)
+        # The low bits pick the bucket, bit 31 picks the sign.
+        buckets = (hashed % np.uint64(self.dimension)).astype(np.int64)
+        signs = np.where(hashed & np.uint64(1 << 31), -1.0, 1.0)
+        flat = np.bincount(
+            np.concatenate(rows) * self.dimension + buckets,
+            weights=np.concatenate(weights) * signs,
+            minlength=len(texts) * self.dimension,
+        )
+        matrix[:] = flat.reshape(len(texts), self.dimension)
+        return matrix
+
+    # ------------------------------------------------------------------
+    # IDF weights
+    # ------------------------------------------------------------------
+    @classmethod
+    def fit(cls, texts: Iterable[str], dimension: int, batch_size: int = 1024) -> "HashingEmbedder":
+        """Embedder whose bucket weights are the smoothed IDF of ``texts``."""
+
+        plain = cls(dimension)
+        document_frequency = np.zeros(dimension, dtype=np.int64)
+        total = 0
+        batch: List[str] = []
+        for text in [*texts, None]:
+            if text is not None:
+                batch.append(text)
+            if batch and (text is None or len(batch) >= batch_size):
+                document_frequency += np.count_nonzero(plain._term_frequencies(batch), axis=0)
+                total += len(batch)
+                batch = []
+        idf = np.log((1 + total) / (1 + document_frequency)) + 1.0
+        return cls(dimension, idf)
+
+    def save(self, path: str) -> None:
+        """Write the fitted IDF weights to ``path`` (a ``.npy`` file)."""
+
+        if self.idf is None:
+            raise ValueError("Only a fitted embedder has IDF weights to save")
+        np.save(path, self.idf)
+
+    @classmethod
+    def load(cls, dimension: int, idf_path: Optional[str] = None) -> "HashingEmbedder":
+        """Embedder using the IDF weights at ``idf_path`` when that file exists."""
+
+        if idf_path and Path(idf_path).exists():
+            return cls(dimension, np.load(idf_path))
+        return cls(dimension)
@@ -0,0 +1,101 @@
+"""Per-field metadata indexes compiled into boolean row masks.
+
+Filters are resolved against indexes before any scoring happens:
+
+* ``year_range`` uses a year-sorted row array and two binary searches.
+* ``authors`` uses a per-author index, so a filter matches any chunk whose
+  ``"; "``-joined author list contains one of the requested authors.
+* Every other filterable field (``journal``, ``year``, ...) uses a hash index
+  from the lower-cased value to its rows.
+
+Indexes are built lazily, per field, the first time a filter needs them.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Fields holding a ``"; "``-joined list, matched per entry.
+TOKENISED_FIELDS = frozenset({"authors"})
+
+
+def filter_tokens(field: str, value: str) -> List[str]:
+    """Keys under which ``value`` of ``field`` is indexed and looked up by filters."""
+
+    if field in TOKENISED_FIELDS:
+        return [author.strip().lower() for author in value.split(";") if author.strip()]
+    return [value.lower()]
+
+
+class MetadataIndex:
+    """Lazily built filter indexes over row-aligned metadata dicts."""
+
+    def __init__(self, row_metadata: List[Dict[str, str]]) -> None:
+        self._row_metadata = row_metadata
+        self._years: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._fields: Dict[str, Dict[str, np.ndarray]] = {}
+
+    @property
+    def rows(self) -> int:
+        return len(self._row_metadata)
+
+    def _year_index(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Years in ascending order and the rows they belong to."""
+
+        if self._years is None:
+            years, rows = [], []
+            for row, metadata in enumerate(self._row_metadata):
+                try:
+                    years.append(int(metadata.get("year")))
+                except (TypeError, ValueError):
+                    continue
+                rows.append(row)
+            order = np.argsort(np.asarray(years, dtype=np.int64), kind="stable")
+            self._years = (np.asarray(years, dtype=np.int64)[order], np.asarray(rows, dtype=np.int64)[order])
+        return self._years
+
+    def _field_index(self, field: str) -> Dict[str, np.ndarray]:
+        index = self._fields.get(field)
+        if index is None:
+            postings: Dict[str, List[int]] = {}
+            for row, metadata in enumerate(self._row_metadata):
+                value = metadata.get(field)
+                if value is None:
+                    continue
+                for key in filter_tokens(field, value):
+                    postings.setdefault(key, []).append(row)
+            index = {key: np.asarray(rows, dtype=np.int64) for key, rows in postings.items()}
+            self._fields[field] = index
+        return index
+
+    def _field_mask(self, field: str, allowed_values) -> np.ndarray:
+        values = allowed_values if isinstance(allowed_values, list) else [allowed_values]
+        keys = {key for value in values for key in filter_tokens(field, str(value))}
+        index = self._field_index(field)
+        mask = np.zeros(self.rows, dtype=bool)
+        for key in keys:
+            rows = index.get(key)
+            if rows is not None:
+                mask[rows] = True
+        return mask
+
+    def mask(self, filters: Optional[Dict], metadata_filter_fields: Iterable[str]) -> Optional[np.ndarray]:
+        """Rows passing ``filters``, or ``None`` when nothing is filtered."""
+
+        if not filters:
+            return None
+
+        mask: Optional[np.ndarray] = None
+        if "year_range" in filters:
+            start, end = filters["year_range"]
+            years, year_rows = self._year_index()
+            mask = np.zeros(self.rows, dtype=bool)
+            mask[year_rows[np.searchsorted(years, start, "left") : np.searchsorted(years, end, "right")]] = True
+
+        for field in metadata_filter_fields:
+            if field in filters and filters[field]:
+                field_mask = self._field_mask(field, filters[field])
+                mask = field_mask if mask is None else mask & field_mask
+        return mask
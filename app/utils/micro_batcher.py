@@ -0,0 +1,111 @@
+"""Micro-batching of small requests from concurrent callers.
+
+Each ``/query`` embeds a single question, while Bedrock accepts batches.
+:class:`MicroBatcher` queues the items submitted by concurrent threads and
+hands them to one ``handler`` call per batch, then routes each result back to
+the thread that submitted it.
+
+A batch is dispatched as soon as it holds ``max_batch_size`` items, or when
+no batch is in flight, or ``max_wait`` seconds after its first item arrived,
+whichever comes first. An idle service therefore sends a lone request
+immediately, and requests only wait to be grouped while earlier batches are
+still on the wire.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+Item = TypeVar("Item")
+Result = TypeVar("Result")
+
+
+class MicroBatcher(Generic[Item, Result]):
+    """Group ``submit`` calls into batches of up to ``max_batch_size`` items.
+
+    At most ``workers`` batches are handled at once; ``handler`` must return
+    one result per item, in order.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Item]], Sequence[Result]],
+        max_batch_size: int,
+        max_wait: float,
+        workers: int = 4,
+    ) -> None:
+        self._handler = handler
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self._workers = max(1, workers)
+        self._pending: List[Tuple[Item, Future]] = []
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="micro-batch")
+        self._thread: Optional[threading.Thread] = None
+        self._batches = 0
+        self._items = 0
+
+    def submit(self, items: Sequence[Item]) -> List[Result]:
+        """Results for ``items``, blocking until their batches have been handled."""
+
+        futures = [Future() for _ in items]
+        with self._condition:
+            self._pending.extend(zip(items, futures))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._collect, name="micro-batcher", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+        return [future.result() for future in futures]
+
+    def stats(self) -> Dict[str, float]:
+        with self._condition:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+            }
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+    def _collect(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending or self._in_flight >= self._workers:
+                    self._condition.wait()
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch_size and self._in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._pending[: self.max_batch_size]
+                del self._pending[: self.max_batch_size]
+                self._in_flight += 1
+                self._batches += 1
+                self._items += len(batch)
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: List[Tuple[Item, Future]]) -> None:
+        try:
+            results = self._handler([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch handler returned {len(results)} results for {len(batch)} items")
+        except BaseException as exc:
+            logger.warning("Micro-batch of %s items failed: %s", len(batch), exc)
+            for _, future in batch:
+                future.set_exception(exc)
+        else:
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
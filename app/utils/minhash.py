@@ -0,0 +1,186 @@
+"""MinHash signatures and locality-sensitive hashing for near-duplicate documents.
+
+A document is reduced to the set of word shingles of its chunks, and the
+set to a MinHash signature of ``permutations`` values. The fraction of equal
+positions in two signatures estimates the Jaccard similarity of their
+shingle sets, so a preprint and its published version, or two exports of
+one PDF, come out close to 1.0 even though their bytes differ.
+
+:class:`LSHIndex` splits signatures into ``bands`` bands of equal width and
+buckets documents by the hash of each band. Documents sharing any bucket with
+a query are candidates, and only they are compared with it, so a lookup
+does not depend on the number of stored documents. The default of 16 bands
+of 8 values finds pairs above roughly 0.7 similarity almost surely, and the
+candidates are then checked against the caller's threshold.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import zlib
+from collections import ChainMap
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+# Hash permutations are ``(a * x + b) mod p`` over 32-bit shingle hashes,
+# with ``a < 2**31`` so the product fits in 64 bits.
+_PRIME = np.uint64((1 << 32) + 15)
+_SEED = 1
+# Shingle hashes processed at once, bounding the (shingles x permutations) block.
+_BLOCK = 4096
+
+_WORD = re.compile(r"\w+")
+# Copy-on-write layers an index may stack up through derive() before it is flattened.
+_MAX_LAYERS = 32
+
+
+def _permutations(count: int) -> Tuple[np.ndarray, np.ndarray]:
+    generator = np.random.default_rng(_SEED)
+    a = generator.integers(1, 1 << 31, size=count, dtype=np.uint64)
+    b = generator.integers(0, 1 << 32, size=count, dtype=np.uint64)
+    return a, b
+
+
+def shingles(texts: Iterable[str], size: int = settings.minhash_shingle_size) -> Set[int]:
+    """32-bit hashes of the ``size``-word shingles of each text.
+
+    Shingles do not cross text boundaries; a text shorter than ``size`` words
+    contributes one shingle of all its words.
+    """
+
+    hashed: Set[int] = set()
+    for text in texts:
+        words = _WORD.findall(text.lower())
+        for start in range(max(len(words) - size + 1, 1 if words else 0)):
+            hashed.add(zlib.crc32(" ".join(words[start : start + size]).encode("utf-8")))
+    return hashed
+
+
+def minhash(hashes: Set[int], permutations: int = settings.minhash_permutations) -> np.ndarray:
+    """MinHash signature of a set of shingle hashes (all ``p`` for an empty set)."""
+
+    a, b = _permutations(permutations)
+    signature = np.full(permutations, _PRIME, dtype=np.uint64)
+    values = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+    for start in range(0, len(values), _BLOCK):
+        block = values[start : start + _BLOCK, None]
+        np.minimum(signature, ((block * a + b) % _PRIME).min(axis=0), out=signature)
+    return signature
+
+
+def document_signature(texts: Iterable[str]) -> np.ndarray:
+    """MinHash signature of the shingles of a document's chunk texts."""
+
+    return minhash(shingles(texts))
+
+
+def similarity(first: Sequence[int], second: Sequence[int]) -> float:
+    """Jaccard similarity estimated from two signatures."""
+
+    first, second = np.asarray(first, dtype=np.uint64), np.asarray(second, dtype=np.uint64)
+    if first.shape != second.shape or not len(first):
+        return 0.0
+    return float(np.mean(first == second))
+
+
+def band_keys(signature: Sequence[int], bands: int = settings.minhash_bands) -> List[Tuple[int, int]]:
+    """``(band, bucket)`` pairs of a signature; buckets are signed 64-bit hashes."""
+
+    values = np.asarray(signature, dtype=np.uint64)
+    rows = max(len(values) // max(bands, 1), 1)
+    keys = []
+    for band in range(len(values) // rows):
+        digest = hashlib.blake2b(values[band * rows : (band + 1) * rows].tobytes(), digest_size=8).digest()
+        keys.append((band, int.from_bytes(digest, "big", signed=True)))
+    return keys
+
+
+class LSHIndex:
+    """In-memory banded LSH index of document signatures.
+
+    :meth:`derive` starts a new version whose updates go into fresh top
+    layers over this index's dicts, which it never changes. Buckets are
+    frozensets replaced on update, and removed signatures are masked with
+    ``None`` in the top layer. Past ``_MAX_LAYERS`` the layers are flattened.
+    """
+
+    def __init__(self, bands: int = settings.minhash_bands) -> None:
+        self.bands = bands
+        self._signatures: ChainMap = ChainMap({})
+        self._buckets: ChainMap = ChainMap({})
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def derive(self) -> "LSHIndex":
+        """New version of the index to apply a write to, leaving this one unchanged."""
+
+        derived = LSHIndex(self.bands)
+        if len(self._signatures.maps) < _MAX_LAYERS:
+            derived._signatures = self._signatures.new_child()
+            derived._buckets = self._buckets.new_child()
+        else:
+            signatures = {key: signature for key, signature in self._signatures.items() if signature is not None}
+            derived._signatures = ChainMap({}, signatures)
+            derived._buckets = ChainMap({}, {bucket: members for bucket, members in self._buckets.items() if members})
+        derived._size = self._size
+        return derived
+
+    def add(self, key: str, signature: Sequence[int]) -> None:
+        self.remove(key)
+        signature = np.asarray(signature, dtype=np.uint64)
+        self._signatures[key] = signature
+        self._size += 1
+        for bucket in band_keys(signature, self.bands):
+            self._buckets[bucket] = self._buckets.get(bucket, frozenset()) | {key}
+
+    def remove(self, key: str) -> bool:
+        signature = self._signatures.get(key)
+        if signature is None:
+            return False
+        layered = len(self._signatures.maps) > 1
+        if layered:
+            self._signatures[key] = None
+        else:
+            del self._signatures[key]
+        self._size -= 1
+        for bucket in band_keys(signature, self.bands):
+            members = self._buckets.get(bucket, frozenset()) - {key}
+            if members or layered:
+                self._buckets[bucket] = members
+            else:
+                self._buckets.pop(bucket, None)
+        return True
+
+    def candidates(self, signature: Sequence[int]) -> Set[str]:
+        found: Set[str] = set()
+        for bucket in band_keys(signature, self.bands):
+            found |= self._buckets.get(bucket, frozenset())
+        return found
+
+    def best_match(self, signature: Sequence[int], threshold: float) -> Optional[Tuple[str, float]]:
+        """Most similar stored key with estimated similarity of at least ``threshold``."""
+
+        return best_match(
+            ((key, self._signatures[key]) for key in self.candidates(signature)), signature, threshold
+        )
+
+
+def best_match(
+    candidates: Iterable[Tuple[str, Sequence[int]]],
+    signature: Sequence[int],
+    threshold: float,
+) -> Optional[Tuple[str, float]]:
+    """The ``(key, similarity)`` of the closest candidate at or above ``threshold``."""
+
+    best: Optional[Tuple[str, float]] = None
+    for key, candidate in candidates:
+        score = similarity(signature, candidate)
+        if score >= threshold and (best is None or score > best[1]):
+            best = (key, score)
+    return best
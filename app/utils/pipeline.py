@@ -0,0 +1,228 @@
+"""Bounded, multi-stage worker pipelines.
+
+A :class:`Pipeline` runs a sequence of :class:`Stage` functions over a stream
+of items. Each stage has its own worker threads and reads from a bounded
+queue filled by the stage before it, so a slow stage blocks its producers
+(backpressure) rather than letting work pile up in memory. Different items
+are in different stages at the same time: one document can be parsed while
+another is embedded and a third is uploaded.
+
+Per-stage counters (items processed and failed, busy time, throughput and
+the deepest its input queue has been) accumulate over every run.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Queued in place of an item to tell a stage's workers to exit.
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """One step of a pipeline: ``function`` applied by ``workers`` threads.
+
+    A stage may return ``finished(value)`` to hand ``value`` straight to the
+    output, bypassing later stages.
+    """
+
+    name: str
+    function: Callable[[Any], Any]
+    workers: int = 1
+
+
+class _Finished:
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+
+def finished(value: Any) -> _Finished:
+    """Mark ``value`` as the item's final result; later stages are skipped."""
+
+    return _Finished(value)
+
+
+class _Failed:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+def failed(error: BaseException) -> _Failed:
+    """Input item standing for one that could not be produced; it is output as ``error``."""
+
+    return _Failed(error)
+
+
+@dataclass
+class _StageStats:
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    max_queue_depth: int = 0
+
+
+class Pipeline:
+    """Runs items through ``stages`` with at most ``queue_size`` items waiting per stage."""
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4) -> None:
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self._workers = [max(1, stage.workers) for stage in stages]
+        self._stats = {stage.name: _StageStats() for stage in stages}
+        self._stats_lock = threading.Lock()
+        self._wall_seconds = 0.0
+
+    def run(
+        self,
+        items: Iterable[Any],
+        on_done: Optional[Callable[[int, Any, Optional[BaseException]], None]] = None,
+    ) -> Iterator[Tuple[Any, Optional[BaseException]]]:
+        """Yield ``(result, error)`` per input item, in input order.
+
+        ``items`` is consumed lazily, only as fast as the first stage accepts
+        work. An input given as ``failed(exc)`` skips every stage and is
+        output with ``exc`` as its error. When a stage raises, ``error`` is
+        that exception and the item skips the remaining stages. Results that
+        finish ahead of an earlier item are held until it is done, so they
+        should be small; resources an item holds should be released from
+        ``on_done``, which a worker calls with the item's index, result and
+        error as soon as it leaves the pipeline.
+        """
+
+        queues: List[queue.Queue] = [queue.Queue(self.queue_size) for _ in self.stages]
+        outputs: Dict[int, Tuple[Any, Optional[BaseException]]] = {}
+        output_ready = threading.Condition()
+        threads: List[threading.Thread] = []
+        remaining = list(self._workers)
+        remaining_lock = threading.Lock()
+
+        def emit(index: int, result: Any, error: Optional[BaseException]) -> None:
+            if on_done is not None:
+                try:
+                    on_done(index, result, error)
+                except Exception as exc:
+                    logger.warning("Pipeline on_done callback failed: %s", exc)
+            with output_ready:
+                outputs[index] = (result, error)
+                output_ready.notify_all()
+
+        def work(position: int) -> None:
+            stage = self.stages[position]
+            inbox = queues[position]
+            while True:
+                entry = inbox.get()
+                if entry is _DONE:
+                    break
+                index, value = entry
+                started = time.perf_counter()
+                try:
+                    result = stage.function(value)
+                except Exception as exc:
+                    self._record(stage.name, started, failed=True)
+                    logger.warning("Pipeline stage %s failed: %s", stage.name, exc)
+                    emit(index, None, exc)
+                    continue
+                self._record(stage.name, started)
+                if isinstance(result, _Finished):
+                    emit(index, result.value, None)
+                elif position + 1 < len(self.stages):
+                    self._put(queues[position + 1], self.stages[position + 1].name, (index, result))
+                else:
+                    emit(index, result, None)
+            # The last worker of a stage to exit closes the next stage.
+            with remaining_lock:
+                remaining[position] -= 1
+                last = remaining[position] == 0
+            if last and position + 1 < len(self.stages):
+                for _ in range(self._workers[position + 1]):
+                    queues[position + 1].put(_DONE)
+
+        submitted = [0]
+        feeding_done = threading.Event()
+
+        def feed() -> None:
+            try:
+                for index, item in enumerate(items):
+                    with output_ready:
+                        submitted[0] = index + 1
+                    if isinstance(item, _Failed):
+                        emit(index, None, item.error)
+                    else:
+                        self._put(queues[0], self.stages[0].name, (index, item))
+            finally:
+                for _ in range(self._workers[0]):
+                    queues[0].put(_DONE)
+                with output_ready:
+                    feeding_done.set()
+                    output_ready.notify_all()
+
+        started = time.perf_counter()
+        for position, stage in enumerate(self.stages):
+            for worker in range(self._workers[position]):
+                thread = threading.Thread(target=work, args=(position,), name=f"{stage.name}-{worker}", daemon=True)
+                thread.start()
+                threads.append(thread)
+        feeder = threading.Thread(target=feed, name="pipeline-feed", daemon=True)
+        feeder.start()
+
+        try:
+            next_index = 0
+            while True:
+                with output_ready:
+                    while next_index not in outputs and not (feeding_done.is_set() and next_index >= submitted[0]):
+                        output_ready.wait()
+                    if next_index not in outputs:
+                        break
+                    output = outputs.pop(next_index)
+                yield output
+                next_index += 1
+        finally:
+            feeder.join()
+            for thread in threads:
+                thread.join()
+            with self._stats_lock:
+                self._wall_seconds += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage counters accumulated over all runs."""
+
+        with self._stats_lock:
+            wall = self._wall_seconds
+            return {
+                name: {
+                    "processed": stats.processed,
+                    "failed": stats.failed,
+                    "busy_seconds": round(stats.busy_seconds, 3),
+                    "items_per_second": stats.processed / wall if wall else 0.0,
+                    "max_queue_depth": stats.max_queue_depth,
+                }
+                for name, stats in self._stats.items()
+            }
+
+    def _put(self, inbox: queue.Queue, stage_name: str, entry: Tuple[int, Any]) -> None:
+        inbox.put(entry)
+        depth = inbox.qsize()
+        with self._stats_lock:
+            stats = self._stats[stage_name]
+            stats.max_queue_depth = max(stats.max_queue_depth, depth)
+
+    def _record(self, stage_name: str, started: float, failed: bool = False) -> None:
+        with self._stats_lock:
+            stats = self._stats[stage_name]
+            stats.busy_seconds += time.perf_counter() - started
+            if failed:
+                stats.failed += 1
+            else:
+                stats.processed += 1
@@ -0,0 +1,97 @@
+"""In-process LRU of query embeddings with single-flight misses.
+
+Clinicians ask the same questions many times a day, so question embeddings
+are kept in memory keyed by their normalised text. When several requests
+miss on the same key at once, only the first one computes it; the others
+wait for its result instead of sending duplicate Bedrock calls.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Sequence, Tuple
+
+Vector = List[float]
+
+
+def normalise_question(question: str) -> str:
+    """Cache key for ``question``: lower-cased with whitespace collapsed."""
+
+    return " ".join(question.lower().split())
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU of at most ``max_entries`` embeddings."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Vector]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+
+    def get_or_compute(
+        self,
+        keys: Sequence[str],
+        compute: Callable[[List[str]], Tuple[List[Vector], List[bool]]],
+    ) -> List[Vector]:
+        """Embeddings for ``keys``, calling ``compute`` once for the keys nobody has.
+
+        ``compute`` returns the vectors and, per key, whether the vector may be
+        cached (fallback embeddings must not be). If it raises, callers waiting
+        on those keys see the same exception.
+        """
+
+        found: Dict[str, Vector] = {}
+        waiting: Dict[str, Future] = {}
+        owned: Dict[str, Future] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+                    self._hits += 1
+                elif key in self._in_flight:
+                    waiting[key] = self._in_flight[key]
+                    self._coalesced += 1
+                else:
+                    owned[key] = self._in_flight[key] = Future()
+                    self._misses += 1
+
+        if owned:
+            try:
+                vectors, cacheable = compute(list(owned))
+            except BaseException as exc:
+                with self._lock:
+                    for key, future in owned.items():
+                        del self._in_flight[key]
+                        future.set_exception(exc)
+                raise
+            with self._lock:
+                for (key, future), vector, keep in zip(owned.items(), vectors, cacheable):
+                    if keep and self.max_entries > 0:
+                        self._entries[key] = vector
+                        if len(self._entries) > self.max_entries:
+                            self._entries.popitem(last=False)
+                    del self._in_flight[key]
+                    future.set_result(vector)
+                    found[key] = vector
+
+        for key, future in waiting.items():
+            found[key] = future.result()
+        return [found[key] for key in keys]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses + self._coalesced
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "hit_rate": (self._hits + self._coalesced) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
@@ -0,0 +1,68 @@
+"""Client-side token bucket that adapts to service throttling.
+
+Bedrock enforces per-account request quotas and answers bursts beyond them
+with ``ThrottlingException``. Concurrent callers take a token before each
+request; the refill rate is cut in half whenever a request is throttled and
+creeps back towards the configured ceiling while requests succeed (additive
+increase, multiplicative decrease), so parallel workers settle just below the
+quota instead of hammering it.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveRateLimiter:
+    """Token bucket allowing at most ``max_rate`` requests per second.
+
+    ``burst`` tokens may be spent at once (default: one second's worth). A
+    ``max_rate`` of zero or less disables limiting.
+    """
+
+    def __init__(self, max_rate: float, burst: Optional[float] = None, min_rate: float = 0.5) -> None:
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate) if max_rate > 0 else min_rate
+        self.rate = max_rate
+        self.burst = burst if burst is not None else max(max_rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take one token, sleeping until the bucket has refilled enough."""
+
+        if self.max_rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token even when the bucket is empty; the debt is
+            # paid off by sleeping, which keeps waiting callers in order.
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+    def throttled(self) -> None:
+        """Halve the request rate after the service rejected a request."""
+
+        if self.max_rate <= 0:
+            return
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+        logger.info("Throttled by Bedrock; lowering request rate to %.2f/s", self.rate)
+
+    def succeeded(self) -> None:
+        """Raise the request rate a step back towards ``max_rate``."""
+
+        if self.max_rate <= 0 or self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
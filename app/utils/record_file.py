@@ -0,0 +1,65 @@
+"""Write-once files of JSON records addressed by byte offset.
+
+Records are stored as consecutive UTF-8 JSON lines with a separate ``int64``
+offsets array (``len(records) + 1`` entries), so any record can be fetched with
+a single ``pread`` without loading or scanning the rest of the file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import weakref
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+
+def write_records(path: Path, offsets_path: Path, records: Iterable[Dict]) -> int:
+    """Write ``records`` and their offsets; returns the number of records."""
+
+    offsets = [0]
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("wb") as handle:
+        for record in records:
+            line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+            handle.write(line)
+            offsets.append(offsets[-1] + len(line))
+        handle.flush()
+        os.fsync(handle.fileno())
+    tmp_path.replace(path)
+
+    tmp_offsets = offsets_path.with_suffix(".tmp")
+    with tmp_offsets.open("wb") as handle:
+        np.save(handle, np.asarray(offsets, dtype=np.int64))
+    tmp_offsets.replace(offsets_path)
+    return len(offsets) - 1
+
+
+class RecordFile:
+    """Read-only view of a record file.
+
+    The file descriptor stays open for the object's lifetime, so records can
+    still be read after a compaction has unlinked the file.
+    """
+
+    def __init__(self, path: Path, offsets_path: Path) -> None:
+        self.path = path
+        self.offsets = np.load(offsets_path, mmap_mode="r")
+        self._fd = os.open(path, os.O_RDONLY)
+        weakref.finalize(self, os.close, self._fd)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def read(self, row: int) -> Dict:
+        start, stop = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(os.pread(self._fd, stop - start, start))
+
+    def read_range(self, start: int, stop: int) -> List[Dict]:
+        if stop <= start:
+            return []
+        first, last = int(self.offsets[start]), int(self.offsets[stop])
+        payload = os.pread(self._fd, last - first, first)
+        return [json.loads(line) for line in payload.splitlines()]
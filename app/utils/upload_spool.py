@@ -0,0 +1,91 @@
+"""Spooling of uploaded documents with incremental hashing.
+
+Uploads are copied in fixed-size blocks into a :class:`SpooledUpload`, which
+keeps small files in memory and moves larger ones to a named temporary file
+on disk, so a 200 MB supplementary PDF never sits in memory whole. The
+SHA-256 used as the document id is computed while copying, so duplicates can
+be rejected before any parsing.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import tempfile
+from typing import BinaryIO, Optional, Union
+
+from app.core.config import settings
+
+BLOCK_SIZE = 1024 * 1024
+
+
+class SpooledUpload:
+    """Write-once document buffer in memory up to ``max_memory`` bytes, then on disk.
+
+    Call :meth:`write` for each block, then :meth:`open` to read it back (each
+    call rewinds). Closing deletes any temporary file.
+    """
+
+    def __init__(self, max_memory: Optional[int] = None) -> None:
+        self.max_memory = max_memory if max_memory is not None else settings.upload_spool_memory_mb * 1024 * 1024
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file: BinaryIO = io.BytesIO()
+        self.path: Optional[str] = None
+
+    @classmethod
+    def from_stream(cls, stream: BinaryIO, max_memory: Optional[int] = None) -> "SpooledUpload":
+        upload = cls(max_memory)
+        try:
+            while True:
+                block = stream.read(BLOCK_SIZE)
+                if not block:
+                    return upload
+                upload.write(block)
+        except BaseException:
+            # Removes any temporary file a partly copied stream was spooled to.
+            upload.close()
+            raise
+
+    def write(self, block: bytes) -> None:
+        self._hash.update(block)
+        self.size += len(block)
+        if self.path is None and self.size > self.max_memory:
+            self._roll_to_disk()
+        self._file.write(block)
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def open(self) -> BinaryIO:
+        """The spooled content, rewound to the start."""
+
+        self._file.seek(0)
+        return self._file
+
+    def source(self) -> Union[bytes, str]:
+        """The content as bytes when held in memory, otherwise the temporary file's path.
+
+        Either form can be sent to an extraction worker process.
+        """
+
+        if self.path is not None:
+            self._file.flush()
+            return self.path
+        return self._file.getvalue()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _roll_to_disk(self) -> None:
+        spooled = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".part")
+        spooled.write(self._file.getvalue())
+        self._file = spooled
+        self.path = spooled.name
@@ -1,30 +1,56 @@
 """Batch ingestion helper for local datasets."""
 
 import argparse
-import io
 import pathlib
 
-from app.api.dependencies import get_ingestion_service
+from app.api.dependencies import get_embedding_service, get_extraction_pool, get_ingestion_service
+from app.core.config import settings
 
 
-def ingest_directory(path: pathlib.Path) -> None:
-    ingestion_service = get_ingestion_service()
-    documents = []
+def _read_documents(path: pathlib.Path):
+    # Files are opened only when the ingestion pipeline has room for them,
+    # and spooled in blocks rather than read whole.
     for file_path in path.glob("**/*"):
         if file_path.is_dir():
             continue
         with file_path.open("rb") as handle:
-            documents.append((io.BytesIO(handle.read()), file_path.name, {}))
+            yield handle, file_path.name, {}
 
-    results = ingestion_service.ingest_batch(documents)
+
+def ingest_directory(path: pathlib.Path) -> None:
+    ingestion_service = get_ingestion_service()
+    results = ingestion_service.ingest_batch(_read_documents(path))
     for result in results:
         print(result)
 
+    for stage, stats in ingestion_service.pipeline_stats().items():
+        print(
+            f"{stage}: {stats['processed']} done, {stats['failed']} failed, "
+            f"{stats['items_per_second']:.2f}/s, busy {stats['busy_seconds']:.1f}s, "
+            f"max queue {stats['max_queue_depth']}"
+        )
+
+    extraction_pool = get_extraction_pool()
+    if extraction_pool is not None:
+        extraction_pool.shutdown()
+
+    cache_stats = get_embedding_service().cache_stats()
+    if cache_stats:
+        print(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})")
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Batch ingest documents")
     parser.add_argument("path", type=pathlib.Path)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="PDF/DOCX extraction processes (default: EXTRACTION_PROCESSES; 0 extracts in-process)",
+    )
     args = parser.parse_args()
+    if args.processes is not None:
+        settings.extraction_processes = args.processes
     ingest_directory(args.path)
 
 
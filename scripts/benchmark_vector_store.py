@@ -0,0 +1,282 @@
+"""Synthetic benchmarks for the mapped vector store.
+
+Builds a throwaway store of clustered random embeddings and reports
+recall/latency figures, e.g.::
+
+    python -m scripts.benchmark_vector_store ann --rows 50000 --nprobe 4 8 16
+    python -m scripts.benchmark_vector_store quantization --rows 50000
+    python -m scripts.benchmark_vector_store topk --rows 200000
+    python -m scripts.benchmark_vector_store documents --documents 400 --chunks 200
+    python -m scripts.benchmark_vector_store batch --rows 100000 --queries 200
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+import numpy as np
+
+from app.services.mapped_store import MappedVectorStore
+from app.services.vector_store import _top_k
+from app.utils.ann import recall_at_k
+from app.utils.chunking import Chunk
+
+_CHUNKS_PER_DOCUMENT = 50
+
+
+def _clustered_vectors(rows: int, dimension: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dimension))
+    vectors = centres[rng.integers(0, clusters, size=rows)] + 0.35 * rng.normal(size=(rows, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _build_store(
+    path: str,
+    vectors: np.ndarray,
+    chunks_per_document: int = _CHUNKS_PER_DOCUMENT,
+    **store_options,
+) -> MappedVectorStore:
+    store = MappedVectorStore(path, flush_threshold=len(vectors) + 1, **store_options)
+    for start in range(0, len(vectors), chunks_per_document):
+        document_id = f"doc-{start // chunks_per_document}"
+        metadata = {"document_id": document_id, "title": document_id}
+        block = vectors[start : start + chunks_per_document]
+        chunks = [
+            Chunk(content=f"{document_id} chunk {offset}", position=offset, metadata=metadata)
+            for offset in range(len(block))
+        ]
+        store.add_document(document_id, f"{document_id}.txt", metadata, chunks, block.tolist())
+    store.flush()
+    return store
+
+
+def _chunk_ids(results: List[dict]) -> np.ndarray:
+    return np.asarray([result["chunk"]["chunk_id"] for result in results])
+
+
+def _percentile_ms(samples: List[float], percentile: float) -> float:
+    return float(np.percentile(samples, percentile) * 1000)
+
+
+def _queries(vectors: np.ndarray, count: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed + 1)
+    queries = vectors[rng.choice(len(vectors), size=count, replace=False)]
+    return queries + 0.1 * rng.normal(size=queries.shape).astype(np.float32)
+
+
+def _timed_searches(store: MappedVectorStore, queries: np.ndarray, k: int, exact: bool = False):
+    results, latency = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(_chunk_ids(store.search("", query.tolist(), None, [], 1.0, k, exact=exact)))
+        latency.append(time.perf_counter() - start)
+    return results, latency
+
+
+def benchmark_ann(args: argparse.Namespace) -> None:
+    vectors = _clustered_vectors(args.rows, args.dimension, args.clusters, args.seed)
+    queries = _queries(vectors, args.queries, args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = _build_store(
+            directory,
+            vectors,
+            ann_enabled=True,
+            ann_nlist=args.nlist,
+            ann_train_threshold=args.rows * 10,
+        )
+        start = time.perf_counter()
+        store.rebuild_ann_index()
+        print(f"rows={args.rows} dim={args.dimension} lists={store._ivf.nlist} train={time.perf_counter() - start:.2f}s")
+
+        exact_results, exact_latency = _timed_searches(store, queries, args.k, exact=True)
+        print(f"exact      p50={_percentile_ms(exact_latency, 50):7.2f}ms p95={_percentile_ms(exact_latency, 95):7.2f}ms")
+
+        for nprobe in args.nprobe:
+            store._ann_nprobe = nprobe
+            recalls, latency = [], []
+            for query, exact in zip(queries, exact_results):
+                start = time.perf_counter()
+                approximate = _chunk_ids(store.search("", query.tolist(), None, [], 1.0, args.k))
+                latency.append(time.perf_counter() - start)
+                recalls.append(recall_at_k(exact, approximate))
+            print(
+                f"nprobe={nprobe:<4} p50={_percentile_ms(latency, 50):7.2f}ms "
+                f"p95={_percentile_ms(latency, 95):7.2f}ms recall@{args.k}={np.mean(recalls):.3f}"
+            )
+
+
+def benchmark_quantization(args: argparse.Namespace) -> None:
+    vectors = _clustered_vectors(args.rows, args.dimension, args.clusters, args.seed)
+    queries = _queries(vectors, args.queries, args.seed)
+    float_mb = vectors.nbytes / 1e6
+    print(f"rows={args.rows} dim={args.dimension} float32={float_mb:.1f}MB")
+
+    for kind in args.kinds:
+        with tempfile.TemporaryDirectory() as directory:
+            store = _build_store(directory, vectors, quantization=kind, pq_subspaces=args.pq_subspaces)
+            exact_results, exact_latency = _timed_searches(store, queries, args.k, exact=True)
+            start = time.perf_counter()
+            store.train_quantizer()
+            train_seconds = time.perf_counter() - start
+            code_mb = args.rows * store._quantizer.code_bytes() / 1e6
+            print(
+                f"{kind:<5} train={train_seconds:.2f}s codes={code_mb:.2f}MB "
+                f"({float_mb / code_mb:.0f}x smaller) exact p50={_percentile_ms(exact_latency, 50):.2f}ms"
+            )
+            for factor in args.rerank_factor:
+                store._rerank_factor = factor
+                results, latency = _timed_searches(store, queries, args.k)
+                recall = np.mean([recall_at_k(exact, found) for exact, found in zip(exact_results, results)])
+                print(
+                    f"  rerank={factor:<3} p50={_percentile_ms(latency, 50):7.2f}ms "
+                    f"p95={_percentile_ms(latency, 95):7.2f}ms recall@{args.k}={recall:.3f}"
+                )
+
+
+def _select_by_sorting(scores: np.ndarray, rows: List[Dict], k: int) -> List[Dict]:
+    """Previous search path: a payload per scored chunk, then a full sort."""
+
+    results = []
+    for score, row in zip(scores.tolist(), rows):
+        results.append((score, {"chunk": row, "metadata": row["metadata"], "score": score}))
+    results.sort(key=lambda item: item[0], reverse=True)
+    return [payload for _, payload in results[:k]]
+
+
+def _select_top_k(scores: np.ndarray, rows: List[Dict], k: int) -> List[Dict]:
+    """Current search path: partial selection, payloads for the winners only."""
+
+    return [
+        {"chunk": rows[index], "metadata": rows[index]["metadata"], "score": float(scores[index])}
+        for index in _top_k(scores, k).tolist()
+    ]
+
+
+def benchmark_documents(args: argparse.Namespace) -> None:
+    # One cluster per document, as with chunks of a long paper on one topic.
+    rows = args.documents * args.chunks
+    rng = np.random.default_rng(args.seed)
+    topics = rng.normal(size=(args.documents, args.dimension))
+    vectors = np.repeat(topics, args.chunks, axis=0) + 0.5 * rng.normal(size=(rows, args.dimension))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    queries = _queries(vectors, args.queries, args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = _build_store(directory, vectors, args.chunks, top_documents=args.top_documents)
+        exact_results, exact_latency = _timed_searches(store, queries, args.k, exact=True)
+        results, latency = _timed_searches(store, queries, args.k)
+        recall = np.mean([recall_at_k(exact, found) for exact, found in zip(exact_results, results)])
+        print(f"documents={args.documents} chunks/document={args.chunks} rows={rows}")
+        print(f"exact         p50={_percentile_ms(exact_latency, 50):7.2f}ms p95={_percentile_ms(exact_latency, 95):7.2f}ms")
+        print(
+            f"top {args.top_documents:<3} docs  p50={_percentile_ms(latency, 50):7.2f}ms "
+            f"p95={_percentile_ms(latency, 95):7.2f}ms recall@{args.k}={recall:.3f}"
+        )
+
+
+def benchmark_topk(args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(args.seed)
+    scores = rng.random(args.rows)
+    rows = [{"chunk_id": str(row), "metadata": {}} for row in range(args.rows)]
+    print(f"rows={args.rows} k={args.k}")
+
+    for label, select in (("full sort", _select_by_sorting), ("top-k", _select_top_k)):
+        latency = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            select(scores, rows, args.k)
+            latency.append(time.perf_counter() - start)
+        tracemalloc.start()
+        select(scores, rows, args.k)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:<10} p50={_percentile_ms(latency, 50):8.2f}ms peak alloc={peak / 1e6:8.2f}MB")
+
+
+def benchmark_batch(args: argparse.Namespace) -> None:
+    vectors = _clustered_vectors(args.rows, args.dimension, args.clusters, args.seed)
+    queries = _queries(vectors, args.queries, args.seed)
+    questions = [f"doc-{index} chunk" for index in range(len(queries))]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = _build_store(directory, vectors)
+        start = time.perf_counter()
+        single = [
+            _chunk_ids(store.search(question, query.tolist(), None, [], 0.6, args.k))
+            for question, query in zip(questions, queries)
+        ]
+        single_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = store.search_batch(questions, queries.tolist(), [None] * len(queries), [], 0.6, args.k)
+        batch_seconds = time.perf_counter() - start
+
+        identical = all(np.array_equal(ids, _chunk_ids(results)) for ids, results in zip(single, batched))
+        print(f"rows={args.rows} queries={args.queries} k={args.k}")
+        print(f"one by one  {args.queries / single_seconds:9.1f} queries/s")
+        print(f"batched     {args.queries / batch_seconds:9.1f} queries/s  identical results={identical}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the mapped vector store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ann = subparsers.add_parser("ann", help="IVF recall@k and latency against exact search")
+    ann.add_argument("--rows", type=int, default=20000)
+    ann.add_argument("--dimension", type=int, default=256)
+    ann.add_argument("--clusters", type=int, default=64)
+    ann.add_argument("--queries", type=int, default=100)
+    ann.add_argument("--k", type=int, default=10)
+    ann.add_argument("--nlist", type=int, default=0)
+    ann.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    ann.add_argument("--seed", type=int, default=0)
+    ann.set_defaults(handler=benchmark_ann)
+
+    quantization = subparsers.add_parser("quantization", help="Compressed-code memory, recall@k and latency")
+    quantization.add_argument("--rows", type=int, default=20000)
+    quantization.add_argument("--dimension", type=int, default=256)
+    quantization.add_argument("--clusters", type=int, default=64)
+    quantization.add_argument("--queries", type=int, default=100)
+    quantization.add_argument("--k", type=int, default=10)
+    quantization.add_argument("--kinds", nargs="+", default=["int8", "pq"], choices=["int8", "pq"])
+    quantization.add_argument("--pq-subspaces", type=int, default=16)
+    quantization.add_argument("--rerank-factor", type=int, nargs="+", default=[1, 4, 10])
+    quantization.add_argument("--seed", type=int, default=0)
+    quantization.set_defaults(handler=benchmark_quantization)
+
+    documents = subparsers.add_parser("documents", help="Two-stage document-then-chunk search against exact search")
+    documents.add_argument("--documents", type=int, default=400)
+    documents.add_argument("--chunks", type=int, default=200)
+    documents.add_argument("--dimension", type=int, default=256)
+    documents.add_argument("--queries", type=int, default=50)
+    documents.add_argument("--k", type=int, default=10)
+    documents.add_argument("--top-documents", type=int, default=20)
+    documents.add_argument("--seed", type=int, default=0)
+    documents.set_defaults(handler=benchmark_documents)
+
+    topk = subparsers.add_parser("topk", help="Full sort versus partial top-k selection of scored chunks")
+    topk.add_argument("--rows", type=int, default=200000)
+    topk.add_argument("--k", type=int, default=25)
+    topk.add_argument("--repeats", type=int, default=10)
+    topk.add_argument("--seed", type=int, default=0)
+    topk.set_defaults(handler=benchmark_topk)
+
+    batch = subparsers.add_parser("batch", help="Throughput of search_batch against one search per query")
+    batch.add_argument("--rows", type=int, default=100000)
+    batch.add_argument("--dimension", type=int, default=256)
+    batch.add_argument("--clusters", type=int, default=64)
+    batch.add_argument("--queries", type=int, default=200)
+    batch.add_argument("--k", type=int, default=10)
+    batch.add_argument("--seed", type=int, default=0)
+    batch.set_defaults(handler=benchmark_batch)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
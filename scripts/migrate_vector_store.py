@@ -0,0 +1,21 @@
+"""Convert the JSON vector store into the memory-mapped columnar format."""
+
+import argparse
+
+from app.core.config import settings
+from app.services.mapped_store import migrate_json_store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate the JSON vector store to the mapped backend")
+    parser.add_argument("--source", default=settings.vector_store_path)
+    parser.add_argument("--target", default=settings.mapped_store_path)
+    args = parser.parse_args()
+
+    migrated = migrate_json_store(args.source, args.target)
+    print(f"Migrated {migrated} documents to {args.target}")
+    print("Set VECTOR_STORE_BACKEND=mapped to serve queries from the new store.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""Utility script to initialise the configured vector store.
+
+Creates the files (or SQLite schema) for ``VECTOR_STORE_BACKEND`` so the API
+starts against an existing, empty index.
+"""
+
+from app.api.dependencies import get_settings, get_vector_store
+
+
+def create_index() -> None:
+    settings = get_settings()
+    store = get_vector_store()
+    documents = store.list_documents()
+    print(f"{settings.vector_store_backend} vector store ready ({type(store).__name__}, {len(documents)} documents)")
+
+
+if __name__ == "__main__":
+    create_index()
@@ -0,0 +1,44 @@
+import numpy as np
+
+from app.services.mapped_store import MappedVectorStore
+from app.utils.ann import IVFIndex, InvertedLists, recall_at_k
+from app.utils.chunking import Chunk
+
+
+def _clustered(rows, dimension=16, clusters=8, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dimension))
+    vectors = centres[rng.integers(0, clusters, size=rows)] + 0.1 * rng.normal(size=(rows, dimension))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def test_ivf_probe_recovers_exact_neighbours():
+    vectors = _clustered(2000)
+    index = IVFIndex.train(vectors, nlist=8)
+    lists = InvertedLists(index.assign(vectors), index.nlist)
+
+    query = vectors[17]
+    candidates = lists.rows(index.probe(query, nprobe=2))
+    exact = np.argsort(-(vectors @ query))[:10]
+    approximate = candidates[np.argsort(-(vectors[candidates] @ query))[:10]]
+    assert recall_at_k(exact, approximate) >= 0.9
+
+
+def test_mapped_store_ann_search_and_reload(tmp_path):
+    vectors = _clustered(400)
+    path = str(tmp_path / "index")
+    store = MappedVectorStore(path, ann_enabled=True, ann_nlist=8, ann_nprobe=2, ann_train_threshold=10**9)
+    for doc in range(40):
+        metadata = {"document_id": f"doc-{doc}"}
+        chunks = [Chunk(content=f"chunk {doc}-{i}", position=i, metadata=metadata) for i in range(10)]
+        store.add_document(f"doc-{doc}", "f.txt", metadata, chunks, vectors[doc * 10 : doc * 10 + 10].tolist())
+    store.flush()
+    store.rebuild_ann_index()
+
+    reopened = MappedVectorStore(path, ann_enabled=True, ann_nprobe=2)
+    assert reopened._ivf is not None
+    query = vectors[123].tolist()
+    approximate = reopened.search("", query, None, [], 1.0, 5)
+    exact = reopened.search("", query, None, [], 1.0, 5, exact=True)
+    assert approximate[0]["chunk"]["content"] == exact[0]["chunk"]["content"] == "chunk 12-3"
@@ -0,0 +1,101 @@
+import json
+
+import numpy as np
+
+from app.services.mapped_store import MappedVectorStore
+from app.services.vector_store import LocalVectorStore
+from app.utils.bm25 import LexicalIndex, Postings
+from app.utils.chunking import Chunk
+
+TEXTS = ["insulin resistance in type 2 diabetes", "insulin pump therapy", "melanoma immunotherapy outcomes"]
+
+
+def _add(store, document_id, texts):
+    metadata = {"document_id": document_id}
+    chunks = [Chunk(content=text, position=idx, metadata=metadata) for idx, text in enumerate(texts)]
+    store.add_document(document_id, f"{document_id}.txt", metadata, chunks, [[1.0, 0.0]] * len(texts))
+
+
+def test_lexical_index_and_postings_agree():
+    index = LexicalIndex()
+    for key, text in enumerate(TEXTS):
+        index.add(str(key), text.split())
+    scores = index.scores(["insulin", "therapy"])
+    assert set(scores) == {"0", "1"}
+    assert scores["1"] > scores["0"]
+
+    postings = Postings.build([text.split() for text in TEXTS])
+    assert postings.document_frequency("insulin") == 2
+    dense = postings.scores({"insulin": 1.0}, postings.total_length / len(TEXTS))
+    assert np.flatnonzero(dense).tolist() == [0, 1]
+
+    index.remove("1", TEXTS[1].split())
+    assert set(index.scores(["insulin", "therapy"])) == {"0"}
+    assert "pump" not in index.postings
+
+
+def test_derived_lexical_index_leaves_its_source_unchanged():
+    index = LexicalIndex()
+    for key, text in enumerate(TEXTS):
+        index.add(str(key), text.split())
+    before = index.scores(["insulin", "therapy"])
+
+    derived = index.derive()
+    derived.remove("0", TEXTS[0].split())
+    derived.add("3", ["insulin", "therapy"])
+
+    assert index.scores(["insulin", "therapy"]) == before
+    assert set(derived.scores(["insulin", "therapy"])) == {"1", "3"}
+    assert "0" not in derived and "0" in index
+    assert derived.to_dict() == LexicalIndex.from_dict(derived.to_dict()).to_dict()
+
+    for number in range(40):
+        derived = derived.derive()
+        derived.add(f"extra-{number}", ["pump"])
+    assert len(derived.postings.maps) <= 32
+    assert derived.size == 3 + 40
+    assert len(derived.scores(["pump"])) == 41
+
+
+def test_json_store_snapshots_lexical_index_and_catches_up(tmp_path):
+    path = tmp_path / "store.json"
+    store = LocalVectorStore(str(path), lexical_snapshot_writes=1)
+    _add(store, "a", TEXTS)
+    _add(store, "b", ["melanoma recurrence after surgery"])
+    assert "lexical_index" not in json.loads(path.read_text())
+    snapshot = json.loads((tmp_path / "store.json.lexical").read_text())
+    assert len(snapshot["lengths"]) == 4
+
+    # Writes past the last snapshot are re-indexed on the next cold start.
+    stale = LocalVectorStore(str(path), lexical_snapshot_writes=100)
+    stale.remove_document("b")
+    _add(stale, "c", ["melanoma immunotherapy trial"])
+    assert json.loads((tmp_path / "store.json.lexical").read_text()) == snapshot
+
+    expected = stale.search("melanoma outcomes", [0.0, 0.0], None, [], 0.0, 2)
+    assert expected[0]["chunk"]["content"] == TEXTS[2]
+    assert expected[0]["score"] == 1.0
+    reopened = LocalVectorStore(str(path))
+    assert reopened.search("melanoma outcomes", [0.0, 0.0], None, [], 0.0, 2) == expected
+    with reopened.snapshot() as generation:
+        assert sorted(generation.lexical.keys()) == sorted(generation.chunk_rows)
+
+    (tmp_path / "store.json.lexical").unlink()
+    assert LocalVectorStore(str(path)).search("melanoma outcomes", [0.0, 0.0], None, [], 0.0, 2) == expected
+
+
+def test_mapped_store_bm25_matches_json_store(tmp_path):
+    json_store = LocalVectorStore(str(tmp_path / "store.json"))
+    mapped = MappedVectorStore(str(tmp_path / "index"))
+    for store in (json_store, mapped):
+        _add(store, "a", TEXTS[:2])
+        _add(store, "b", TEXTS[2:])
+    mapped.flush()
+    assert list((tmp_path / "index" / "segments").glob("*.postings.npz"))
+
+    reopened = MappedVectorStore(str(tmp_path / "index"))
+    expected = json_store.search("insulin therapy", [0.0, 0.0], None, [], 0.0, 3)
+    actual = reopened.search("insulin therapy", [0.0, 0.0], None, [], 0.0, 3)
+    assert [r["chunk"]["content"] for r in actual] == [r["chunk"]["content"] for r in expected]
+    for got, want in zip(actual, expected):
+        assert abs(got["score"] - want["score"]) < 1e-5
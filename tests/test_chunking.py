@@ -8,3 +8,34 @@ def test_chunker_respects_overlap():
     assert chunks
     assert all("document_id" in chunk.metadata for chunk in chunks)
 
+
+def test_chunk_pages_records_page_spans():
+    chunker = Chunker(max_characters=80, overlap=5, max_tokens=400)
+    pages = [
+        (1, "Statins lower LDL cholesterol."),
+        (2, "Effects persisted at five years.\n\nInsulin pumps improve glycaemic control in adults."),
+        (3, ""),
+    ]
+    chunks = chunker.chunk_pages(iter(pages), {"document_id": "doc"})
+
+    assert [chunk.content for chunk in chunks] == [
+        "Statins lower LDL cholesterol. Effects persisted at five years.",
+        "Insulin pumps improve glycaemic control in adults.",
+    ]
+    assert (chunks[0].metadata["page_number"], chunks[0].metadata["page_end"]) == ("1", "2")
+    assert chunks[1].metadata["page_number"] == "2" and "page_end" not in chunks[1].metadata
+    assert "page_number" not in chunker.chunk("Plain text.", {})[0].metadata
+
+
+def test_paragraph_continuing_over_a_page_break_chunks_as_joined_text():
+    chunker = Chunker(max_characters=40, overlap=0, max_tokens=400)
+    pages = [(4, "Outcome:\n\nMortality fell by a third"), (5, "in the treated arm over two years.")]
+    chunks = chunker.chunk_pages(iter(pages), {})
+
+    assert [chunk.content for chunk in chunks] == [
+        chunk.content for chunk in chunker.chunk("\n".join(text for _, text in pages), {})
+    ]
+    assert [(chunk.metadata["page_number"], chunk.metadata.get("page_end")) for chunk in chunks] == [
+        ("4", "5"),
+        ("5", None),
+    ]
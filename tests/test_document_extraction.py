@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.utils.document_extraction import ExtractionPool, ExtractionTimeout, extract_document
+
+
+def _pdf(pages):
+    """Minimal PDF with one line of Helvetica text per page."""
+
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R "
+            "/Resources << /Font << /F1 3 0 R >> >> >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, content in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{content}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return body
+
+
+@pytest.fixture()
+def pool():
+    pool = ExtractionPool(processes=2, timeout=5, pages_per_task=2)
+    yield pool
+    pool.shutdown()
+
+
+def test_long_pdfs_are_split_by_page_range_and_joined_in_order(pool):
+    document = _pdf([f"Page {number} results" for number in range(1, 6)])
+
+    metadata, pages = pool.extract(document, ".pdf")
+    local_metadata, local_pages = extract_document(document, ".pdf")
+
+    assert pages == [(number, f"Page {number} results") for number in range(1, 6)]
+    assert (metadata, pages) == (local_metadata, list(local_pages))
+    assert pool.extract(b"plain text", ".txt") == ({}, [(None, "plain text")])
+
+
+def test_hung_or_crashing_tasks_fail_alone(pool):
+    pool.timeout = 0.5
+    start = time.monotonic()
+    with pytest.raises(ExtractionTimeout):
+        pool._run(time.sleep, 30)
+    assert time.monotonic() - start < 10
+
+    with pytest.raises(BrokenProcessPool):
+        pool._run(os._exit, 1)
+
+    pool.timeout = 5
+    assert pool.extract(_pdf(["Recovered"]), ".pdf")[1] == [(1, "Recovered")]
+
+
+def test_pdf_pages_are_read_lazily_and_fill_page_numbers():
+    metadata, pages = extract_document(_pdf(["Statin outcomes", "Insulin outcomes"]), ".pdf")
+    assert next(pages) == (1, "Statin outcomes")
+    assert list(pages) == [(2, "Insulin outcomes")]
+    assert not any(key.startswith("page_") for key in metadata)
+
+
+def test_timeout_does_not_count_time_queued_behind_other_documents():
+    pool = ExtractionPool(processes=1, timeout=1.0, pages_per_task=2)
+    try:
+        pool._run(time.sleep, 0)
+        errors = []
+
+        def run():
+            try:
+                pool._run(time.sleep, 0.6)
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+    finally:
+        pool.shutdown()
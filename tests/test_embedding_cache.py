@@ -0,0 +1,66 @@
+import pytest
+
+from app.utils.embedding import EmbeddingService
+from app.utils.embedding_cache import EmbeddingCache
+
+
+class _RecordingClient:
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.requests = []
+
+    def invoke_embedding_model(self, model_id, inputs, rate_limiter=None):
+        inputs = list(inputs)
+        self.requests.append(inputs)
+        if self.fail:
+            raise RuntimeError("throttled")
+        return {"embeddings": [[float(len(text)), 1.0, 0.5] for text in inputs]}
+
+
+def test_only_misses_are_sent_to_bedrock(tmp_path):
+    client = _RecordingClient()
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_bytes=1 << 20)
+    service = EmbeddingService(client, "titan", batch_size=2, cache=cache)
+
+    first = service.embed(["alpha", "beta", "alpha"])
+    assert client.requests == [["alpha", "beta"]]
+    assert first == [[5.0, 1.0, 0.5], [4.0, 1.0, 0.5], [5.0, 1.0, 0.5]]
+
+    second = service.embed(["beta", "gamma", "alpha"])
+    assert client.requests[1:] == [["gamma"]]
+    assert second == [[4.0, 1.0, 0.5], [5.0, 1.0, 0.5], [5.0, 1.0, 0.5]]
+
+    stats = service.cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 4, 3)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_cache_is_keyed_by_model_and_survives_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    EmbeddingService(_RecordingClient(), "titan", cache=EmbeddingCache(path, 1 << 20)).embed(["alpha"])
+
+    client = _RecordingClient()
+    EmbeddingService(client, "titan", cache=EmbeddingCache(path, 1 << 20)).embed(["alpha"])
+    EmbeddingService(client, "titan-v2", cache=EmbeddingCache(path, 1 << 20)).embed(["alpha"])
+    assert client.requests == [["alpha"]]
+
+
+def test_fallback_embeddings_are_not_cached(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_bytes=1 << 20)
+    vectors = EmbeddingService(_RecordingClient(fail=True), "titan", cache=cache).embed(["alpha"])
+    assert vectors == [EmbeddingService.generate_local_embedding("alpha")]
+    assert cache.stats()["entries"] == 0
+
+    client = _RecordingClient()
+    assert EmbeddingService(client, "titan", cache=cache).embed(["alpha"]) == [[5.0, 1.0, 0.5]]
+    assert client.requests == [["alpha"]]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_bytes=2 * 3 * 4)
+    cache.put_many("titan", ["alpha", "beta"], [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+    cache.get_many("titan", ["alpha"])
+    cache.put_many("titan", ["gamma"], [[0.0, 0.0, 1.0]])
+
+    assert cache.get_many("titan", ["alpha", "beta", "gamma"]) == [[1.0, 0.0, 0.0], None, [0.0, 0.0, 1.0]]
+    assert cache.stats()["bytes"] == 2 * 3 * 4
@@ -0,0 +1,159 @@
+import io
+import threading
+import time
+
+import pytest
+
+from app.services import ingestion
+from app.services.ingestion import DocumentIngestionService
+from app.services.vector_store import LocalVectorStore
+from app.utils.chunking import Chunker
+from app.utils.embedding import EmbeddingService
+from app.utils.pipeline import Pipeline, Stage, finished
+
+
+def test_pipeline_overlaps_stages_and_keeps_input_order():
+    active = {"slow": 0}
+    overlap = threading.Event()
+    lock = threading.Lock()
+
+    def slow(value):
+        with lock:
+            active["slow"] += 1
+        time.sleep(0.02 if value % 2 else 0.05)
+        with lock:
+            active["slow"] -= 1
+        return value * 10
+
+    def check(value):
+        if active["slow"]:
+            overlap.set()
+        if value == 30:
+            raise ValueError("bad item")
+        return value + 1
+
+    pipeline = Pipeline([Stage("first", slow, workers=3), Stage("second", check, workers=2)], queue_size=2)
+    outputs = list(pipeline.run(range(8)))
+
+    assert [result for result, _ in outputs] == [1, 11, 21, None, 41, 51, 61, 71]
+    assert isinstance(outputs[3][1], ValueError)
+    assert overlap.is_set()
+    stats = pipeline.stats()
+    assert stats["first"]["processed"] == 8
+    assert (stats["second"]["processed"], stats["second"]["failed"]) == (7, 1)
+    assert stats["first"]["max_queue_depth"] <= 2
+
+
+def test_pipeline_reads_input_lazily_and_finished_skips_later_stages():
+    consumed = []
+
+    def source():
+        for value in range(20):
+            consumed.append(value)
+            yield value
+
+    def blocked(value):
+        time.sleep(0.01)
+        return finished(value) if value == 0 else value
+
+    pipeline = Pipeline([Stage("first", blocked), Stage("second", lambda value: -value)], queue_size=1)
+    outputs = pipeline.run(source())
+    assert next(outputs) == (0, None)
+    assert len(consumed) < 20
+    assert [result for result, _ in outputs] == [-value for value in range(1, 20)]
+
+
+class _RecordingS3:
+    def __init__(self) -> None:
+        self.keys = []
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        self.keys.append(Key)
+
+
+@pytest.fixture()
+def service(tmp_path):
+    return DocumentIngestionService(
+        embedding_service=EmbeddingService(None, "local", backend="local"),
+        chunker=Chunker(max_characters=200, overlap=20, max_tokens=100),
+        s3_client=_RecordingS3(),
+        vector_store=LocalVectorStore(str(tmp_path / "store.json")),
+    )
+
+
+def test_ingest_batch_returns_results_in_order_and_skips_failures(service):
+    documents = [
+        (io.BytesIO(b"Statin therapy lowers cholesterol in adults."), "statins.txt", {"title": "Statins"}),
+        (io.BytesIO(b"unsupported"), "figure.png", {}),
+        (io.BytesIO(b"Insulin pumps improve glycaemic control."), "insulin.txt", {}),
+        (io.BytesIO(b"Statin therapy lowers cholesterol in adults."), "copy.txt", {}),
+    ]
+    results = service.ingest_batch(documents)
+
+    assert [result.duplicate for result in results] == [False, False, True]
+    assert results[0].document_id == results[2].document_id
+    assert len(service.vector_store.list_documents()) == 2
+    assert len(service.s3_client.keys) == 2
+    assert service.pipeline_stats()["extract"]["failed"] == 1
+
+
+class _FailingStream(io.BytesIO):
+    def read(self, size=-1):
+        if self.tell():
+            raise OSError("connection reset")
+        return super().read(4)
+
+
+def test_ingest_batch_keeps_going_past_an_unreadable_stream(service, caplog):
+    documents = [
+        (io.BytesIO(b"Aspirin reduces recurrent stroke risk."), "a.txt", {}),
+        (_FailingStream(b"Truncated upload of a cohort study."), "b.txt", {}),
+        (io.BytesIO(b"Warfarin prevents stroke in atrial fibrillation."), "c.txt", {}),
+    ]
+    results = service.ingest_batch(documents)
+
+    assert [result.chunks_indexed > 0 for result in results] == [True, True]
+    assert len(service.vector_store.list_documents()) == 2
+    assert "Failed to ingest b.txt: connection reset" in caplog.text
+
+
+def test_finished_documents_release_their_uploads_behind_a_stalled_one(service, monkeypatch):
+    opened = []
+
+    class _TrackedUpload(ingestion.SpooledUpload):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.closed = False
+            opened.append(self)
+
+        def close(self):
+            self.closed = True
+            super().close()
+
+    monkeypatch.setattr(ingestion, "SpooledUpload", _TrackedUpload)
+    release = threading.Event()
+    extract = service._extract_document
+
+    def stall_first(upload, extension, pooled=False):
+        if upload.open().read().startswith(b"Stalled"):
+            release.wait(5)
+        return extract(upload, extension, pooled)
+
+    monkeypatch.setattr(service, "_extract_document", stall_first)
+    documents = [(io.BytesIO(b"Stalled trial of aspirin in stroke."), "stalled.txt", {})] + [
+        (io.BytesIO(f"Trial {number} of metformin in diabetes.".encode()), f"trial-{number}.txt", {})
+        for number in range(11)
+    ]
+    batch = threading.Thread(target=service.ingest_batch, args=(documents,))
+    batch.start()
+
+    deadline = time.monotonic() + 5
+    while sum(upload.closed for upload in opened) < 11 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    still_open = [upload for upload in opened if not upload.closed]
+    release.set()
+    batch.join()
+
+    assert len(opened) == 12
+    assert len(still_open) == 1
+    assert all(upload.closed for upload in opened)
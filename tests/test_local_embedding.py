@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from app.utils.local_embedding import HashingEmbedder
+
+
+def test_embeddings_are_deterministic_normalised_and_batch_independent():
+    embedder = HashingEmbedder(256)
+    texts = ["Statin therapy lowers LDL cholesterol", "", "insulin pump"]
+    matrix = embedder.embed_matrix(texts)
+
+    assert matrix.shape == (3, 256)
+    assert np.linalg.norm(matrix, axis=1) == pytest.approx([1.0, 0.0, 1.0], abs=1e-6)
+    assert not matrix[1].any()
+    assert embedder.embed(texts[2:]) == HashingEmbedder(256).embed(["insulin pump"])
+    assert np.allclose(embedder.embed_matrix(texts[:1]), matrix[:1])
+
+
+def test_related_texts_score_higher_than_unrelated_ones():
+    embedder = HashingEmbedder(1024)
+    query, related, unrelated = embedder.embed_matrix(
+        [
+            "do statins reduce cholesterol",
+            "Statin therapy reduced LDL cholesterol in adults",
+            "Melanoma immunotherapy improved survival outcomes",
+        ]
+    )
+    assert query @ related > 0.1
+    assert query @ related > query @ unrelated + 0.1
+
+
+def test_fitted_idf_down_weights_common_terms(tmp_path):
+    corpus = [f"the patients received treatment {word}" for word in ["statin", "insulin", "aspirin", "metformin"]]
+    fitted = HashingEmbedder.fit(corpus, 512, batch_size=3)
+    plain = HashingEmbedder(512)
+
+    def similarity(embedder):
+        first, second = embedder.embed_matrix(["the patients statin", "the patients insulin"])
+        return float(first @ second)
+
+    assert similarity(fitted) < similarity(plain)
+
+    path = str(tmp_path / "idf.npy")
+    fitted.save(path)
+    assert np.array_equal(HashingEmbedder.load(512, path).idf, fitted.idf)
+    assert HashingEmbedder.load(512, str(tmp_path / "missing.npy")).idf is None
+    with pytest.raises(ValueError):
+        HashingEmbedder(256, fitted.idf)
@@ -0,0 +1,114 @@
+from app.services.mapped_store import MappedVectorStore, migrate_json_store
+from app.services.vector_store import LocalVectorStore
+from app.utils.chunking import Chunk
+
+
+def _add(store, document_id, texts, vectors, year="2024"):
+    metadata = {"title": document_id, "year": year, "document_id": document_id}
+    chunks = [Chunk(content=text, position=idx, metadata=metadata) for idx, text in enumerate(texts)]
+    store.add_document(document_id, f"{document_id}.txt", metadata, chunks, vectors)
+
+
+def _search(store, question, vector, **kwargs):
+    return store.search(
+        question=question,
+        query_embedding=vector,
+        filters=kwargs.get("filters"),
+        metadata_filter_fields=["year", "journal", "authors"],
+        hybrid_weight=0.6,
+        top_k=kwargs.get("top_k", 5),
+    )
+
+
+def test_mapped_store_add_search_remove(tmp_path):
+    store = MappedVectorStore(str(tmp_path / "index"))
+    _add(store, "a", ["insulin therapy outcomes", "unrelated text"], [[1.0, 0.0], [0.0, 1.0]])
+    _add(store, "b", ["checkpoint inhibitors"], [[0.0, 2.0]], year="2019")
+
+    results = _search(store, "insulin therapy", [2.0, 0.0])
+    assert results[0]["document_id"] == "a"
+    assert results[0]["chunk"]["content"] == "insulin therapy outcomes"
+
+    filtered = _search(store, "inhibitors", [0.0, 1.0], filters={"year_range": [2018, 2020]})
+    assert [result["document_id"] for result in filtered] == ["b"]
+
+    assert store.remove_document("a")
+    assert not store.remove_document("a")
+    reopened = MappedVectorStore(str(tmp_path / "index"))
+    assert [doc["id"] for doc in reopened.list_documents()] == ["b"]
+    assert _search(reopened, "inhibitors", [0.0, 1.0])[0]["document_id"] == "b"
+
+
+def test_migrate_json_store_matches_json_ranking(tmp_path):
+    json_store = LocalVectorStore(str(tmp_path / "store.json"))
+    _add(json_store, "a", ["glp-1 agonists reduce hba1c"], [[0.9, 0.1, 0.0]])
+    _add(json_store, "b", ["melanoma survival"], [[0.0, 0.3, 0.9]])
+
+    assert migrate_json_store(str(tmp_path / "store.json"), str(tmp_path / "index")) == 2
+    mapped = MappedVectorStore(str(tmp_path / "index"))
+
+    expected = _search(json_store, "melanoma survival", [0.1, 0.2, 1.0])
+    actual = _search(mapped, "melanoma survival", [0.1, 0.2, 1.0])
+    assert [r["chunk"]["chunk_id"] for r in actual] == [r["chunk"]["chunk_id"] for r in expected]
+    for got, want in zip(actual, expected):
+        assert abs(got["score"] - want["score"]) < 1e-5
+
+
+def test_wal_replay_and_compaction(tmp_path):
+    path = str(tmp_path / "index")
+    store = MappedVectorStore(path, flush_threshold=2, max_segments=8)
+    _add(store, "a", ["first paper", "more text"], [[1.0, 0.0], [0.5, 0.5]])  # flushed
+    _add(store, "b", ["second paper"], [[0.0, 1.0]])  # only in the WAL
+    assert store.remove_document("a")
+    if store._maintenance_thread is not None:
+        store._maintenance_thread.join()
+
+    recovered = MappedVectorStore(path, flush_threshold=2, max_segments=8)
+    assert [doc["id"] for doc in recovered.list_documents()] == ["b"]
+
+    recovered.flush()
+    recovered.compact()
+    assert len(recovered._segments) == 1
+    assert not recovered._tombstones
+    assert [doc["id"] for doc in MappedVectorStore(path).list_documents()] == ["b"]
+
+
+def test_torn_wal_tail_is_discarded(tmp_path):
+    path = tmp_path / "index"
+    store = MappedVectorStore(str(path))
+    _add(store, "a", ["intact entry"], [[1.0, 0.0]])
+    with (path / store._wal_name).open("ab") as handle:
+        handle.write(b'{"op": "add", "document_id": "tor')
+
+    recovered = MappedVectorStore(str(path))
+    assert recovered.has_document("a")
+    assert not recovered.has_document("tor")
+
+
+def test_reader_picks_up_writes_from_another_instance(tmp_path):
+    path = str(tmp_path / "index")
+    reader = MappedVectorStore(path, flush_threshold=2)
+    writer = MappedVectorStore(path, flush_threshold=2)
+
+    _add(writer, "a", ["wal only"], [[1.0, 0.0]])
+    assert reader.has_document("a")
+
+    _add(writer, "b", ["flushed with a"], [[0.0, 1.0]])
+    assert {doc["id"] for doc in reader.list_documents()} == {"a", "b"}
+
+    writer.remove_document("a")
+    assert [r["document_id"] for r in _search(reader, "flushed", [0.0, 1.0])] == ["b"]
+
+
+def test_chunk_text_is_read_from_content_file_for_results_only(tmp_path):
+    path = tmp_path / "index"
+    store = MappedVectorStore(str(path))
+    _add(store, "a", ["insulin therapy outcomes", "unrelated text"], [[1.0, 0.0], [0.0, 1.0]])
+    store.flush()
+
+    segment = MappedVectorStore(str(path))._segments[0]
+    assert not isinstance(segment.content, list)
+    assert "insulin therapy outcomes" not in (path / "segments" / f"{segment.name}.json").read_text()
+    results = _search(MappedVectorStore(str(path)), "insulin", [1.0, 0.0], top_k=1)
+    assert results[0]["chunk"]["content"] == "insulin therapy outcomes"
+    assert results[0]["metadata"]["year"] == "2024"
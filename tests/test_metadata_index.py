@@ -0,0 +1,49 @@
+import pytest
+
+from app.services.mapped_store import MappedVectorStore
+from app.services.vector_store import LocalVectorStore
+from app.utils.chunking import Chunk
+from app.utils.metadata_index import MetadataIndex
+
+FIELDS = ["year", "journal", "authors"]
+PAPERS = {
+    "a": {"year": "2018", "journal": "The Lancet", "authors": ["Smith J", "Doe A"]},
+    "b": {"year": "2021", "journal": "NEJM", "authors": ["Doe A"]},
+    "c": {"year": "2023", "journal": "the lancet", "authors": ["Lee K"]},
+    "d": {"journal": "BMJ", "authors": ["Smith J"]},
+}
+
+
+def test_metadata_index_masks():
+    index = MetadataIndex(
+        [
+            {"year": "2018", "journal": "The Lancet", "authors": "Smith J; Doe A"},
+            {"year": "2021", "journal": "NEJM", "authors": "Doe A"},
+            {"year": "n/a", "journal": "BMJ"},
+        ]
+    )
+    assert index.mask(None, FIELDS) is None
+    assert index.mask({"year_range": [2017, 2021]}, FIELDS).tolist() == [True, True, False]
+    assert index.mask({"journal": "the lancet"}, FIELDS).tolist() == [True, False, False]
+    assert index.mask({"authors": ["doe a"]}, FIELDS).tolist() == [True, True, False]
+    assert index.mask({"authors": "Doe A", "year_range": [2020, 2030]}, FIELDS).tolist() == [False, True, False]
+    assert index.mask({"journal": "Cell"}, FIELDS).tolist() == [False, False, False]
+
+
+@pytest.mark.parametrize("backend", ["json", "mapped"])
+def test_store_filters_before_scoring(tmp_path, backend):
+    store = LocalVectorStore(str(tmp_path / "store.json")) if backend == "json" else MappedVectorStore(str(tmp_path / "index"))
+    for document_id, metadata in PAPERS.items():
+        metadata = {**metadata, "document_id": document_id}
+        chunk = Chunk(content=f"paper {document_id}", position=0, metadata=metadata)
+        store.add_document(document_id, f"{document_id}.pdf", metadata, [chunk], [[1.0, 0.0]])
+
+    def matching(filters):
+        results = store.search("paper", [1.0, 0.0], filters, FIELDS, 0.6, 10)
+        return sorted(result["document_id"] for result in results)
+
+    assert matching({"year_range": [2018, 2021]}) == ["a", "b"]
+    assert matching({"journal": "The Lancet"}) == ["a", "c"]
+    assert matching({"authors": "Smith J"}) == ["a", "d"]
+    assert matching({"authors": ["Lee K", "Doe A"], "year_range": [2019, 2030]}) == ["b", "c"]
+    assert matching({"journal": ["Cell"]}) == []
@@ -0,0 +1,169 @@
+import io
+import random
+
+import pytest
+
+from app.core.config import settings
+from app.services.ingestion import DocumentIngestionService
+from app.services.vector_store import LocalVectorStore
+from app.utils.chunking import Chunker
+from app.utils.embedding import EmbeddingService
+from app.utils.minhash import LSHIndex, document_signature, similarity
+
+VOCABULARY = (
+    "randomised trial cohort patients therapy outcome mortality placebo dose adverse events hazard ratio "
+    "confidence interval follow up primary endpoint secondary analysis baseline risk reduction treatment"
+).split()
+
+
+def _paper(seed: int, words: int = 400) -> str:
+    generator = random.Random(seed)
+    return " ".join(generator.choice(VOCABULARY) for _ in range(words))
+
+
+def _revised(text: str) -> str:
+    # A published version differing from its preprint in one word.
+    words = text.split()
+    words[len(words) // 2] = "revised"
+    return " ".join(words)
+
+
+def test_signature_similarity_tracks_shingle_overlap():
+    paper = _paper(1)
+    assert similarity(document_signature([paper]), document_signature([paper])) == 1.0
+    assert similarity(document_signature([paper]), document_signature([_revised(paper)])) > 0.92
+    assert similarity(document_signature([paper]), document_signature([_paper(2)])) < 0.2
+
+
+def test_lsh_index_returns_best_match_above_threshold():
+    index = LSHIndex()
+    papers = {f"paper-{seed}": _paper(seed) for seed in range(20)}
+    for key, text in papers.items():
+        index.add(key, document_signature([text]))
+
+    query = document_signature([_revised(papers["paper-7"])])
+    assert len(index.candidates(query)) < len(papers)
+    key, score = index.best_match(query, 0.9)
+    assert key == "paper-7" and score > 0.92
+
+    assert index.remove("paper-7")
+    assert index.best_match(query, 0.9) is None
+
+
+def test_derived_lsh_index_leaves_its_source_unchanged():
+    index = LSHIndex()
+    for seed in range(3):
+        index.add(f"paper-{seed}", document_signature([_paper(seed)]))
+    query = document_signature([_revised(_paper(1))])
+
+    derived = index.derive()
+    assert derived.remove("paper-1")
+    derived.add("paper-9", document_signature([_paper(9)]))
+
+    assert index.best_match(query, 0.9)[0] == "paper-1" and len(index) == 3
+    assert derived.best_match(query, 0.9) is None and len(derived) == 3
+
+    for seed in range(40):
+        derived = derived.derive()
+        derived.add(f"extra-{seed}", document_signature([_paper(100 + seed)]))
+    derived.add("paper-1", document_signature([_paper(1)]))
+    assert len(derived) == 44
+    assert derived.best_match(query, 0.9)[0] == "paper-1"
+
+
+def test_json_store_carries_near_duplicate_index_between_generations(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "store.json"))
+    chunker = Chunker(max_characters=500, overlap=50, max_tokens=200)
+    for seed in range(2):
+        chunks = chunker.chunk(_paper(seed))
+        store.add_document(f"paper-{seed}", f"paper-{seed}.txt", {}, chunks, [[1.0]] * len(chunks))
+    with store.snapshot() as generation:
+        first = generation.near_duplicates
+    store.remove_document("paper-0")
+
+    query = document_signature([_revised(_paper(0))])
+    assert first.best_match(query, 0.9)[0] == "paper-0"
+    assert store.find_near_duplicate(query, 0.9) is None
+    assert LocalVectorStore(str(tmp_path / "store.json")).find_near_duplicate(
+        document_signature([_revised(_paper(1))]), 0.9
+    )[0] == "paper-1"
+
+
+@pytest.fixture()
+def service(tmp_path):
+    class _S3:
+        def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+            pass
+
+    return DocumentIngestionService(
+        embedding_service=EmbeddingService(None, "local", backend="local"),
+        chunker=Chunker(max_characters=500, overlap=50, max_tokens=200),
+        s3_client=_S3(),
+        vector_store=LocalVectorStore(str(tmp_path / "store.json")),
+    )
+
+
+def _ingest(service, text, filename):
+    return service.ingest_document(io.BytesIO(text.encode("utf-8")), filename)
+
+
+def test_near_duplicate_is_merged_without_indexing(service):
+    preprint = _ingest(service, _paper(3), "preprint.txt")
+    published = _ingest(service, _revised(_paper(3)), "published.txt")
+
+    assert published.duplicate and published.chunks_indexed == 0
+    assert published.near_duplicate_of == preprint.document_id
+    assert len(service.vector_store.list_documents()) == 1
+
+    assert not _ingest(service, _paper(4), "unrelated.txt").duplicate
+
+
+def test_near_duplicate_can_be_flagged_instead(service, monkeypatch):
+    monkeypatch.setattr(settings, "near_duplicate_policy", "flag")
+    preprint = _ingest(service, _paper(5), "preprint.txt")
+    published = _ingest(service, _revised(_paper(5)), "published.txt")
+
+    assert not published.duplicate and published.chunks_indexed > 0
+    assert published.near_duplicate_of == preprint.document_id
+    assert len(service.vector_store.list_documents()) == 2
+
+
+def test_near_duplicates_within_one_batch_are_merged(service):
+    documents = [
+        (io.BytesIO(_paper(6).encode("utf-8")), "preprint.txt", {}),
+        (io.BytesIO(_revised(_paper(6)).encode("utf-8")), "published.txt", {}),
+        (io.BytesIO(_paper(7).encode("utf-8")), "unrelated.txt", {}),
+    ]
+    results = service.ingest_batch(documents)
+
+    assert sorted(result.duplicate for result in results) == [False, False, True]
+    merged = next(result for result in results if result.duplicate)
+    kept = {result.document_id for result in results if not result.duplicate}
+    assert merged.near_duplicate_of in kept
+    assert len(service.vector_store.list_documents()) == 2
+
+
+def test_batch_copies_of_a_failed_document_are_ingested_on_their_own(tmp_path, monkeypatch):
+    class _FailingS3:
+        def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+            if Key.endswith("/preprint.txt"):
+                raise RuntimeError("upload rejected")
+
+    # One extract worker, so the preprint is the first of the copies to be registered.
+    monkeypatch.setattr(settings, "ingestion_extract_workers", 1)
+    service = DocumentIngestionService(
+        embedding_service=EmbeddingService(None, "local", backend="local"),
+        chunker=Chunker(max_characters=500, overlap=50, max_tokens=200),
+        s3_client=_FailingS3(),
+        vector_store=LocalVectorStore(str(tmp_path / "store.json")),
+    )
+    documents = [
+        (io.BytesIO(_paper(8).encode("utf-8")), "preprint.txt", {}),
+        (io.BytesIO(_paper(8).encode("utf-8")), "copy.txt", {}),
+        (io.BytesIO(_revised(_paper(8)).encode("utf-8")), "published.txt", {}),
+    ]
+    copy, published = service.ingest_batch(documents)
+
+    assert not copy.duplicate and copy.chunks_indexed > 0
+    assert published.duplicate and published.near_duplicate_of == copy.document_id
+    assert len(service.vector_store.list_documents()) == 1
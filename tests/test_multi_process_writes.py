@@ -0,0 +1,40 @@
+import multiprocessing
+
+import pytest
+
+from app.services.mapped_store import MappedVectorStore
+from app.services.vector_store import LocalVectorStore
+from app.utils.chunking import Chunk
+
+
+def _open(backend, path):
+    if backend == "json":
+        return LocalVectorStore(path)
+    return MappedVectorStore(path, flush_threshold=8)
+
+
+def _ingest(backend, path, worker):
+    store = _open(backend, path)
+    for index in range(12):
+        document_id = f"doc-{worker}-{index}"
+        metadata = {"document_id": document_id}
+        chunks = [Chunk(content=f"{document_id} cohort", position=0, metadata=metadata)]
+        store.add_document(document_id, "paper.pdf", metadata, chunks, [[1.0, float(worker)]])
+
+
+@pytest.mark.parametrize("backend", ["json", "mapped"])
+def test_worker_processes_do_not_lose_each_others_documents(tmp_path, backend):
+    path = str(tmp_path / ("store.json" if backend == "json" else "index"))
+    _open(backend, path)
+
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_ingest, args=(backend, path, worker)) for worker in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+        assert worker.exitcode == 0
+
+    reopened = _open(backend, path)
+    assert len(reopened.list_documents()) == 36
+    assert len(reopened.search("cohort", [1.0, 1.0], None, [], 0.5, 50)) == 36
@@ -0,0 +1,69 @@
+import io
+import json
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from app.services.bedrock_client import BedrockClient
+from app.utils.embedding import EmbeddingService
+from app.utils.rate_limiter import AdaptiveRateLimiter
+
+
+class _SlowClient:
+    def __init__(self) -> None:
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def invoke_embedding_model(self, model_id, inputs, rate_limiter=None):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self._lock:
+            self.active -= 1
+        return {"embeddings": [[float(text)] for text in inputs]}
+
+
+def test_batches_run_concurrently_and_keep_input_order():
+    client = _SlowClient()
+    service = EmbeddingService(client, "titan", batch_size=2, workers=4, requests_per_second=0)
+    texts = [str(number) for number in range(16)]
+
+    assert service.embed(texts) == [[float(number)] for number in range(16)]
+    assert client.peak == 4
+
+
+class _ThrottlingRuntime:
+    def __init__(self, throttles: int) -> None:
+        self.throttles = throttles
+
+    def invoke_model(self, **kwargs):
+        if self.throttles:
+            self.throttles -= 1
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "InvokeModel")
+        return {"body": io.BytesIO(json.dumps({"embeddings": [[1.0]]}).encode())}
+
+
+def test_rate_limiter_backs_off_on_throttling_and_recovers():
+    limiter = AdaptiveRateLimiter(max_rate=1000.0)
+    client = BedrockClient(region_name="us-east-1", backoff_factor=0.0)
+    # botocore must not retry throttles itself, or the limiter never sees them.
+    assert client._client.meta.config.retries["total_max_attempts"] == 1
+    client._client = _ThrottlingRuntime(throttles=2)
+
+    assert client.invoke_embedding_model("titan", ["text"], rate_limiter=limiter) == {"embeddings": [[1.0]]}
+    assert limiter.rate == 1000.0 / 4 + 1000.0 / 20
+
+    for _ in range(20):
+        limiter.succeeded()
+    assert limiter.rate == 1000.0
+
+
+def test_rate_limiter_paces_requests():
+    limiter = AdaptiveRateLimiter(max_rate=100.0, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.045
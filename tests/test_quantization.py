@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from app.services.mapped_store import MappedVectorStore
+from app.utils.ann import recall_at_k
+from app.utils.chunking import Chunk
+from app.utils.quantization import ProductQuantizer, ScalarQuantizer, load_quantizer
+
+
+def _unit_vectors(rows, dimension=32, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(rows, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.mark.parametrize(
+    "quantizer_factory",
+    [ScalarQuantizer.train, lambda vectors: ProductQuantizer.train(vectors, subspaces=8)],
+)
+def test_quantizer_scores_approximate_inner_products(tmp_path, quantizer_factory):
+    vectors = _unit_vectors(1000)
+    quantizer = quantizer_factory(vectors)
+    codes = quantizer.encode(vectors)
+    assert codes.nbytes == len(vectors) * quantizer.code_bytes() < vectors.nbytes
+
+    quantizer.save(tmp_path / "quantizer.npz")
+    reloaded = load_quantizer(tmp_path / "quantizer.npz")
+    query = vectors[3]
+    exact = np.argsort(-(vectors @ query))[:40]
+    approximate = np.argsort(-reloaded.scores(codes, query))[:40]
+    assert 3 in approximate[:5]
+    assert recall_at_k(exact, approximate) >= 0.5
+
+
+def test_interrupted_save_keeps_the_previous_codebook(tmp_path, monkeypatch):
+    path = tmp_path / "quantizer.npz"
+    ScalarQuantizer.train(_unit_vectors(100)).save(path)
+    saved = path.read_bytes()
+
+    def crash(handle, **arrays):
+        handle.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "savez", crash)
+    with pytest.raises(OSError):
+        ScalarQuantizer.train(_unit_vectors(100, seed=1)).save(path)
+
+    assert path.read_bytes() == saved
+    assert isinstance(load_quantizer(path), ScalarQuantizer)
+
+
+def test_mapped_store_reranks_quantized_candidates(tmp_path):
+    vectors = _unit_vectors(300)
+    store = MappedVectorStore(str(tmp_path / "index"), quantization="pq", pq_subspaces=8, rerank_factor=4)
+    for doc in range(30):
+        metadata = {"document_id": f"doc-{doc}"}
+        chunks = [Chunk(content=f"chunk {doc}-{i}", position=i, metadata=metadata) for i in range(10)]
+        store.add_document(f"doc-{doc}", "f.txt", metadata, chunks, vectors[doc * 10 : doc * 10 + 10].tolist())
+    store.flush()
+    store.train_quantizer()
+
+    reopened = MappedVectorStore(str(tmp_path / "index"))
+    assert reopened._quantizer is not None and reopened._quantizer.kind == "pq"
+    query = vectors[57].tolist()
+    reranked = reopened.search("", query, None, [], 1.0, 5)
+    exact = reopened.search("", query, None, [], 1.0, 5, exact=True)
+    assert reranked[0]["chunk"]["content"] == "chunk 5-7"
+    assert reranked[0]["score"] == pytest.approx(exact[0]["score"], abs=1e-5)
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from app.utils.embedding import EmbeddingService
+from app.utils.query_cache import QueryEmbeddingCache
+
+
+class _CountingClient:
+    def __init__(self, fail: bool = False, delay: float = 0.0) -> None:
+        self.fail = fail
+        self.delay = delay
+        self.requests = []
+
+    def invoke_embedding_model(self, model_id, inputs, rate_limiter=None):
+        self.requests.append(list(inputs))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("unavailable")
+        return {"embeddings": [[float(len(text))] for text in inputs]}
+
+
+def test_repeated_questions_are_served_from_the_lru():
+    client = _CountingClient()
+    service = EmbeddingService(client, "titan", query_cache_size=8)
+
+    first = service.embed_queries(["Do statins  lower LDL?"])
+    second = service.embed_queries(["do statins lower ldl?", "insulin pumps"])
+
+    assert second[0] == first[0]
+    assert client.requests == [["do statins lower ldl?"], ["insulin pumps"]]
+    stats = service.query_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+
+
+def test_concurrent_identical_questions_share_one_request():
+    client = _CountingClient(delay=0.1)
+    service = EmbeddingService(client, "titan", query_cache_size=8)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(service.embed_queries(["statins"])[0])) for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.requests == [["statins"]]
+    assert results == [[7.0]] * 5
+    assert service.query_cache_stats()["coalesced"] == 4
+
+
+def test_fallback_embeddings_are_not_kept():
+    service = EmbeddingService(_CountingClient(fail=True), "titan", query_cache_size=8)
+    service.embed_queries(["statins"])
+    assert service.query_cache_stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted_and_failures_propagate():
+    cache = QueryEmbeddingCache(max_entries=2)
+
+    def compute(keys):
+        return [[float(len(key))] for key in keys], [True] * len(keys)
+
+    cache.get_or_compute(["a", "bb"], compute)
+    cache.get_or_compute(["a"], compute)
+    cache.get_or_compute(["ccc"], compute)
+    assert cache.get_or_compute(["a", "bb"], compute) == [[1.0], [2.0]]
+    assert cache.stats()["misses"] == 4
+
+    def broken(keys):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute(["dddd"], broken)
+    assert cache.get_or_compute(["dddd"], compute) == [[4.0]]
+
+
+def test_concurrent_distinct_questions_are_grouped_into_batches():
+    client = _CountingClient(delay=0.05)
+    service = EmbeddingService(client, "titan", batch_size=10, workers=2, query_cache_size=0, query_batch_wait_ms=20)
+    questions = [f"question {number}" for number in range(30)]
+    results = {}
+
+    def ask(question):
+        results[question] = service.embed_queries([question])[0]
+
+    threads = [threading.Thread(target=ask, args=(question,)) for question in questions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {question: [float(len(question))] for question in questions}
+    assert sum(len(request) for request in client.requests) == 30
+    assert len(client.requests) < 30
+    assert max(len(request) for request in client.requests) <= 10
+    assert service.query_batch_stats()["items"] == 30
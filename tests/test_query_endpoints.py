@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.dependencies import get_generation_service, get_retrieval_service
+from app.api.endpoints import router
+from app.services.generation import GenerationService
+from app.services.retrieval import RetrievalService
+from app.services.vector_store import LocalVectorStore
+from app.utils.chunking import Chunk
+from app.utils.embedding import EmbeddingService
+
+
+class _SlowBedrock:
+    """Embeds slowly enough for concurrent requests to overlap; generation always fails."""
+
+    def __init__(self) -> None:
+        self.embedding_requests = []
+
+    def invoke_embedding_model(self, model_id, inputs, rate_limiter=None):
+        self.embedding_requests.append(list(inputs))
+        time.sleep(0.2)
+        return {"embeddings": [[1.0] for _ in inputs]}
+
+    def invoke_text_model(self, **kwargs):
+        raise RuntimeError("unavailable")
+
+
+@pytest.fixture()
+def api(tmp_path):
+    bedrock = _SlowBedrock()
+    store = LocalVectorStore(str(tmp_path / "store.json"))
+    store.add_document(
+        "statins",
+        "statins.pdf",
+        {"document_id": "statins", "title": "Statins"},
+        [Chunk(content="Statin therapy lowers LDL cholesterol.", position=0, metadata={})],
+        [[1.0]],
+    )
+    embedding_service = EmbeddingService(bedrock, "titan", query_cache_size=8, query_batch_wait_ms=50)
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_retrieval_service] = lambda: RetrievalService(embedding_service, store)
+    app.dependency_overrides[get_generation_service] = lambda: GenerationService(bedrock)
+    return app, bedrock, embedding_service
+
+
+def _post_concurrently(app, path, questions):
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.post(path, json={"question": question}) for question in questions))
+
+    return asyncio.run(send())
+
+
+@pytest.mark.parametrize("path", ["/query", "/query/chat"])
+def test_concurrent_identical_queries_share_one_embedding(api, path):
+    app, bedrock, embedding_service = api
+    responses = _post_concurrently(app, path, ["Do statins lower LDL?"] * 5)
+
+    assert [response.status_code for response in responses] == [200] * 5
+    assert len(bedrock.embedding_requests) == 1
+    assert embedding_service.query_cache_stats()["coalesced"] == 4
+
+
+def test_concurrent_distinct_queries_share_embedding_batches(api):
+    app, bedrock, embedding_service = api
+    questions = [f"Does treatment {number} reduce mortality?" for number in range(8)]
+    responses = _post_concurrently(app, "/query", questions)
+
+    assert [response.status_code for response in responses] == [200] * 8
+    assert sorted(text for request in bedrock.embedding_requests for text in request) == sorted(
+        question.lower() for question in questions
+    )
+    assert len(bedrock.embedding_requests) < len(questions)
+    assert embedding_service.query_batch_stats()["mean_batch_size"] > 1
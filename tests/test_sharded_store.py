@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from app.services import sharded_store
+from app.services.mapped_store import MappedVectorStore
+from app.services.sharded_store import ShardedVectorStore, _search_shard, owner_shard
+from app.utils.chunking import Chunk
+
+
+def _add(store, document_id, vector):
+    metadata = {"document_id": document_id, "title": document_id}
+    chunk = Chunk(content=f"paper {document_id}", position=0, metadata=metadata)
+    store.add_document(document_id, f"{document_id}.pdf", metadata, [chunk], [vector])
+
+
+def _ids(results):
+    return [result["document_id"] for result in results]
+
+
+def test_sharded_store_partitions_and_rebalances(tmp_path):
+    store = ShardedVectorStore(str(tmp_path / "shards"), shards=3, search_workers=0)
+    for index in range(30):
+        _add(store, f"doc-{index}", [1.0, index / 30])
+
+    for shard in store.shards:
+        owned = {document["id"] for document in store._stores[shard].list_documents()}
+        assert owned == {f"doc-{i}" for i in range(30) if owner_shard(store.shards, f"doc-{i}") == shard}
+    expected = _ids(store.search("paper", [1.0, 1.0], None, [], 1.0, 5))
+    assert expected == ["doc-29", "doc-28", "doc-27", "doc-26", "doc-25"]
+
+    store.add_shard()
+    store.remove_shard(store.shards[0])
+    reopened = ShardedVectorStore(str(tmp_path / "shards"), search_workers=0)
+    assert reopened.shards == ["shard-001", "shard-002", "shard-003"]
+    assert len(reopened.list_documents()) == 30
+    for shard in reopened.shards:
+        for document in reopened._stores[shard].list_documents():
+            assert owner_shard(reopened.shards, document["id"]) == shard
+    assert _ids(reopened.search("paper", [1.0, 1.0], None, [], 1.0, 5)) == expected
+
+    assert reopened.remove_document("doc-29")
+    assert not reopened.has_document("doc-29")
+
+
+def test_sharded_search_in_worker_processes(tmp_path):
+    store = ShardedVectorStore(str(tmp_path / "shards"), shards=2, search_workers=2)
+    try:
+        for index in range(6):
+            _add(store, f"doc-{index}", [float(index), 1.0])
+        assert _ids(store.search("paper", [1.0, 0.0], None, [], 1.0, 2)) == ["doc-5", "doc-4"]
+        _add(store, "doc-9", [1.0, 0.0])
+        assert _ids(store.search("paper", [1.0, 0.0], None, [], 1.0, 1)) == ["doc-9"]
+    finally:
+        store.close()
+
+
+def test_sharded_hybrid_scores_match_a_single_store(tmp_path):
+    sharded = ShardedVectorStore(str(tmp_path / "shards"), shards=3, search_workers=0)
+    single = MappedVectorStore(str(tmp_path / "single"))
+    texts = ["statin therapy"] * 8 + ["statin dosing in renal failure", "aspirin and statin interaction"]
+    for index, text in enumerate(texts):
+        metadata = {"document_id": f"doc-{index}"}
+        chunk = Chunk(content=text, position=0, metadata=metadata)
+        for store in (sharded, single):
+            store.add_document(f"doc-{index}", f"doc-{index}.pdf", metadata, [chunk], [[1.0, index / 10]])
+
+    expected = single.search("renal statin", [1.0, 0.0], None, [], 0.5, 10)
+    actual = sharded.search("renal statin", [1.0, 0.0], None, [], 0.5, 10)
+    assert [(r["document_id"], round(r["score"], 5)) for r in actual] == [
+        (r["document_id"], round(r["score"], 5)) for r in expected
+    ]
+    batch = sharded.search_batch(["renal statin"], [[1.0, 0.0]], [None], [], 0.5, 10)
+    assert batch == [actual]
+
+
+def test_search_racing_shard_removal_does_not_recreate_it(tmp_path, monkeypatch):
+    monkeypatch.setattr(sharded_store, "_worker_stores", {})
+    store = ShardedVectorStore(str(tmp_path / "shards"), shards=3, search_workers=0)
+    for index in range(12):
+        _add(store, f"doc-{index}", [1.0, index / 12])
+    paths = [str(tmp_path / "shards" / shard) for shard in store.shards]
+    search_kwargs = {
+        "question": "paper",
+        "query_embedding": [1.0, 0.0],
+        "filters": None,
+        "metadata_filter_fields": [],
+        "hybrid_weight": 1.0,
+        "top_k": 3,
+    }
+    # The first shard is already open in the worker, the second is not.
+    _search_shard(paths[0], paths, "search", search_kwargs)
+
+    store.remove_shard(store.shards[1])
+    store.remove_shard(store.shards[0])
+    for path in paths[:2]:
+        with pytest.raises(FileNotFoundError):
+            _search_shard(path, paths, "search", search_kwargs)
+        assert not os.path.exists(path)
+    assert len(_search_shard(paths[2], paths, "search", search_kwargs)) == 3
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from app.services.mapped_store import MappedVectorStore
+from app.services.vector_store import LocalVectorStore
+from app.utils.chunking import Chunk
+
+
+def _open(tmp_path, backend, **options):
+    if backend == "json":
+        return LocalVectorStore(str(tmp_path / "store.json"), **options)
+    return MappedVectorStore(str(tmp_path / "index"), **options)
+
+
+@pytest.mark.parametrize("backend", ["json", "mapped"])
+def test_document_stage_limits_scored_documents(tmp_path, backend):
+    rng = np.random.default_rng(0)
+    topics = rng.normal(size=(12, 16))
+    store = _open(tmp_path, backend, top_documents=2)
+    for doc, topic in enumerate(topics):
+        metadata = {"document_id": f"doc-{doc}"}
+        vectors = topic + 0.2 * rng.normal(size=(8, 16))
+        chunks = [Chunk(content=f"topic{doc} section {i}", position=i, metadata=metadata) for i in range(8)]
+        store.add_document(f"doc-{doc}", "paper.pdf", metadata, chunks, vectors.tolist())
+
+    query = (topics[7] + 0.1 * topics[3]).tolist()
+    staged = store.search("topic7 findings", query, None, [], 0.6, 20)
+    exact = store.search("topic7 findings", query, None, [], 0.6, 20, exact=True)
+
+    assert len({result["document_id"] for result in staged}) <= 2
+    assert len({result["document_id"] for result in exact}) > 2
+    assert staged[0]["chunk"]["chunk_id"] == exact[0]["chunk"]["chunk_id"]
+    assert staged[0]["document_id"] == "doc-7"
+
+    filtered = store.search("topic7", query, {"document_id": "doc-3"}, ["document_id"], 0.6, 5)
+    assert {result["document_id"] for result in filtered} == {"doc-3"}
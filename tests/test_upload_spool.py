@@ -0,0 +1,78 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from app.services.ingestion import DocumentIngestionService
+from app.services.vector_store import LocalVectorStore
+from app.utils.chunking import Chunker
+from app.utils.embedding import EmbeddingService
+from app.utils.upload_spool import SpooledUpload
+
+
+def test_spooled_upload_hashes_incrementally_and_rolls_to_disk():
+    content = os.urandom(5000)
+    upload = SpooledUpload.from_stream(io.BytesIO(content), max_memory=1024)
+
+    assert upload.sha256 == hashlib.sha256(content).hexdigest()
+    assert upload.size == len(content)
+    assert upload.path is not None and os.path.exists(upload.path)
+    assert upload.source() == upload.path
+    assert upload.open().read() == content
+
+    upload.close()
+    assert not os.path.exists(upload.path)
+
+
+def test_small_upload_stays_in_memory():
+    with SpooledUpload.from_stream(io.BytesIO(b"short abstract"), max_memory=1024) as upload:
+        assert upload.path is None
+        assert upload.source() == b"short abstract"
+
+
+class _MultipartS3:
+    def __init__(self) -> None:
+        self.uploads = []
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        self.uploads.append((Key, Fileobj.read(), ExtraArgs, Config))
+
+
+@pytest.fixture()
+def service(tmp_path):
+    return DocumentIngestionService(
+        embedding_service=EmbeddingService(None, "local", backend="local"),
+        chunker=Chunker(max_characters=200, overlap=20, max_tokens=100),
+        s3_client=_MultipartS3(),
+        vector_store=LocalVectorStore(str(tmp_path / "store.json")),
+    )
+
+
+def test_ingest_streams_upload_to_s3_with_transfer_config(service):
+    content = b"Beta blockers reduce mortality after myocardial infarction. " * 50
+    upload = SpooledUpload.from_stream(io.BytesIO(content), max_memory=256)
+
+    result = service.ingest_document(upload, "beta-blockers.txt")
+
+    key, body, extra_args, config = service.s3_client.uploads[0]
+    assert result.document_id == hashlib.sha256(content).hexdigest()
+    assert key.endswith(f"{result.document_id}/beta-blockers.txt")
+    assert body == content
+    assert extra_args["Metadata"]["document_id"] == result.document_id
+    assert config.multipart_chunksize == config.multipart_threshold
+    assert not os.path.exists(upload.path)
+
+
+def test_duplicate_is_rejected_before_extraction(service, monkeypatch):
+    content = b"ACE inhibitors slow the progression of diabetic nephropathy."
+    service.ingest_document(io.BytesIO(content), "ace.txt")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("duplicate documents must not be parsed")
+
+    monkeypatch.setattr(service, "_extract_document", fail)
+    result = service.ingest_document(io.BytesIO(content), "ace-copy.txt")
+
+    assert result.duplicate
+    assert len(service.s3_client.uploads) == 1
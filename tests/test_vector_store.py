@@ -0,0 +1,92 @@
+import threading
+
+import numpy as np
+
+from app.services.vector_store import LocalVectorStore, _top_k
+from app.utils.chunking import Chunk
+
+
+def _add(store, document_id, text, vector):
+    metadata = {"title": document_id, "document_id": document_id}
+    store.add_document(document_id, f"{document_id}.txt", metadata, [Chunk(content=text, position=0, metadata=metadata)], [vector])
+
+
+def test_resident_cache_tracks_other_writers(tmp_path):
+    path = str(tmp_path / "store.json")
+    reader = LocalVectorStore(path)
+    writer = LocalVectorStore(path)
+
+    _add(writer, "a", "statin therapy", [1.0, 0.0])
+    assert reader.has_document("a")
+    cached = reader._current_generation()
+    assert reader._current_generation() is cached
+
+    _add(writer, "b", "anticoagulation", [0.0, 1.0])
+    results = reader.search("anticoagulation", [0.0, 1.0], None, [], 0.6, 5)
+    assert results[0]["document_id"] == "b"
+    assert reader._current_generation() is not cached
+
+
+def test_top_k_matches_stable_sort():
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 5, size=200).astype(np.float64)
+    for k in (0, 1, 7, 50, 200, 500):
+        assert _top_k(scores, k).tolist() == np.argsort(-scores, kind="stable")[:k].tolist()
+
+
+def test_pinned_snapshot_survives_writes_and_is_released(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "store.json"))
+    _add(store, "a", "statin therapy", [1.0, 0.0])
+
+    with store.snapshot() as pinned:
+        _add(store, "b", "anticoagulation", [0.0, 1.0])
+        assert [entry.document_id for entry in pinned.documents] == ["a"]
+        assert not pinned.released
+        with store.snapshot() as current:
+            assert current.number == pinned.number + 1
+            assert [entry.document_id for entry in current.documents] == ["a", "b"]
+    assert pinned.released
+
+
+def test_concurrent_ingest_and_search_see_whole_documents(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "store.json"))
+    errors = []
+    done = threading.Event()
+
+    def ingest(writer):
+        try:
+            for version in range(15):
+                document_id = f"doc-{writer}-{version % 5}"
+                metadata = {"document_id": document_id}
+                chunks = [
+                    Chunk(content=f"{document_id} v{version} trial part{part}", position=part, metadata=metadata)
+                    for part in range(3)
+                ]
+                store.add_document(document_id, "paper.pdf", metadata, chunks, [[1.0, float(part)] for part in range(3)])
+        except Exception as exc:
+            errors.append(exc)
+
+    def query():
+        try:
+            while not done.is_set():
+                versions = {}
+                for result in store.search("trial", [1.0, 1.0], None, [], 0.5, 100):
+                    version = result["chunk"]["content"].split()[1]
+                    versions.setdefault(result["document_id"], set()).add(version)
+                assert all(len(seen) == 1 for seen in versions.values()), versions
+        except Exception as exc:
+            errors.append(exc)
+
+    writers = [threading.Thread(target=ingest, args=(writer,)) for writer in range(3)]
+    readers = [threading.Thread(target=query) for _ in range(3)]
+    for thread in writers + readers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors
+    assert len(store.list_documents()) == 15
+    assert len(store.search("trial", [1.0, 1.0], None, [], 0.5, 100)) == 45
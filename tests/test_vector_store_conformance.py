@@ -0,0 +1,145 @@
+import pytest
+
+from app.services.mapped_store import MappedVectorStore
+from app.services.sharded_store import ShardedVectorStore
+from app.services.sqlite_store import SQLiteVectorStore
+from app.services.vector_store import LocalVectorStore, VectorStore
+from app.utils.chunking import Chunk
+from app.utils.minhash import document_signature
+
+BACKENDS = ["json", "mapped", "sharded", "sqlite"]
+
+PAPERS = [
+    ("statins", [1.0, 0.0, 0.0], "2015", "Lancet", "Smith, J; Doe, A", "statin therapy lowers cholesterol"),
+    ("insulin", [0.0, 1.0, 0.0], "2019", "NEJM", "Lee, K", "insulin pump glycaemic control"),
+    ("melanoma", [0.0, 0.0, 1.0], "2022", "Lancet", "Doe, A", "melanoma immunotherapy outcomes"),
+]
+
+
+def _open(tmp_path, backend) -> VectorStore:
+    if backend == "json":
+        return LocalVectorStore(str(tmp_path / "store.json"))
+    if backend == "mapped":
+        return MappedVectorStore(str(tmp_path / "index"))
+    if backend == "sharded":
+        return ShardedVectorStore(str(tmp_path / "shards"), shards=2, search_workers=0)
+    return SQLiteVectorStore(str(tmp_path / "store.sqlite3"))
+
+
+def _add(store, document_id, vector, year, journal, authors, text):
+    metadata = {"document_id": document_id, "title": document_id.title(), "year": year, "journal": journal, "authors": authors}
+    chunks = [
+        Chunk(content=f"{text} part {part}", position=part, metadata={"section": f"s{part}"}) for part in range(2)
+    ]
+    store.add_document(document_id, f"{document_id}.pdf", metadata, chunks, [vector, vector])
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, tmp_path):
+    store = _open(tmp_path, request.param)
+    for paper in PAPERS:
+        _add(store, *paper)
+    return store
+
+
+def _search(store, question, vector, filters=None, weight=0.6, top_k=10):
+    return store.search(question, vector, filters, ["year", "journal", "authors"], weight, top_k)
+
+
+def test_store_implements_interface(store):
+    assert isinstance(store, VectorStore)
+
+
+def test_document_management(store):
+    assert store.has_document("insulin")
+    listed = {document["id"]: document for document in store.list_documents()}
+    assert set(listed) == {"statins", "insulin", "melanoma"}
+    assert listed["insulin"]["year"] == 2019 and listed["insulin"]["chunks"] == 2
+    assert listed["insulin"]["journal"] == "NEJM"
+
+    assert store.remove_document("insulin")
+    assert not store.remove_document("insulin")
+    assert not store.has_document("insulin")
+    assert all(result["document_id"] != "insulin" for result in _search(store, "insulin", [0.0, 1.0, 0.0]))
+
+
+def test_re_adding_a_document_replaces_its_chunks(store):
+    _add(store, "insulin", [0.0, 1.0, 0.0], "2020", "BMJ", "Lee, K", "closed loop insulin delivery")
+    results = [result for result in _search(store, "insulin", [0.0, 1.0, 0.0]) if result["document_id"] == "insulin"]
+    assert len(results) == 2
+    assert all(result["chunk"]["content"].startswith("closed loop") for result in results)
+    assert all(result["metadata"]["journal"] == "BMJ" for result in results)
+
+
+def test_search_result_shape_and_order(store):
+    results = _search(store, "glycaemic control", [0.1, 1.0, 0.0], top_k=3)
+    assert len(results) == 3
+    assert results[0]["document_id"] == "insulin"
+    scores = [result["score"] for result in results]
+    assert scores == sorted(scores, reverse=True)
+
+    top = results[0]
+    assert {"chunk_id", "position", "content", "metadata"} <= set(top["chunk"])
+    assert top["metadata"]["title"] == "Insulin"
+    assert top["metadata"]["section"] in {"s0", "s1"}
+
+
+def test_vector_and_lexical_components(store):
+    semantic = _search(store, "unrelated words", [0.0, 0.0, 1.0], weight=1.0, top_k=2)
+    assert {result["document_id"] for result in semantic} == {"melanoma"}
+    assert semantic[0]["score"] == pytest.approx(1.0, abs=1e-5)
+
+    lexical = _search(store, "cholesterol", [0.0, 0.0, 0.0], weight=0.0, top_k=1)
+    assert lexical[0]["document_id"] == "statins"
+    assert lexical[0]["score"] == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({"year_range": [2016, 2022]}, {"insulin", "melanoma"}),
+        ({"journal": "lancet"}, {"statins", "melanoma"}),
+        ({"journal": ["NEJM", "BMJ"]}, {"insulin"}),
+        ({"authors": "doe, a"}, {"statins", "melanoma"}),
+        ({"authors": ["Lee, K"], "year_range": [2010, 2020]}, {"insulin"}),
+        ({"journal": "Nature"}, set()),
+    ],
+)
+def test_metadata_filters(store, filters, expected):
+    results = _search(store, "therapy", [1.0, 1.0, 1.0], filters=filters)
+    assert {result["document_id"] for result in results} == expected
+
+
+def test_search_batch_matches_individual_searches(store):
+    questions = ["glycaemic control", "cholesterol", "immunotherapy outcomes"]
+    vectors = [[0.1, 1.0, 0.0], [1.0, 0.2, 0.0], [0.0, 0.0, 0.0]]
+    filters = [None, {"journal": "Lancet"}, {"year_range": [2018, 2023]}]
+
+    batched = store.search_batch(questions, vectors, filters, ["year", "journal", "authors"], 0.6, 3)
+    assert len(batched) == 3
+    for question, vector, query_filters, results in zip(questions, vectors, filters, batched):
+        expected = _search(store, question, vector, filters=query_filters, top_k=3)
+        assert [result["chunk"]["chunk_id"] for result in results] == [
+            result["chunk"]["chunk_id"] for result in expected
+        ]
+        assert [result["score"] for result in results] == pytest.approx([result["score"] for result in expected])
+
+
+def test_find_near_duplicate(store):
+    signature = document_signature([f"statin therapy lowers cholesterol part {part}" for part in range(2)])
+    assert store.find_near_duplicate(signature, 0.9) == ("statins", 1.0)
+    assert store.find_near_duplicate(document_signature(["antibiotic stewardship in intensive care"]), 0.5) is None
+
+    store.remove_document("statins")
+    assert store.find_near_duplicate(signature, 0.9) is None
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_near_duplicate_index_survives_reopening(tmp_path, backend):
+    store = _open(tmp_path, backend)
+    _add(store, *PAPERS[1])
+    if hasattr(store, "flush"):
+        store.flush()
+
+    signature = document_signature([f"insulin pump glycaemic control part {part}" for part in range(2)])
+    assert _open(tmp_path, backend).find_near_duplicate(signature, 0.9) == ("insulin", 1.0)